@@ -0,0 +1,94 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Python version of the MakeGif option of plot_wavefield.m. All 61 frames
+# (3 cycles x 20 frames per cycle at 80 kHz) are computed at once from the complex field:
+#   |z|*sin(w*t + phi) = sin(w*t)*Re(z) + cos(w*t)*Im(z)      -> [T,H,W] by broadcasting
+# and mapped onto a fixed 256-level gray palette with the same color limits as the
+# MATLAB figure (+-1.4*max|z|). Frames are encoded straight into the GIF with PIL
+# (0.1 s per frame, infinite loop): no figure, getframe or rgb2ind. Files are rendered in
+# parallel across processes, so a whole dataset can be animated for review.
+#
+# Usage: python animate.py [_vqz.mat or _disp.txt files...] [--workers N]
+#        (default: all ../output/mat/*_vqz.mat, or all ../data/*_disp.txt if there are none)
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+
+gif_dir = Path("../output/gifs")
+
+FREQUENCY = 80e3    # drive frequency [Hz]
+CYCLES = 3
+FRAMES_PER_CYCLE = 20
+DIM = 1.4           # color limits +-DIM*max|z| ("dull the colors by factor of 1.4")
+
+def frame_times(f:float=FREQUENCY, cycles:int=CYCLES, frames_per_cycle:int=FRAMES_PER_CYCLE):
+    "t = 0:1/(frames_per_cycle*f):cycles/f (61 frames by default, both ends included)"
+    return np.arange(cycles*frames_per_cycle + 1)/(frames_per_cycle*f)
+
+def frame_stack(vq_z, t=None, f:float=FREQUENCY):
+    "Out-of-plane displacement |z|*sin(w*t+phi) of every frame as one float32 [T,H,W] array"
+    t = frame_times(f) if t is None else np.asarray(t)
+    vq_z = np.nan_to_num(np.asarray(vq_z, dtype=np.complex64))
+    s, c = (g(2*np.pi*f*t).astype(np.float32)[:,None,None] for g in (np.sin, np.cos))
+    return s*vq_z.real + c*vq_z.imag
+
+def quantize_gray(frames, max_amplitude:float, levels:int=256):
+    "Map [-max_amplitude,max_amplitude] onto gray levels 0..levels-1 (clipped), uint8"
+    scale = (levels - 1)/(2*max_amplitude) if max_amplitude > 0 else 0.0
+    q = (frames + max_amplitude)*scale
+    np.clip(q, 0, levels - 1, out=q)
+    return np.rint(q).astype(np.uint8)
+
+def save_gif(frames, fn, delay:float=0.1):
+    "Encode uint8 gray frames [T,H,W] as a looping GIF with `delay` seconds per frame"
+    imgs = [PIL.Image.fromarray(frame, mode='L') for frame in frames]
+    imgs[0].save(fn, save_all=True, append_images=imgs[1:], duration=int(round(1000*delay)), loop=0,
+                 optimize=False)
+    return fn
+
+def render(vq_z, fn, f:float=FREQUENCY):
+    """Animate one complex field [H,W] (image orientation, like _real.png) to a GIF.
+    Color limits are +-1.4*max|z| like plot_wavefield.m.
+    """
+    max_amplitude = DIM*float(np.nanmax(np.abs(vq_z)))
+    return save_gif(quantize_gray(frame_stack(vq_z, f=f), max_amplitude), fn)
+
+def load_field(fn):
+    "(base name, complex field in image orientation) of an ExportMat .mat file or a disp.txt export"
+    fn = Path(fn)
+    if fn.name.endswith('_vqz.mat'):
+        from inference import load_vqz
+        return fn.name[:-len('_vqz.mat')], load_vqz(fn)
+    from rasterize import base_name, wavefields
+    _, _, vq_z = next(wavefields([fn]))
+    return base_name(fn), np.flip(vq_z, 0) # flip vertically for displaying as image
+
+def _render_file(args):
+    fn, out = args
+    base_file, vq_z = load_field(fn)
+    return str(render(vq_z, Path(out)/f'{base_file}_wavefield.gif'))
+
+def animate_files(files, out=gif_dir, workers:int=None):
+    "Render <base>_wavefield.gif for every file across a process pool; yields output files"
+    Path(out).mkdir(parents=True, exist_ok=True)
+    tasks = [(str(fn), str(out)) for fn in files]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        yield from ex.map(_render_file, tasks, chunksize=max(1, len(tasks)//(4*(workers or os.cpu_count() or 1))))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render wavefield GIFs (MakeGif) from _vqz.mat or disp.txt files')
+    parser.add_argument('files', nargs='*', help='_vqz.mat or _disp.txt files')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--out', default=str(gif_dir))
+    args = parser.parse_args()
+
+    files = args.files or sorted(Path("../output/mat").glob('*_vqz.mat')) or sorted(Path("../data").glob('*_disp.txt'))
+    for fn in animate_files(files, args.out, args.workers):
+        print(f'Saved {fn}')
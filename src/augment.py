@@ -3,46 +3,131 @@
 # Date: 8/17/2020
 # Author: Joshua Eckels (eckelsjd@rose-hulman.edu)
 # Description: Script to augment dataset by generating new images in same directory
+#
+# Each source image is decoded once. All geometric variants (rot180) and all gaussian
+# noise levels of those variants are produced as one [G,V,H,W] array operation, and
+# files are spread over a process pool. Every file gets its own seeded RNG (spawned
+# from one root seed), so results do not depend on the number of workers.
+#
+# Usage: python augment.py [--rot180] [--var 0.01 ...] [--workers N] [--seed S]
 
-from skimage.util import random_noise # Gaussian noise function from skimage library (scikit-learn)
+from skimage.util import img_as_float, img_as_ubyte
 from skimage import io
+from concurrent.futures import ProcessPoolExecutor
 import PIL
+import PIL.Image
 from pathlib import Path
 import numpy as np
+import argparse
 import os
+import warnings
 
 path_img = Path("../images")
 path_lbl = Path("../labels")
 
-files = os.listdir(path_img) # get all images
-
-if '_magnitude' in files[0]:
-    token = '_magnitude'
-elif '_real' in files[0]:
-    token = '_real'
-elif '_imaginary' in files[0]:
-    token = '_imaginary'
-else:
-    print("Error: image needs to contain one of the above")
-
-for img_file in files:
-    spl = img_file.split(token) # split at file extension
-    base = spl[0]
-    ext = spl[1]
-    label_file = base + '_mask' + ext
-
-    # Gaussian noise (don't generate new mask)
-    newname = base + token + '_gauss' + ext
+# Filename tags written by this script (never re-augment these)
+AUG_TAGS = ('_gauss', '_rot180')
+
+def get_token(filename):
+    "Return the image type token in a wavefield image filename"
+    tokens = ['_magnitude','_real','_imaginary']
+    for token in tokens:
+        if token in filename:
+            return token
+    raise ValueError(f"{filename}: image name needs to contain one of {tokens}")
+
+def gaussian_batch(imgs, variances, rng):
+    """Add zero-mean gaussian noise at every variance to every image in one vectorized op.
+    Same noise distribution as skimage random_noise(img,mode='gaussian',var=v) for each v
+    (not the same random stream, so pixel values differ from random_noise).
+    Args:
+        imgs: [G,H,W] images (uint8 or float in [0,1])
+        variances: list of V noise variances
+        rng: numpy Generator
+    Returns:
+        noise_imgs: uint8 [G,V,H,W]
+    """
+    imgs = img_as_float(np.asarray(imgs))
+    sigma = np.sqrt(np.asarray(variances, dtype=float)).reshape(1,-1,1,1)
+    noise_imgs = imgs[:,None] + sigma*rng.standard_normal((imgs.shape[0],len(variances))+imgs.shape[1:])
+    np.clip(noise_imgs, 0, 1, out=noise_imgs)
+    return (255*noise_imgs).astype(np.uint8)
+
+def augment_file(img_file, seed, recipe):
+    """Decode one image (and its mask) once and write all requested variants.
+    recipe keys: path_img, path_lbl, variances, gauss_names, rot180
+    Returns the list of new image filenames.
+    """
+    path_img = Path(recipe['path_img'])
+    token = get_token(img_file)
+    base, ext = img_file.split(token) # split at file extension
+    rng = np.random.default_rng(seed)
+
     img = io.imread(path_img/img_file,as_gray=True)
-    # img = np.array(PIL.Image.open(path_img/img_file))
-    noise_img = random_noise(img,mode='gaussian',var=0.01)
-    noise_img = (255*noise_img).astype(np.uint8)
-    PIL.Image.fromarray(noise_img).save(path_img/newname)
-
-    # Rotate 180 degrees (generate new mask)
-    # newname = base + '_rot180' + token + ext
-    # PIL.Image.fromarray(np.rot90(img,2)).save(path_img/newname)
-    # img_label = np.array(PIL.Image.open(path_lbl/label_file))
-    # new_label_name = base + '_rot180' + token + '_mask' + ext
-    # PIL.Image.fromarray(np.rot90(img_label,2)).save(path_lbl/new_label_name)
+    variants = [(base, img)]
+    if recipe['rot180']:
+        # Rotate 180 degrees (generate new mask)
+        path_lbl = Path(recipe['path_lbl'])
+        rot_base = base + '_rot180'
+        label_file = path_lbl/(base + '_mask' + ext)
+        if label_file.exists():
+            variants.append((rot_base, np.rot90(img,2)))
+            img_label = np.array(PIL.Image.open(label_file))
+            PIL.Image.fromarray(np.ascontiguousarray(np.rot90(img_label,2))).save(path_lbl/(rot_base + '_mask' + ext))
+        else:
+            warnings.warn(f'{img_file}: no label {label_file}, skipping rot180')
+
+    new_files = []
+    for name, var_img in variants[1:]:
+        new_files.append(name + token + ext)
+        PIL.Image.fromarray(img_as_ubyte(np.ascontiguousarray(var_img))).save(path_img/new_files[-1])
+
+    # Gaussian noise (don't generate new mask): [G,V,H,W] for all variants and variances
+    if len(recipe['variances']) > 0:
+        noise_imgs = gaussian_batch(np.stack([v for _,v in variants]), recipe['variances'], rng)
+        for (name,_), stack in zip(variants, noise_imgs):
+            for suffix, noise_img in zip(recipe['gauss_names'], stack):
+                new_files.append(name + token + suffix + ext)
+                PIL.Image.fromarray(noise_img).save(path_img/new_files[-1])
+    return new_files
+
+def _augment_task(args):
+    return augment_file(*args)
+
+def augment_dir(path_img, path_lbl=None, variances=(0.01,), gauss_names=None, rot180=False,
+                workers=None, seed=0):
+    """Run augment_file over every source image in path_img across a process pool.
+    Args:
+        gauss_names: filename suffix for each variance (default '_gauss' or '_gauss_<i>')
+        workers: number of processes (default: all cores)
+        seed: root seed; each file gets an independent child seed
+    Returns:
+        n: number of new images written
+    """
+    files = sorted(f for f in os.listdir(path_img) if not f.startswith(".")
+                   and not any(tag in f for tag in AUG_TAGS)) # get all source images
+    if rot180 and path_lbl is None:
+        raise ValueError("rot180 needs path_lbl to write the rotated masks")
+    if gauss_names is None:
+        gauss_names = ['_gauss'] if len(variances) == 1 else [f'_gauss_{i+1}' for i in range(len(variances))]
+    recipe = dict(path_img=str(path_img), path_lbl=None if path_lbl is None else str(path_lbl), variances=list(variances),
+                  gauss_names=list(gauss_names), rot180=rot180)
+    seeds = np.random.SeedSequence(seed).spawn(len(files))
+    tasks = [(f, s, recipe) for f,s in zip(files, seeds)]
+    n = 0
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        chunksize = max(1, len(tasks) // (4*(workers or os.cpu_count() or 1)))
+        for new_files in ex.map(_augment_task, tasks, chunksize=chunksize):
+            n += len(new_files)
+    return n
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Augment ../images (and ../labels) in place')
+    parser.add_argument('--var', type=float, nargs='*', default=[0.01], help='gaussian noise variances')
+    parser.add_argument('--rot180', action='store_true', help='add rot180 images with matching _mask labels')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
 
+    n = augment_dir(path_img, path_lbl, args.var, rot180=args.rot180, workers=args.workers, seed=args.seed)
+    print(f'Wrote {n} augmented images to {path_img}')
@@ -0,0 +1,175 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Acoustic wavenumber spectroscopy (AWS): a physics baseline next to the U-Net. The
+# complex steady-state field vq_z (ExportMat in plot_wavefield.m) is cut into
+# overlapping windows (strided numpy views, no copies), each window gets a Hann taper
+# and a zero-padded 2-D FFT (scipy.fft, batched over many windows per call), and the
+# spectral peak with parabolic refinement gives the local wavenumber |k|. At the 80 kHz
+# drive frequency |k| maps to local plate thickness through the A0 Lamb wave dispersion
+# relation of aluminum, precomputed once as a lookup table. Thickness is rounded to the
+# nearest class of the class file (codes.txt) to give a segmentation mask that can be
+# scored with evaluate.py like the U-Net predictions.
+#
+# Usage: python aws.py [_vqz.mat files...] [--window 32] [--step 4] [--out ../test/aws] [--mat-dir ../output/mat]
+#        (default: ../output/mat/test_*_vqz.mat -> ../test/aws/<base>_pred.png + ../output/mat/<base>_aws.mat)
+#        python evaluate.py --pred-dir ../test/aws --out ../output/metrics/aws
+
+import argparse
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view    # numpy>=1.20
+from scipy import ndimage
+from scipy.optimize import brentq
+
+from masks import load_codes
+
+FREQUENCY = 80e3        # drive frequency [Hz]
+RESOLUTION = 0.001      # grid spacing of vq_z [m]
+# "Aluminum Alloy" of the ANSYS general materials library (ACT_mech_script.py)
+E, NU, RHO = 71e9, 0.33, 2770.0
+
+def bulk_speeds(E:float=E, nu:float=NU, rho:float=RHO):
+    "Longitudinal, shear and (Viktorov approximation) Rayleigh wave speeds [m/s]"
+    cl = np.sqrt(E*(1 - nu)/(rho*(1 + nu)*(1 - 2*nu)))
+    ct = np.sqrt(E/(2*rho*(1 + nu)))
+    cr = ct*(0.862 + 1.14*nu)/(1 + nu)
+    return cl, ct, cr
+
+def _a0_residual(k, w, h, cl, ct):
+    "Rayleigh-Lamb antisymmetric equation for subsonic waves (k > w/ct), h = half thickness"
+    P = np.sqrt(k**2 - (w/cl)**2)
+    Q = np.sqrt(k**2 - (w/ct)**2)
+    return 4*k**2*P*Q*np.tanh(Q*h) - (k**2 + Q**2)**2*np.tanh(P*h)
+
+def a0_wavenumber(thickness:float, f:float=FREQUENCY, E:float=E, nu:float=NU, rho:float=RHO):
+    """A0 Lamb wavenumber [rad/m] of a plate of `thickness` [m] at frequency f.
+    Valid while the A0 phase velocity is below the shear speed (f*d up to ~1.5 MHz*mm in
+    aluminum, i.e. every thickness at 80 kHz).
+    """
+    cl, ct, _ = bulk_speeds(E, nu, rho)
+    w, h = 2*np.pi*f, thickness/2
+    D = E*thickness**3/(12*(1 - nu**2))
+    k_plate = (rho*thickness*w**2/D)**0.25      # Kirchhoff plate estimate
+    ks = np.linspace(w/ct*(1 + 1e-9), 4*max(k_plate, w/ct), 4000)
+    r = _a0_residual(ks, w, h, cl, ct)
+    i = np.flatnonzero(np.sign(r[:-1]) != np.sign(r[1:]))
+    if not len(i):
+        return np.nan
+    return brentq(_a0_residual, ks[i[0]], ks[i[0]+1], args=(w, h, cl, ct))
+
+@lru_cache(maxsize=8)
+def dispersion_table(f:float=FREQUENCY, d_min:float=2e-4, d_max:float=0.012, n:int=400):
+    "A0 lookup table at frequency f: (thickness [m] ascending, wavenumber [rad/m] descending)"
+    d = np.linspace(d_min, d_max, n)
+    k = np.array([a0_wavenumber(t, f) for t in d])
+    ok = np.isfinite(k)
+    return d[ok], k[ok]
+
+def thickness_from_k(k, f:float=FREQUENCY):
+    "Invert the A0 dispersion table: local thickness [m] from wavenumber [rad/m] (NaN stays NaN)"
+    d, kt = dispersion_table(f)
+    return np.interp(k, kt[::-1], d[::-1], left=d[-1], right=d[0])
+
+def _peak_offset(lm, l0, lp):
+    "Parabolic vertex offset (-0.5..0.5 bins) through three log-magnitude samples"
+    den = lm - 2*l0 + lp
+    with np.errstate(invalid='ignore', divide='ignore'):
+        off = np.where(den < 0, 0.5*(lm - lp)/den, 0.0)
+    return np.clip(np.nan_to_num(off), -0.5, 0.5)
+
+def window_wavenumbers(windows, nfft:int=128, dx:float=RESOLUTION, k_min:float=0.0, taper=None):
+    """Peak |k| [rad/m] of each complex window [...,w,w] from its zero-padded 2-D spectrum.
+    Args:
+        k_min: ignore spectral bins below this wavenumber (DC and long-wave leakage)
+        taper: [w,w] window function (default: 2-D Hann)
+    """
+    w = windows.shape[-1]
+    taper = np.outer(np.hanning(w), np.hanning(w)).astype(np.float32) if taper is None else taper
+    x = windows - windows.mean(axis=(-2, -1), keepdims=True)
+    x = x*taper                                          # copy of this batch only
+    spec = np.abs(scipy.fft.fft2(x, s=(nfft, nfft), axes=(-2, -1), workers=-1))**2
+    freqs = scipy.fft.fftfreq(nfft, dx)                 # [cycles/m]
+    kk = 2*np.pi*np.hypot(freqs[:,None], freqs[None,:])
+    spec[..., kk < k_min] = 0
+    flat = spec.reshape(-1, nfft*nfft)
+    idx = flat.argmax(axis=1)
+    iy, ix = np.divmod(idx, nfft)
+    n = np.arange(len(flat))
+    at = lambda dy, dx_: np.log(flat[n, ((iy + dy) % nfft)*nfft + (ix + dx_) % nfft] + 1e-30)
+    fy = (iy + _peak_offset(at(-1, 0), at(0, 0), at(1, 0)) + nfft//2) % nfft - nfft//2
+    fx = (ix + _peak_offset(at(0, -1), at(0, 0), at(0, 1)) + nfft//2) % nfft - nfft//2
+    k = 2*np.pi*np.hypot(fy, fx)/(nfft*dx)
+    return k.reshape(windows.shape[:-2])
+
+def wavenumber_maps(fields, window:int=32, step:int=4, nfft:int=128, dx:float=RESOLUTION, k_min:float=None,
+                    batch:int=4096, f:float=FREQUENCY):
+    """Local wavenumber maps [N,H,W] of complex fields [N,H,W] (or one field [H,W]).
+    Windows are centered on every step-th grid point (reflect padding at the edges), taken
+    as strided views, and pushed through the FFT `batch` windows at a time. The coarse map
+    is interpolated back onto the full grid.
+    """
+    fields = np.nan_to_num(np.asarray(fields, dtype=np.complex64))
+    single = fields.ndim == 2
+    fields = fields[None] if single else fields
+    N, H, W = fields.shape
+    if k_min is None:
+        k_min = 0.5*dispersion_table(f)[1].min()         # half the wavenumber of the thickest plate
+    pad = window//2
+    padded = np.pad(fields, ((0, 0), (pad, window - pad - 1), (pad, window - pad - 1)), mode='reflect')
+    views = sliding_window_view(padded, (window, window), axis=(1, 2))[:, ::step, ::step] # no copy
+    ny, nx = views.shape[1:3]
+    taper = np.outer(np.hanning(window), np.hanning(window)).astype(np.float32)
+    coarse = np.empty((N, ny, nx), dtype=np.float32)
+    rows = max(1, batch//nx)
+    for n in range(N):
+        for r in range(0, ny, rows):
+            coarse[n, r:r+rows] = window_wavenumbers(views[n, r:r+rows], nfft, dx, k_min, taper)
+    rr, cc = np.mgrid[:H, :W]/step
+    out = np.stack([ndimage.map_coordinates(c, [rr, cc], order=1, mode='nearest') for c in coarse])
+    return out[0] if single else out
+
+def thickness_maps(fields, f:float=FREQUENCY, **kwargs):
+    "(local thickness [m], wavenumber [rad/m]) maps of complex fields"
+    k = wavenumber_maps(fields, f=f, **kwargs)
+    return thickness_from_k(k, f), k
+
+def class_masks(thickness, codes):
+    "uint8 class masks: nearest class of the class file (class i = codes[i] [mm])"
+    codes = np.asarray(codes, dtype=float)
+    mm = 1e3*np.asarray(thickness)
+    return np.abs(mm[...,None] - codes).argmin(axis=-1).astype(np.uint8)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='AWS thickness estimation from ExportMat _vqz.mat fields')
+    parser.add_argument('files', nargs='*', help='_vqz.mat files (default: ../output/mat/test_*_vqz.mat)')
+    parser.add_argument('--window', type=int, default=32, help='window size [grid points]')
+    parser.add_argument('--step', type=int, default=4, help='window step [grid points]')
+    parser.add_argument('--nfft', type=int, default=128, help='zero-padded FFT size')
+    parser.add_argument('--bs', type=int, default=8, help='fields per batch')
+    parser.add_argument('--out', default='../test/aws', help='directory for the _pred.png class masks')
+    parser.add_argument('--mat-dir', default='../output/mat', help='directory for the <base>_aws.mat thickness maps')
+    parser.add_argument('--class-file', default='codes.txt')
+    args = parser.parse_args()
+
+    from scipy.io import savemat
+    from inference import load_vqz
+    codes = load_codes(args.class_file)
+    files = args.files or sorted(Path("../output/mat").glob('test_*_vqz.mat'))
+    out, mat_dir = Path(args.out), Path(args.mat_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    mat_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(0, len(files), args.bs):
+        chunk = files[i:i+args.bs]
+        thick, k = thickness_maps(np.stack([load_vqz(fn) for fn in chunk]), window=args.window, step=args.step,
+                                  nfft=args.nfft)
+        for fn, t, kk, mask in zip(chunk, thick, k, class_masks(thick, codes)):
+            base_file = Path(fn).name.split('_vqz.mat')[0]
+            PIL.Image.fromarray(mask).save(out/f'{base_file}_pred.png')
+            savemat(mat_dir/f'{base_file}_aws.mat', {'thickness': 1e3*t, 'k': kk})
+            print(f'AWS: {base_file}')
@@ -0,0 +1,239 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Reproducible cpu benchmarks of the data, metric and inference hot paths on synthetic
+# plates (synthetic.py), so no ANSYS exports or trained model are needed:
+#   iou          : legacy one-hot IoU (original unet_test.py) vs metrics.py hard/soft IoU
+#   confusion    : legacy c*c loop of SegmentationInterpretation._generate_confusion vs one
+#                  bincount per image (and the patched interpret.py when fastai is installed)
+#   noise        : skimage random_noise per variance vs augment.gaussian_batch
+#   rasterize    : scipy griddata vs cached triangulation weights (rasterize.py)
+#   forward      : U-Net forward throughput at several batch sizes
+# Every benchmark reports the median and min of several repeats. Results are written to
+# ../output/benchmarks/<date>_<commit>.json together with the git commit and library
+# versions; --compare prints the ratios against an earlier result file.
+#
+# Usage: python benchmark.py [--only iou confusion ...] [--artifact ../models/unet.pt] [--compare old.json]
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from metrics import confusion_matrix, iou_score
+from synthetic import noisy_logits, plate_nodes, random_masks
+
+out_dir = Path("../output/benchmarks")
+NUM_CLASSES = 10
+
+def timeit(fn, repeat:int=5, warmup:int=1):
+    "Median and min wall time [s] of fn() over `repeat` runs"
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return dict(median=float(np.median(times)), min=float(np.min(times)), repeat=repeat)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def environment():
+    import scipy
+    return dict(python=platform.python_version(), numpy=np.__version__, scipy=scipy.__version__,
+                torch=torch.__version__, threads=torch.get_num_threads(), cpus=os.cpu_count(),
+                machine=platform.machine(), processor=platform.processor())
+
+# ---- reference implementations (as they were before the optimized versions) ----
+
+def legacy_iou(preds, targs, eps:float=1e-8):
+    "Original unet_test.py IoU: one-hot targets and softmax probabilities"
+    num_classes = preds.shape[1]
+    true_1_hot = torch.eye(num_classes)[targs.squeeze(1)]
+    true_1_hot = true_1_hot.permute(0, 3, 1, 2).float()
+    probas = F.softmax(preds, dim=1)
+    true_1_hot = true_1_hot.type(preds.type())
+    dims = (0,) + tuple(range(2, targs.ndimension()))
+    intersection = torch.sum(probas * true_1_hot, dims)
+    cardinality = torch.sum(probas + true_1_hot, dims)
+    union = cardinality - intersection
+    return (intersection / (union + eps)).mean()
+
+def legacy_confusion(pred_class, y_true, c:int):
+    "Original SegmentationInterpretation._generate_confusion: c*c boolean passes"
+    single_img_confusion, mean_confusion = [], []
+    n = pred_class.shape[0]
+    for c_j in range(c):
+        true_binary = y_true.squeeze(1) == c_j
+        total_true = true_binary.view(n,-1).sum(dim=1).float()
+        for c_i in range(c):
+            pred_binary = pred_class == c_i
+            total_intersect = (true_binary*pred_binary).view(n,-1).sum(dim=1).float()
+            p_given_t = (total_intersect / (total_true))
+            single_img_confusion.append(p_given_t)
+            mean_confusion.append(p_given_t[~torch.isnan(p_given_t)].mean())
+    return (torch.tensor(mean_confusion).view(c, c),
+            torch.stack(single_img_confusion).permute(1,0).view(-1, c, c))
+
+def bincount_confusion(pred_class, y_true, c:int):
+    "Per-image p(pred|true) [n,c,c] and their nan-mean from one bincount"
+    cm = confusion_matrix(pred_class, y_true, c, per_image=True).float()
+    p_given_t = cm / cm.sum(-1, keepdim=True)
+    valid = ~torch.isnan(p_given_t)
+    mean = torch.where(valid, p_given_t, torch.zeros_like(p_given_t)).sum(0) / valid.sum(0)
+    return mean, p_given_t
+
+class ReferenceUNet(torch.nn.Module):
+    "Stand-in 4-level U-Net (3 -> C channels) used when no exported model or fastai is available"
+    def __init__(self, c:int=NUM_CLASSES, nf:int=32):
+        super().__init__()
+        conv = lambda ni, no: torch.nn.Sequential(torch.nn.Conv2d(ni, no, 3, padding=1), torch.nn.BatchNorm2d(no),
+                                                  torch.nn.ReLU(inplace=True))
+        self.down = torch.nn.ModuleList([conv(3, nf), conv(nf, 2*nf), conv(2*nf, 4*nf), conv(4*nf, 8*nf)])
+        self.up = torch.nn.ModuleList([conv(12*nf, 4*nf), conv(6*nf, 2*nf), conv(3*nf, nf)])
+        self.head = torch.nn.Conv2d(nf, c, 1)
+
+    def forward(self, x):
+        skips = []
+        for i, d in enumerate(self.down):
+            x = d(x if i == 0 else F.max_pool2d(x, 2))
+            skips.append(x)
+        for u, s in zip(self.up, reversed(skips[:-1])):
+            x = u(torch.cat([F.interpolate(x, size=s.shape[-2:]), s], dim=1))
+        return self.head(x)
+
+def bench_model(artifact=None):
+    "(model, name): exported artifact, fastai resnet34 DynamicUnet, or ReferenceUNet"
+    if artifact is not None:
+        from deploy import load_artifact
+        return load_artifact(artifact)[0], Path(artifact).name
+    try:
+        from fastai.vision import models, unet_learner # noqa: F401
+        from fastai.vision.models.unet import DynamicUnet
+        body = torch.nn.Sequential(*list(models.resnet34(pretrained=False).children())[:-2])
+        return DynamicUnet(body, n_classes=NUM_CLASSES, img_size=(400,400)).eval(), 'DynamicUnet(resnet34)'
+    except Exception:
+        return ReferenceUNet().eval(), 'ReferenceUNet'
+
+# ---- benchmarks ----
+
+def bench_iou(n:int=8, repeat:int=5):
+    masks = torch.from_numpy(random_masks(n)).long()
+    preds = torch.from_numpy(noisy_logits(masks.numpy(), NUM_CLASSES))
+    targs = masks[:,None]
+    return {'legacy_iou': timeit(lambda: legacy_iou(preds, targs), repeat),
+            'iou_hard': timeit(lambda: iou_score(preds, targs), repeat),
+            'iou_soft': timeit(lambda: iou_score(preds, targs, soft=True), repeat),
+            'params': dict(images=n, shape=list(masks.shape[1:]), classes=NUM_CLASSES)}
+
+def bench_confusion(n:int=32, repeat:int=3):
+    masks = random_masks(n)
+    pred_class = torch.from_numpy(noisy_logits(masks, NUM_CLASSES).argmax(1))
+    y_true = torch.from_numpy(masks).long()[:,None]
+    res = {'legacy_confusion': timeit(lambda: legacy_confusion(pred_class, y_true, NUM_CLASSES), repeat),
+           'bincount_confusion': timeit(lambda: bincount_confusion(pred_class, y_true, NUM_CLASSES), repeat),
+           'params': dict(images=n, classes=NUM_CLASSES)}
+    try:
+        from types import SimpleNamespace
+        from fastai.vision.interpret import SegmentationInterpretation
+        interp = SegmentationInterpretation.__new__(SegmentationInterpretation)
+        interp.pred_class, interp.y_true, interp.data = pred_class, y_true, SimpleNamespace(c=NUM_CLASSES)
+        res['interpret_generate_confusion'] = timeit(interp._generate_confusion, repeat)
+    except Exception:
+        pass # fastai not installed
+    return res
+
+def bench_noise(n:int=4, variances=(0.001, 0.005, 0.01, 0.02), repeat:int=3):
+    from skimage.util import random_noise
+    from augment import gaussian_batch
+    imgs = np.random.default_rng(0).integers(0, 256, (n, 400, 400), dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    legacy = lambda: [random_noise(img, mode='gaussian', var=v) for img in imgs for v in variances]
+    return {'legacy_random_noise': timeit(legacy, repeat),
+            'gaussian_batch': timeit(lambda: gaussian_batch(imgs, variances, rng), repeat),
+            'params': dict(images=n, variances=list(variances))}
+
+def bench_rasterize(repeat:int=3):
+    from scipy.interpolate import griddata
+    from rasterize import grid_points, interp_weights, rasterize, split_nodes
+    plate = split_nodes(plate_nodes(0)[0])
+    points = np.column_stack([plate['x_surf'], plate['y_surf']])
+    query = grid_points(plate['x_width'], plate['y_width'], plate['Nx'], plate['Ny'])
+    fields = np.column_stack([plate['re'], plate['im']])
+    W, outside = interp_weights(points, query)
+    legacy = lambda: [griddata(points, f, query, 'linear') for f in (plate['re'], plate['im'])]
+    return {'legacy_griddata': timeit(legacy, repeat),
+            'interp_weights': timeit(lambda: interp_weights(points, query), repeat),
+            'rasterize_cached': timeit(lambda: rasterize(W, outside, fields, plate['Nx'], plate['Ny']), repeat),
+            'params': dict(nodes=len(points), grid=[plate['Ny'], plate['Nx']])}
+
+def bench_forward(model, batch_sizes=(1, 4, 8), repeat:int=3, size=(400,400)):
+    res = {}
+    with torch.no_grad():
+        for bs in batch_sizes:
+            x = torch.randn(bs, 3, *size)
+            t = timeit(lambda: model(x), repeat)
+            t['images_per_second'] = bs/t['median']
+            res[f'bs_{bs}'] = t
+    return res
+
+BENCHMARKS = ['iou', 'confusion', 'noise', 'rasterize', 'forward']
+
+def run(only=None, artifact=None, batch_sizes=(1, 4, 8)):
+    torch.manual_seed(0)
+    only = only or BENCHMARKS
+    results = dict(commit=git_commit(), date=time.strftime('%Y-%m-%dT%H:%M:%S'), environment=environment(),
+                   benchmarks={})
+    for name in only:
+        print(f'Running {name}...')
+        if name == 'forward':
+            model, model_name = bench_model(artifact)
+            results['benchmarks'][name] = dict(bench_forward(model, batch_sizes), model=model_name)
+        else:
+            results['benchmarks'][name] = globals()[f'bench_{name}']()
+    return results
+
+def compare(new, old):
+    "Print median time ratios new/old for every benchmark present in both result files"
+    for name, bench in new['benchmarks'].items():
+        for case, t in bench.items():
+            o = old['benchmarks'].get(name, {}).get(case)
+            if isinstance(t, dict) and 'median' in t and isinstance(o, dict) and 'median' in o:
+                print(f'{name}/{case:<28}{1e3*o["median"]:>10.2f} ms -> {1e3*t["median"]:>10.2f} ms '
+                      f'({t["median"]/o["median"]:.2f}x)')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the data, metric and inference hot paths on synthetic plates')
+    parser.add_argument('--only', nargs='*', choices=BENCHMARKS, default=None)
+    parser.add_argument('--artifact', default=None, help='exported model for the forward benchmark (export_model.py)')
+    parser.add_argument('--bs', type=int, nargs='*', default=[1, 4, 8], help='batch sizes for the forward benchmark')
+    parser.add_argument('--compare', default=None, help='earlier result .json to compare against')
+    args = parser.parse_args()
+
+    results = run(args.only, args.artifact, args.bs)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fn = out_dir/f'{time.strftime("%Y%m%d_%H%M%S")}_{results["commit"]}.json'
+    with open(fn, 'w') as f:
+        json.dump(results, f, indent=1)
+    for name, bench in results['benchmarks'].items():
+        for case, t in bench.items():
+            if isinstance(t, dict) and 'median' in t:
+                print(f'{name}/{case:<28}{1e3*t["median"]:>10.2f} ms')
+    print(f'Results saved to {fn}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
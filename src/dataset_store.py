@@ -0,0 +1,206 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Chunked, memory-mapped dataset store for wavefield samples. One directory holds
+#   meta.json          : shape, chunk size, sample names, per-sample metadata
+#   fields_<k>.npy     : complex64 [chunk,H,W] vq_z fields (what ExportMat writes)
+#   masks_<k>.npy      : uint8 [chunk,H,W] class masks
+# Fields and masks are kept in image orientation (flipped vertically, same as the
+# _real.png and _mask.png files), but keep the complex amplitude and absolute scale.
+# WavefieldDataset reads slices straight from the memmaps, so an epoch is bound by
+# compute instead of file opens and PNG decodes.
+#
+# Usage:
+#   python dataset_store.py build ../data/store.wf [disp files...]   (default: all of ../data)
+#   python dataset_store.py build-mat ../data/store.wf               (../output/mat/*_vqz.mat + labels)
+
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+import torch
+from torch.utils.data import Dataset
+
+from inference import IMAGENET_STATS
+
+VERSION = 1
+
+def parse_name(base_file):
+    """Per-sample metadata parsed from a file base name.
+    test_<shape>_<thickness>_<size> -> thickness [mm] and defect size [mm] of a test plate;
+    other names keep their round, shape and numeric parameters.
+    """
+    tokens = base_file.split('_')
+    meta = dict(name=base_file)
+    nums = [float(t) for t in tokens if re.fullmatch(r'-?\d+(\.\d+)?', t)]
+    if tokens[0] == 'test':
+        meta['set'] = 'test'
+        meta['shape'] = tokens[1] if len(tokens) > 1 else None
+        if len(nums) >= 2:
+            meta['thickness'], meta['size'] = nums[0], nums[1]
+    else:
+        meta['set'] = 'train'
+        meta['round'] = tokens[0]
+        meta['shape'] = tokens[1] if len(tokens) > 1 else None
+    meta['params'] = nums
+    return meta
+
+class WavefieldStore():
+    "Chunked memmap store of complex wavefields, masks and metadata"
+    def __init__(self, path, mode:str='r'):
+        self.path = Path(path)
+        with open(self.path/'meta.json') as f:
+            self.info = json.load(f)
+        self.mode = mode
+        self._chunks = {}
+
+    @classmethod
+    def create(cls, path, shape=(400,400), chunk:int=256, overwrite:bool=False):
+        "Start an empty store; a non-empty `path` is refused unless overwrite=True (replaces the store files)"
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        if any(path.iterdir()):
+            if not overwrite:
+                raise FileExistsError(f'{path} is not empty (pass overwrite=True to replace the store)')
+            for f in list(path.glob('*.npy')) + list(path.glob('meta.json*')):
+                f.unlink()
+        info = dict(version=VERSION, shape=list(shape), chunk=chunk, n=0, names=[], meta=[], max_amplitude=0.0)
+        with open(path/'meta.json', 'w') as f:
+            json.dump(info, f)
+        return cls(path, mode='r+')
+
+    def __len__(self): return self.info['n']
+    @property
+    def names(self): return self.info['names']
+    @property
+    def meta(self): return self.info['meta']
+
+    def _chunk(self, k:int, create:bool=False):
+        "(fields, masks) memmaps of chunk k"
+        if k not in self._chunks:
+            shape = (self.info['chunk'], *self.info['shape'])
+            fns = self.path/f'fields_{k:05d}.npy', self.path/f'masks_{k:05d}.npy'
+            if create and not fns[0].exists():
+                self._chunks[k] = (np.lib.format.open_memmap(fns[0], 'w+', np.complex64, shape),
+                                   np.lib.format.open_memmap(fns[1], 'w+', np.uint8, shape))
+            else:
+                # copy-on-write maps are writable views, so torch.from_numpy works without a copy
+                mode = 'r+' if self.mode == 'r+' else 'c'
+                self._chunks[k] = (np.load(fns[0], mmap_mode=mode), np.load(fns[1], mmap_mode=mode))
+        return self._chunks[k]
+
+    def append(self, name, vq_z, mask, meta:dict=None):
+        "Add one sample: complex field and uint8 mask [H,W] in image orientation"
+        if self.mode != 'r+':
+            raise ValueError(f"{self.path} is opened read-only (mode={self.mode!r}); open it with mode='r+' to append")
+        i = self.info['n']
+        fields, masks = self._chunk(i // self.info['chunk'], create=True)
+        vq_z = np.nan_to_num(np.asarray(vq_z, dtype=np.complex64))
+        fields[i % self.info['chunk']] = vq_z
+        masks[i % self.info['chunk']] = mask
+        self.info['names'].append(name)
+        self.info['meta'].append(parse_name(name) if meta is None else meta)
+        self.info['max_amplitude'] = max(self.info['max_amplitude'], float(np.abs(vq_z).max()))
+        self.info['n'] = i + 1
+
+    def flush(self):
+        "Write pending samples and metadata to disk"
+        for fields, masks in self._chunks.values():
+            fields.flush(); masks.flush()
+        tmp = self.path/'meta.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.info, f)
+        os.replace(tmp, self.path/'meta.json')
+
+    def field(self, i:int):
+        "Complex field of sample i (a view into the memmap, no copy)"
+        c = self.info['chunk']
+        return self._chunk(i // c)[0][i % c]
+
+    def mask(self, i:int):
+        "Class mask of sample i (a view into the memmap, no copy)"
+        c = self.info['chunk']
+        return self._chunk(i // c)[1][i % c]
+
+def wavefield_input(vq_z, phase:float=0.0, scale:str='minmax', max_amplitude:float=None):
+    """Real-valued network input Re(vq_z*e^{i*phase}) scaled to [0,1].
+    scale='minmax' matches the mat2gray _real.png images; scale='amplitude' keeps the
+    absolute scale of the dataset: (x/max_amplitude + 1)/2.
+    """
+    x = np.real(vq_z*np.exp(1j*phase)) if phase else np.real(vq_z)
+    if scale == 'amplitude':
+        return (x/max_amplitude + 1)/2
+    lo, hi = x.min(), x.max()
+    return (x - lo)/(hi - lo) if hi > lo else np.zeros_like(x)
+
+class WavefieldDataset(Dataset):
+    "PyTorch/fastai dataset over a WavefieldStore: (x [3,H,W] normalized, y [1,H,W] long)"
+    def __init__(self, store, indices=None, phase:float=0.0, scale:str='minmax', stats=IMAGENET_STATS,
+                 classes=None):
+        self.store = store if isinstance(store, WavefieldStore) else WavefieldStore(store)
+        self.indices = list(range(len(self.store))) if indices is None else list(indices)
+        self.phase, self.scale = phase, scale
+        self.mean, self.std = [np.asarray(s, dtype=np.float32).reshape(-1,1,1) for s in stats]
+        self.classes = classes
+        self.c = None if classes is None else len(classes) # fastai learners read data.c
+
+    def __len__(self): return len(self.indices)
+
+    def __getitem__(self, i):
+        j = self.indices[i]
+        x = wavefield_input(self.store.field(j), self.phase, self.scale, self.store.info['max_amplitude'])
+        x = (np.broadcast_to(x.astype(np.float32), (3, *x.shape)) - self.mean) / self.std
+        y = torch.from_numpy(self.store.mask(j)).long()[None]
+        return torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32)), y
+
+def build_from_disp(files, path, class_file="codes.txt", chunk:int=256, overwrite:bool=False):
+    "Rasterize disp.txt exports and their masks straight into a store"
+    from rasterize import wavefields
+    from masks import NearestCache, class_mask, load_codes
+    codes, cache = load_codes(class_file), NearestCache()
+    store = None
+    for fn, plate, vq_z in wavefields(files):
+        if store is None:
+            store = WavefieldStore.create(path, vq_z.shape, chunk, overwrite)
+        store.append(Path(fn).name.split('_disp.txt')[0], np.flip(vq_z, 0), class_mask(plate, codes, cache))
+    if store is not None:
+        store.flush()
+    return store
+
+def build_from_mat(mat_files, path, root=Path(".."), chunk:int=256, overwrite:bool=False):
+    "Store ExportMat _vqz.mat fields with their _mask.png (or test _targ.png) labels"
+    from scipy.io import loadmat
+    from masks import mask_path
+    store = None
+    for fn in mat_files:
+        base_file = Path(fn).name.split('_vqz.mat')[0]
+        vq_z = np.flip(loadmat(fn)['vq_z'], 0)
+        if store is None:
+            store = WavefieldStore.create(path, vq_z.shape, chunk, overwrite)
+        store.append(base_file, vq_z, np.array(PIL.Image.open(mask_path(base_file, root))))
+    if store is not None:
+        store.flush()
+    return store
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a chunked memmap wavefield dataset store')
+    parser.add_argument('cmd', choices=['build','build-mat'])
+    parser.add_argument('path', help='store directory')
+    parser.add_argument('files', nargs='*', help='disp.txt or _vqz.mat files (default: all in ../data or ../output/mat)')
+    parser.add_argument('--chunk', type=int, default=256, help='samples per chunk file')
+    parser.add_argument('--class-file', default='codes.txt')
+    parser.add_argument('--overwrite', action='store_true', help='replace an existing store at path')
+    args = parser.parse_args()
+
+    if args.cmd == 'build':
+        files = args.files or sorted(str(f) for f in Path("../data").glob('*_disp.txt'))
+        store = build_from_disp(files, args.path, args.class_file, args.chunk, args.overwrite)
+    else:
+        files = args.files or sorted(str(f) for f in Path("../output/mat").glob('*_vqz.mat'))
+        store = build_from_mat(files, args.path, chunk=args.chunk, overwrite=args.overwrite)
+    print(f'Stored {0 if store is None else len(store)} samples in {args.path}')
@@ -0,0 +1,154 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Random plate defect layouts straight to thickness maps and class masks, without the
+# CAD script -> STEP -> ANSYS mesh -> scattered nodes -> regrid round trip. Layouts are
+# drawn for a whole batch at once (one seeded generator): 1..max_defects flat-bottomed
+# drops per plate, shaped like the CAD_scripts defects (circles, squares, rectangles,
+# optionally rotated), sized 10-120 mm, kept inside the plate and off the transducer
+# disk, with remaining thicknesses from the classes of codes.txt. Thickness maps are
+# rasterized with broadcasting over [batch, Ny, Nx] on the 400x400 plot_wavefield.m grid;
+# where defects overlap the deepest one wins, and class = plate thickness - local
+# thickness [mm] like masks.py. Maps feed surrogate.py, and the solved fields go into a
+# dataset_store.py store.
+#
+# Usage: python defects.py <n> --store ../data/store_synth [--workers 2] [--seed 0]
+#        python defects.py <n> --out layouts.npz   (thickness maps and masks only)
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from masks import load_codes
+from surrogate import PLATE, SHAPE, TRANSDUCER_RADIUS, grid_spacing
+
+SHAPES = ['circle', 'square', 'rectangle']
+
+def sample_layouts(n:int, codes, seed:int=0, max_defects:int=3, shapes=SHAPES, sizes=(0.01, 0.12),
+                   aspect:float=3.0, rotate:bool=False, plate=PLATE, keep_out:float=TRANSDUCER_RADIUS + 0.005):
+    """Random defect parameters of n plates, [n,max_defects] arrays (unused slots inactive).
+    Args:
+        codes: class file thicknesses [mm]; defects take the remaining thickness of classes 1..C-1
+        sizes: range of the defect size [m] (circle diameter, square side, rectangle long side)
+        aspect: maximum long/short side ratio of rectangles
+        keep_out: defects stay this far [m] from the plate center (transducer)
+    Returns:
+        dict: active, shape (index into SHAPES), cx, cy (from the plate center) [m],
+              width, height [m], angle [rad], thickness (remaining) [mm]
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.asarray(codes, dtype=float)
+    K = max_defects
+    active = np.arange(K) < rng.integers(1, K + 1, size=n)[:,None]
+    shape = np.array([SHAPES.index(s) for s in shapes])[rng.integers(0, len(shapes), size=(n, K))]
+    width = rng.uniform(*sizes, size=(n, K))
+    height = np.where(shape == SHAPES.index('rectangle'), width/rng.uniform(1, aspect, size=(n, K)), width)
+    angle = rng.uniform(0, np.pi, size=(n, K)) if rotate else np.zeros((n, K))
+    angle[shape == SHAPES.index('circle')] = 0.0
+    thickness = codes[1:][rng.integers(0, len(codes) - 1, size=(n, K))]
+    # half extent of the (rotated) bounding box, then centers inside the plate
+    c, s = np.abs(np.cos(angle)), np.abs(np.sin(angle))
+    ex, ey = (c*width + s*height)/2, (s*width + c*height)/2
+    radius = np.hypot(width, height)/2
+    cx, cy = np.zeros((n, K)), np.zeros((n, K))
+    todo = np.ones((n, K), dtype=bool)
+    for _ in range(100):         # redraw centers that land on the transducer
+        cx[todo] = (rng.random(todo.sum()) - 0.5)*np.maximum(plate[0] - 2*ex[todo], 0)
+        cy[todo] = (rng.random(todo.sum()) - 0.5)*np.maximum(plate[1] - 2*ey[todo], 0)
+        todo &= np.hypot(cx, cy) < keep_out + np.where(shape == SHAPES.index('circle'), width/2, radius)
+        if not todo.any():
+            break
+    active &= ~todo              # no room left for a defect this big: drop it
+    return dict(active=active, shape=shape, cx=cx, cy=cy, width=width, height=height, angle=angle,
+                thickness=np.where(active, thickness, codes.max()))
+
+def thickness_maps(layouts, codes, shape=SHAPE, plate=PLATE, dtype=np.float32):
+    """Thickness maps [n,Ny,Nx] in mm (grid orientation: rows = y ascending, like vq_z)
+    of sampled layouts; the deepest defect wins where defects overlap.
+    """
+    (dy, dx), (ny, nx) = grid_spacing(shape, plate), shape
+    x = (np.arange(nx)*dx - plate[0]/2).astype(dtype)[None,None,:]
+    y = (np.arange(ny)*dy - plate[1]/2).astype(dtype)[None,:,None]
+    n, K = layouts['active'].shape
+    out = np.full((n, ny, nx), np.asarray(codes).max(), dtype=dtype)
+    col = lambda name, k: layouts[name][:,k].astype(dtype)[:,None,None]
+    for k in range(K):
+        u, v = x - col('cx', k), y - col('cy', k)
+        cos, sin = np.cos(col('angle', k)), np.sin(col('angle', k))
+        u, v = u*cos + v*sin, v*cos - u*sin
+        w, h = col('width', k)/2, col('height', k)/2
+        circle = (layouts['shape'][:,k] == SHAPES.index('circle'))[:,None,None]
+        inside = np.where(circle, u**2 + v**2 <= w**2, (np.abs(u) <= w) & (np.abs(v) <= h))
+        inside &= layouts['active'][:,k][:,None,None]
+        np.minimum(out, np.where(inside, col('thickness', k), np.inf), out=out)
+    return out
+
+def class_masks(thickness, codes):
+    "uint8 class masks: round(plate thickness - local thickness) [mm], as masks.class_mask"
+    return np.clip(np.round(np.asarray(codes).max() - thickness), 0, 255).astype(np.uint8)
+
+def layout_names(layouts, prefix:str='synth', start:int=0):
+    "Sample names <prefix>_<shape or multi>_<index> (parse_name: round = prefix, shape)"
+    names = []
+    for i in range(len(layouts['active'])):
+        shapes = {SHAPES[s] for s in layouts['shape'][i][layouts['active'][i]]}
+        names.append(f'{prefix}_{shapes.pop() if len(shapes) == 1 else "multi"}_{start + i}')
+    return names
+
+def layout_meta(layouts, i:int, name:str):
+    "Store metadata of plate i: parse_name fields plus its defect list"
+    from dataset_store import parse_name
+    meta = parse_name(name)
+    meta['defects'] = [dict(shape=SHAPES[layouts['shape'][i,k]], thickness=float(layouts['thickness'][i,k]),
+                            **{p: float(layouts[p][i,k]) for p in ('cx', 'cy', 'width', 'height', 'angle')})
+                       for k in np.flatnonzero(layouts['active'][i])]
+    return meta
+
+def batches(layouts, bs:int):
+    "Split layouts into dicts of at most bs plates"
+    n = len(layouts['active'])
+    for i in range(0, n, bs):
+        yield i, {k: v[i:i+bs] for k, v in layouts.items()}
+
+def build_store(n:int, path, codes, seed:int=0, bs:int=32, workers:int=None, prefix:str='synth', overwrite:bool=False,
+                **settings):
+    """Sample n layouts, solve them with surrogate.py and store fields and masks
+    (image orientation, like dataset_store.build_from_disp)."""
+    from dataset_store import WavefieldStore
+    from surrogate import solve_batch
+    layouts = sample_layouts(n, codes, seed)
+    store = WavefieldStore.create(path, SHAPE, overwrite=overwrite)
+    for start, batch in batches(layouts, bs):
+        h = thickness_maps(batch, codes)
+        masks = class_masks(h, codes)
+        names = layout_names(batch, prefix, start)
+        fields = dict(solve_batch(list(1e-3*h.astype(np.float64)), workers=workers, **settings))
+        for i in range(len(h)):
+            store.append(names[i], np.flip(fields[i], 0), np.flip(masks[i], 0), layout_meta(batch, i, names[i]))
+        store.flush()
+        print(f'Stored {start + len(h)}/{n} samples')
+    return store
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sample random defect layouts as thickness maps and masks')
+    parser.add_argument('n', type=int, help='number of plates')
+    parser.add_argument('--store', default=None, help='solve with surrogate.py into this dataset store')
+    parser.add_argument('--out', default=None, help='save thickness maps [mm] and masks to this .npz instead')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bs', type=int, default=32, help='plates per batch')
+    parser.add_argument('--workers', type=int, default=2, help='surrogate solver processes')
+    parser.add_argument('--class-file', default='codes.txt')
+    parser.add_argument('--overwrite', action='store_true', help='replace an existing store')
+    args = parser.parse_args()
+
+    codes = load_codes(args.class_file)
+    if args.store is not None:
+        build_store(args.n, args.store, codes, args.seed, args.bs, args.workers, overwrite=args.overwrite)
+    else:
+        layouts = sample_layouts(args.n, codes, args.seed)
+        h = thickness_maps(layouts, codes)
+        out = Path(args.out or f'../data/layouts_{args.seed}.npz')
+        np.savez_compressed(out, thickness_maps=h, masks=class_masks(h, codes), names=layout_names(layouts), **layouts)
+        print(f'Saved {args.n} layouts to {out}')
@@ -0,0 +1,84 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Thin runtime for the exported U-Net artifacts written by export_model.py. Loads a
+# TorchScript (.pt) or ONNX (.onnx) model plus its <artifact>.json sidecar (normalization stats,
+# class codes, input size) without importing fastai, and runs the streaming inference
+# engine from inference.py on it. Cold start is a single torch.jit.load or
+# onnxruntime session instead of unpickling a whole fastai learner.
+#
+# Usage: python deploy.py ../models/unet.pt [--bs 8] [--threads N]
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from inference import IMAGENET_STATS, predict_stream
+
+def meta_path(fn):
+    "Sidecar <artifact>.json of an artifact (unet.pt -> unet.pt.json, so the .pt and .onnx exports don't share one)"
+    fn = Path(fn)
+    return fn.with_name(fn.name + '.json')
+
+def read_meta(fn):
+    "Artifact metadata (empty dict if the sidecar is missing)"
+    p = meta_path(fn)
+    if not p.exists():
+        return {}
+    with open(p) as f:
+        return json.load(f)
+
+class OnnxModel():
+    "Callable wrapper of an onnxruntime session: [B,3,H,W] tensor -> logits tensor"
+    def __init__(self, fn, threads:int=None):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(fn), opts, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x:torch.Tensor):
+        x = np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)
+        return torch.from_numpy(self.session.run(None, {self.input_name: x})[0])
+
+def load_artifact(fn, threads:int=None):
+    """Load an exported model for cpu inference.
+    Returns:
+        model: callable mapping a normalized [B,3,H,W] batch to logits [B,C,H,W]
+        meta: sidecar metadata (stats, codes, size, format, ...)
+    """
+    fn = Path(fn)
+    if threads:
+        torch.set_num_threads(threads)
+    if fn.suffix == '.onnx':
+        model = OnnxModel(fn, threads)
+    else:
+        model = torch.jit.load(str(fn), map_location='cpu')
+        model.eval()
+    return model, read_meta(fn)
+
+def artifact_stats(meta):
+    "Normalization stats recorded at export time (imagenet stats if missing)"
+    stats = meta.get('stats', IMAGENET_STATS)
+    return None if stats is None else tuple(stats)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run an exported U-Net artifact on ../test/testset (no fastai)')
+    parser.add_argument('artifact', help='.pt (TorchScript) or .onnx file written by export_model.py')
+    parser.add_argument('--bs', type=int, default=8, help='batch size')
+    parser.add_argument('--threads', type=int, default=None, help='intra-op threads (default: torch default)')
+    args = parser.parse_args()
+
+    test_dir = Path("../test")
+    token = '_real'
+    model, meta = load_artifact(args.artifact, args.threads)
+    files = sorted(f for f in (test_dir/"testset").iterdir() if token in f.name)
+    get_pred_fn = lambda x: test_dir/"predictions"/f'{x.stem.split(token)[0]}_pred{x.suffix}'
+    n = predict_stream(model, files, get_pred_fn, bs=args.bs, stats=artifact_stats(meta))
+    print(f'Saved {n} predictions to {test_dir/"predictions"}')
@@ -0,0 +1,126 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Binary columnar cache for the ANSYS *_disp.txt exports. Each text file is parsed
+# once into data/.cache/disp/<name>-<path hash>/ with one .npy file per column
+# (node, x, y, z, re, im) and a meta.json recording the source size, mtime and sha1.
+# Displacements are stored as float32 when the round trip error is negligible, and
+# coordinates only when it is exact (checked per column). Columns are opened with numpy
+# memmaps, so readers only touch the columns they need and pay no parse or copy.
+# Entries are rebuilt automatically when the text file changes.
+#
+# Usage: python disp_cache.py [disp files...]   (default: ingest all of ../data)
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+data_dir = Path("../data")
+cache_dir = data_dir/".cache"/"disp"
+
+COLUMNS = ['node', 'x', 'y', 'z', 're', 'im'] # same order as the disp.txt export
+DISP_RTOL = 1e-6    # max float32 error relative to the largest displacement
+VERSION = 1
+
+def file_sha1(fn, block:int=1<<20):
+    "sha1 of a file, read in blocks"
+    h = hashlib.sha1()
+    with open(fn, 'rb') as f:
+        for chunk in iter(lambda: f.read(block), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _safe_float32(col, name):
+    "Downcast a float64 column to float32 if no information the pipeline relies on is lost"
+    col32 = col.astype(np.float32)
+    err = np.abs(col32.astype(np.float64) - col)
+    if name in ('x', 'y', 'z'):
+        # coordinates feed equality tests (x=0, plate edges, mode(z)) and edge thresholds
+        # on the mask: only downcast when the round trip is exact
+        ok = err.max(initial=0) == 0
+    else:
+        ok = err.max(initial=0) <= DISP_RTOL*np.abs(col).max(initial=0)
+    return col32 if ok else col
+
+def entry_dir(fn, root=cache_dir):
+    "Cache directory of a source file, keyed on its resolved path so equal basenames in different folders don't collide"
+    fn = Path(fn)
+    key = hashlib.sha1(str(fn.resolve()).encode()).hexdigest()[:12]
+    return Path(root)/f"{fn.name.split('.txt')[0]}-{key}"
+
+def _read_meta(d):
+    try:
+        with open(d/'meta.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(d, meta):
+    tmp = d/'meta.json.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, d/'meta.json')
+
+def ingest(fn, root=cache_dir, force:bool=False):
+    """Make sure the cache entry of `fn` is current; parse the text file only if needed.
+    Returns:
+        d: cache directory of the file
+    """
+    fn = Path(fn)
+    d = entry_dir(fn, root)
+    st = fn.stat()
+    meta = None if force else _read_meta(d)
+    if meta is not None and meta.get('version') == VERSION and meta['size'] == st.st_size:
+        if meta['mtime_ns'] == st.st_mtime_ns:
+            return d
+        # touched but maybe unchanged: compare content hash before re-parsing
+        sha1 = file_sha1(fn)
+        if sha1 == meta['sha1']:
+            meta['mtime_ns'] = st.st_mtime_ns
+            _write_meta(d, meta)
+            return d
+
+    data = np.loadtxt(fn, skiprows=1, ndmin=2)
+    d.parent.mkdir(parents=True, exist_ok=True)
+    # private staging dir: concurrent ingests of the same file never share or delete each other's writes
+    tmp = Path(tempfile.mkdtemp(prefix=d.name + '.', suffix='.tmp', dir=d.parent))
+    dtypes = {}
+    for i,name in enumerate(COLUMNS):
+        col = data[:,i]
+        col = col.astype(np.int32) if name == 'node' else _safe_float32(col, name)
+        np.save(tmp/f'{name}.npy', np.ascontiguousarray(col))
+        dtypes[name] = col.dtype.str
+    _write_meta(tmp, dict(version=VERSION, source=str(fn), size=st.st_size, mtime_ns=st.st_mtime_ns,
+                          sha1=file_sha1(fn), rows=len(data), dtypes=dtypes))
+    shutil.rmtree(d, ignore_errors=True)
+    try:
+        os.replace(tmp, d)
+    except OSError:
+        # another process published the entry first; theirs is built from the same file
+        shutil.rmtree(tmp, ignore_errors=True)
+        if _read_meta(d) is None:
+            raise
+    return d
+
+def open_columns(fn, columns=COLUMNS, root=cache_dir):
+    "Read-only memmaps {name: array} of the requested columns of a disp.txt file (ingests if stale)"
+    d = ingest(fn, root)
+    return {name: np.load(d/f'{name}.npy', mmap_mode='r') for name in columns}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert ANSYS disp.txt exports to the binary columnar cache')
+    parser.add_argument('files', nargs='*', help='disp.txt files (default: all *_disp.txt in ../data)')
+    parser.add_argument('--force', action='store_true', help='rebuild entries even if they are current')
+    args = parser.parse_args()
+
+    files = args.files or sorted(str(f) for f in data_dir.glob('*_disp.txt'))
+    for fn in files:
+        d = ingest(fn, force=args.force)
+        print(f'{fn} -> {d}')
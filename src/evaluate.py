@@ -0,0 +1,165 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Python version of the metric part of get_results.m (IoUCharts and ConfusionMatrix).
+# Target/prediction pairs (../test/targets/<base>_targ.png, ../test/predictions/<base>_pred.png)
+# are scored across a process pool. Each worker decodes one pair and counts it into a
+# [C,C] confusion matrix with a single bincount; everything else comes from that matrix:
+#   exact IoU   : IoU of the defect's thickness class (jaccard on thickness label images)
+#   binary IoU  : defect vs plate, plate = most frequent target class (mode(targ_img))
+#   confusion   : summed over the test set (rows = actual, columns = predicted)
+# The size x thickness tables are filled as results arrive (size "5" is skipped, like
+# get_results.m). Writes CSV tables and an .npz with everything to ../output/metrics.
+#
+# Usage: python evaluate.py [--workers N] [--class-file codes.txt] [--pred-dir ../test/predictions] [--out ../output/metrics]
+
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+import torch
+
+from dataset_store import parse_name
+from masks import load_codes
+from metrics import confusion_matrix
+
+test_dir = Path("../test")
+out_dir = Path("../output/metrics")
+SKIP_SIZES = (5.0,)     # 5.5 mm cases are hard coded out of the IoU charts in get_results.m
+
+def pairs(target_dir=test_dir/"targets", pred_dir=test_dir/"predictions"):
+    "(base name, target file, prediction file) for every target with a prediction"
+    out = []
+    for targ in sorted(Path(target_dir).glob('*_targ.png')):
+        base = targ.name[:-len('_targ.png')]
+        pred = Path(pred_dir)/f'{base}_pred.png'
+        if pred.exists():
+            out.append((base, str(targ), str(pred)))
+    return out
+
+def image_confusion(targ, pred, num_classes:int):
+    "Confusion counts [C,C] of one class image pair (rows = target class), metrics.confusion_matrix"
+    as_tensor = lambda a: torch.from_numpy(a.astype(np.int64))[None]
+    return confusion_matrix(as_tensor(pred), as_tensor(targ), num_classes).numpy()
+
+def class_iou(cm):
+    "Per-class IoU from confusion counts [...,C,C] (nan where a class is absent from both)"
+    tp = np.diagonal(cm, axis1=-2, axis2=-1).astype(float)
+    union = cm.sum(-1) + cm.sum(-2) - tp
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return tp/union
+
+def binary_iou(cm):
+    "Defect vs plate IoU of one image; the plate is the most frequent target class"
+    plate = np.argmax(cm.sum(1))        # first (smallest) class on ties, like MATLAB mode
+    defect = np.ones(len(cm), dtype=bool)
+    defect[plate] = False
+    inter = cm[np.ix_(defect, defect)].sum()
+    union = cm.sum() - cm[plate, plate]
+    return inter/union if union else np.nan
+
+def _score(args):
+    base, targ, pred, num_classes = args
+    t = np.array(PIL.Image.open(targ))
+    p = np.array(PIL.Image.open(pred))
+    return base, image_confusion(t, p, num_classes)
+
+def evaluate(pairs, codes, workers:int=None):
+    """Score all pairs across a process pool.
+    Returns:
+        dict: confusion [C,C], per-image names/confusions/exact/binary IoU, and the
+              exact/binary size x thickness tables with their row (thickness) and column (size) labels
+    """
+    codes = np.asarray(codes)
+    C = len(codes)
+    max_thick = codes.max()
+    thicknesses = np.sort(codes)[:-1]                  # defect thicknesses (all but the full plate)
+    cm_total = np.zeros((C, C), dtype=np.int64)
+    names, cms, exact, binary, cells = [], [], [], [], {}
+    tasks = [(b, t, p, C) for b, t, p in pairs]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        chunksize = max(1, len(tasks)//(4*(workers or os.cpu_count() or 1)))
+        for base, cm in ex.map(_score, tasks, chunksize=chunksize):
+            cm_total += cm
+            meta = parse_name(base)
+            iou = class_iou(cm)
+            thick = meta.get('thickness')
+            # exact IoU is the IoU of the defect's thickness class (class = index in codes)
+            cls = np.flatnonzero(np.isclose(codes, thick)) if thick is not None else []
+            e = iou[cls[0]] if len(cls) else np.nan
+            b = binary_iou(cm)
+            names.append(base); cms.append(cm); exact.append(e); binary.append(b)
+            if thick is not None and meta.get('size') not in SKIP_SIZES:
+                cells[(thick, meta['size'])] = (e, b)
+
+    sizes = sorted({s for _, s in cells})
+    exact_table = np.full((len(thicknesses), len(sizes)), np.nan)
+    binary_table = np.full_like(exact_table, np.nan)
+    for (thick, size), (e, b) in cells.items():
+        i = np.flatnonzero(np.isclose(thicknesses, thick))
+        if len(i):
+            exact_table[i[0], sizes.index(size)] = e
+            binary_table[i[0], sizes.index(size)] = b
+    return dict(confusion=cm_total, names=names, image_confusion=np.array(cms).reshape(-1, C, C),
+                exact_iou=np.array(exact), binary_iou=np.array(binary), thicknesses=thicknesses,
+                ptr=(1 - thicknesses/max_thick)*100, sizes=np.array(sizes, dtype=float),
+                exact_table=exact_table, binary_table=binary_table)
+
+def summary(res):
+    "Test set metrics of evaluateSemanticSegmentation: class IoU, mean/weighted IoU, class balance"
+    cm = res['confusion']
+    iou = class_iou(cm)
+    balance = cm.sum(1)/cm.sum()
+    return dict(class_iou=iou, miou=np.nanmean(iou), weighted_iou=np.sum(balance*np.nan_to_num(iou)),
+                accuracy=np.trace(cm)/cm.sum(), class_balance=balance,
+                normalized_confusion=cm/np.maximum(cm.sum(1, keepdims=True), 1))
+
+def _write_table(fn, table, res):
+    with open(fn, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['ptr_percent'] + [f'{s:g}' for s in res['sizes']])
+        for ptr, row in zip(res['ptr'], table):
+            w.writerow([f'{ptr:.0f}'] + [f'{v:.4f}' for v in row])
+
+def save(res, codes, out=out_dir):
+    "Write exact_iou.csv, binary_iou.csv, confusion_matrix.csv, per_image.csv and evaluation.npz"
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    s = summary(res)
+    _write_table(out/'exact_iou.csv', res['exact_table'], res)
+    _write_table(out/'binary_iou.csv', res['binary_table'], res)
+    labels = [f'{c:g}' for c in codes]
+    with open(out/'confusion_matrix.csv', 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['actual\\predicted [mm]'] + labels)
+        for label, row in zip(labels, s['normalized_confusion']):
+            w.writerow([label] + [f'{v:.4f}' for v in row])
+    with open(out/'per_image.csv', 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['name', 'exact_iou', 'binary_iou', 'miou'] + [f'iou_{l}mm' for l in labels])
+        for name, cm, e, b in zip(res['names'], res['image_confusion'], res['exact_iou'], res['binary_iou']):
+            iou = class_iou(cm)
+            w.writerow([name, f'{e:.4f}', f'{b:.4f}', f'{np.nanmean(iou):.4f}'] + [f'{v:.4f}' for v in iou])
+    np.savez(out/'evaluation.npz', codes=np.asarray(codes), **res, **s)
+    return s
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score ../test/predictions against ../test/targets')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--class-file', default='codes.txt')
+    parser.add_argument('--pred-dir', default=str(test_dir/"predictions"), help='e.g. ../test/aws for aws.py masks')
+    parser.add_argument('--out', default=str(out_dir))
+    args = parser.parse_args()
+
+    codes = load_codes(args.class_file)
+    res = evaluate(pairs(pred_dir=args.pred_dir), codes, args.workers)
+    s = save(res, codes, args.out)
+    print(f'{len(res["names"])} images: mIoU {s["miou"]:.4f}, weighted IoU {s["weighted_iou"]:.4f}, '
+          f'pixel accuracy {s["accuracy"]:.4f}')
+    print(f'Mean exact IoU {np.nanmean(res["exact_table"]):.4f}, mean binary IoU {np.nanmean(res["binary_table"]):.4f}')
+    print(f'Results saved to {args.out}')
@@ -0,0 +1,194 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Export the trained fastai U-Net (../models/*.pkl) to self-contained deployment
+# artifacts that deploy.py runs without fastai:
+#   <name>.pt          : frozen TorchScript trace (fp32)
+#   <name>.onnx        : ONNX graph (opset 11, dynamic batch size)
+#   <name>_int8.pt     : FX static int8 quantization calibrated on training images, or
+#   <name>_int8.onnx   : onnxruntime static QDQ int8 quantization (weights and activations,
+#                        same calibration images) when FX tracing fails
+# Every artifact gets a <artifact>.json sidecar, e.g. unet.pt.json (stats, codes, size, sha1, parity results).
+# The parity check runs the fp32 learner and the artifact on the same test images and
+# compares their masks (pixel agreement and mean IoU of artifact vs fp32 masks), and
+# records the per-image cpu latency and load time of both.
+# Needs a newer torch than the fastai 1.0.61 training pin: torch>=1.8 to freeze the
+# TorchScript trace (older versions save it unfrozen), torch>=2.0 for FX quantization
+# with the 'x86' backend; onnxruntime for the ONNX int8 artifact.
+#
+# Usage: python export_model.py [--file export_0_0009_KH.pkl] [--name unet] [--onnx] [--int8] [--parity 16]
+
+import argparse
+import copy
+import json
+import re
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from deploy import load_artifact, meta_path
+from disp_cache import file_sha1
+from inference import IMAGENET_STATS, image_batches, predict_masks, to_stats
+from metrics import ConfusionMatrix
+
+model_dir = Path("../models")
+
+TORCH_VERSION = tuple(int(v) for v in re.findall(r'\d+', torch.__version__)[:2])
+
+def require_torch(version, feature:str):
+    "Raise a clear error when the installed torch is older than `version` (major, minor)"
+    if TORCH_VERSION < tuple(version):
+        raise RuntimeError(f'{feature} needs torch>={".".join(map(str, version))} '
+                           f'(installed: {torch.__version__}); see requirements.txt')
+
+def load_fastai_learner(path=model_dir, file="export_0_0009_KH.pkl"):
+    """load_learner on the exported .pkl. The pickle references IoU from the training
+    notebook's __main__, so it is provided there before unpickling.
+    """
+    import __main__
+    from fastai.vision import load_learner
+    from unet_test import IoU
+    if not hasattr(__main__, 'IoU'):
+        __main__.IoU = IoU
+    return load_learner(path=path, file=file)
+
+def example_input(size=(400,400), bs:int=1):
+    return torch.randn(bs, 3, *size)
+
+def export_torchscript(model, fn, size=(400,400)):
+    "Trace and freeze the model on the cpu (unfrozen before torch 1.8); returns the artifact path"
+    model = model.cpu().eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example_input(size))
+        if TORCH_VERSION >= (1, 8):
+            traced = torch.jit.freeze(traced)
+        else:
+            warnings.warn(f'torch {torch.__version__} has no torch.jit.freeze; saving the unfrozen trace')
+    traced.save(str(fn))
+    return fn
+
+def export_onnx(model, fn, size=(400,400), opset:int=11):
+    "Export to ONNX with a dynamic batch dimension; returns the artifact path"
+    model = model.cpu().eval()
+    with torch.no_grad():
+        torch.onnx.export(model, example_input(size), str(fn), export_params=True, opset_version=opset,
+                          do_constant_folding=True, input_names=['input'], output_names=['logits'],
+                          dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}})
+    return fn
+
+def quantize_fx(model, calib, backend:str='x86'):
+    """Static int8 post-training quantization with torch FX graph mode.
+    Args:
+        calib: iterable of normalized [B,3,H,W] calibration batches
+    """
+    require_torch((2, 0), f"FX static quantization with the '{backend}' backend")
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+    calib = list(calib)
+    model = copy.deepcopy(model).cpu().eval()
+    prepared = prepare_fx(model, get_default_qconfig_mapping(backend), example_inputs=(calib[0],))
+    with torch.no_grad():
+        for x in calib:
+            prepared(x)
+    return convert_fx(prepared)
+
+def quantize_onnx(fn, fn_int8, calib):
+    """Static int8 quantization of an ONNX artifact with onnxruntime: QDQ format, per-channel
+    int8 weights and uint8 activations calibrated like quantize_fx, so the convs run in int8
+    (dynamic quantization would only cover MatMul/Gemm and leave the U-Net in fp32).
+    Args:
+        calib: iterable of normalized [B,3,H,W] calibration batches
+    """
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self, batches):
+            self.batches = iter(batches)
+
+        def get_next(self):
+            x = next(self.batches, None)
+            return None if x is None else {'input': x.numpy()}
+
+    quantize_static(str(fn), str(fn_int8), _Reader(calib), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    return fn_int8
+
+def write_meta(fn, **meta):
+    "Write the <artifact>.json sidecar of an artifact (adds its format and sha1)"
+    meta = dict(meta, artifact=Path(fn).name, format='onnx' if Path(fn).suffix == '.onnx' else 'torchscript',
+                sha1=file_sha1(fn))
+    with open(meta_path(fn), 'w') as f:
+        json.dump(meta, f, indent=1)
+    return meta
+
+def _timed_masks(model, files, bs, stats):
+    masks, seconds = [], 0.0
+    with torch.no_grad():
+        for x, _ in image_batches(files, bs, stats):
+            t = time.perf_counter()
+            masks.append(predict_masks(model, x, torch.device('cpu')))
+            seconds += time.perf_counter() - t
+    return np.concatenate(masks), seconds/max(len(files), 1)
+
+def parity(ref_model, model, files, num_classes:int, bs:int=4, stats=IMAGENET_STATS):
+    """Compare the masks of an artifact with the fp32 reference model on `files`.
+    Returns:
+        dict: pixel agreement, mean IoU of artifact vs reference masks, and the
+              per-image cpu latency [ms] of both
+    """
+    ref_model = ref_model.cpu().eval()
+    ref, ref_s = _timed_masks(ref_model, files, bs, stats)
+    out, s = _timed_masks(model, files, bs, stats)
+    cm = ConfusionMatrix(num_classes).update(torch.from_numpy(out).long(), torch.from_numpy(ref).long())
+    return dict(images=len(files), agreement=float((out == ref).mean()), miou=cm.miou(),
+                ref_ms_per_image=1e3*ref_s, ms_per_image=1e3*s)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the fastai U-Net to TorchScript/ONNX (+int8) artifacts')
+    parser.add_argument('--file', default='export_0_0009_KH.pkl', help='learner .pkl in ../models')
+    parser.add_argument('--name', default='unet', help='artifact base name in ../models')
+    parser.add_argument('--onnx', action='store_true', help='also export ONNX')
+    parser.add_argument('--int8', action='store_true', help='also export an int8 quantized artifact')
+    parser.add_argument('--calib', type=int, default=32, help='training images used for int8 calibration')
+    parser.add_argument('--parity', type=int, default=16, help='test images for the parity check (0 to skip)')
+    parser.add_argument('--bs', type=int, default=4)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    learn = load_fastai_learner(model_dir, args.file)
+    learner_load_s = time.perf_counter() - t
+    model = learn.model.cpu().eval()
+    codes = [float(c) for c in np.loadtxt("codes.txt", ndmin=1)]
+    stats = to_stats(getattr(learn.data, 'stats', None))
+    size = (400, 400)
+    meta = dict(source=args.file, stats=stats, codes=codes, size=list(size), num_classes=len(codes))
+
+    token = '_real'
+    test_files = sorted(f for f in Path("../test/testset").iterdir() if token in f.name)[:args.parity]
+    calib_files = sorted(f for f in Path("../images").iterdir() if token in f.name)[:args.calib]
+
+    artifacts = [export_torchscript(model, model_dir/f'{args.name}.pt', size)]
+    if args.onnx or args.int8:
+        artifacts.append(export_onnx(model, model_dir/f'{args.name}.onnx', size))
+    if args.int8:
+        try:
+            qmodel = quantize_fx(model, (x for x,_ in image_batches(calib_files, args.bs, stats)))
+            artifacts.append(export_torchscript(qmodel, model_dir/f'{args.name}_int8.pt', size))
+        except Exception as err:
+            warnings.warn(f'FX static quantization failed ({err}); using onnxruntime static quantization')
+            artifacts.append(quantize_onnx(model_dir/f'{args.name}.onnx', model_dir/f'{args.name}_int8.onnx',
+                                           (x for x,_ in image_batches(calib_files, args.bs, stats))))
+
+    for fn in artifacts:
+        write_meta(fn, **meta)
+        t = time.perf_counter()
+        art, _ = load_artifact(fn)
+        result = dict(meta, load_seconds=time.perf_counter() - t, learner_load_seconds=learner_load_s)
+        if test_files:
+            result['parity'] = parity(model, art, test_files, len(codes), args.bs, stats)
+        write_meta(fn, **result)
+        print(f'{fn}: {json.dumps(result.get("parity", {}))}')
@@ -0,0 +1,602 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Streaming U-Net inference engine. Pulls fixed-size batches of wavefield images,
+# decodes the next batch on a background thread while the current one runs through
+# the model, reduces every batch to argmax masks right away and hands the masks to a
+# background writer. Peak memory depends on the batch size only, never on the size of
+# the test set (unlike learn.get_preds, which keeps every [N,10,400,400] probability).
+# predict_tiled runs larger plates as overlapping tiles with blended logits.
+# predict_cascade runs a dedicated low-resolution model first and re-segments only the
+# flagged defect regions at full resolution (most of a plate is nominal thickness);
+# calibrate_cascade picks its threshold/margin against full-resolution recall.
+# Only torch, numpy and PIL are needed here; fastai is not imported.
+
+import queue
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+import torch
+
+from profiler import NULL_PROFILER
+
+# Same stats the training notebooks normalize with (fastai imagenet_stats)
+IMAGENET_STATS = ([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+
+def open_wavefield(fn):
+    "Decode an image file the way fastai open_image does: RGB float32 [3,H,W] in [0,1]"
+    img = PIL.Image.open(fn).convert('RGB')
+    x = np.asarray(img, dtype=np.float32) / 255
+    return x.transpose(2, 0, 1)
+
+def normalize(x:torch.Tensor, stats=IMAGENET_STATS):
+    "Normalize a [B,3,H,W] batch in place with (mean,std) channel stats"
+    if stats is None:
+        return x
+    mean, std = [torch.as_tensor(np.asarray(s, dtype=np.float32)).view(1, -1, 1, 1) for s in stats]
+    return x.sub_(mean).div_(std)
+
+def to_stats(stats):
+    "Convert fastai normalization stats (tensors or lists) to plain (mean,std) lists (imagenet stats if None)"
+    if stats is None:
+        return IMAGENET_STATS
+    return tuple([float(v) for v in torch.as_tensor(s).flatten()] for s in stats)
+
+def image_batches(files, bs:int=8, stats=IMAGENET_STATS, profiler=NULL_PROFILER):
+    "Yield (x, files) with x a normalized [bs,3,H,W] tensor; the last batch may be smaller"
+    files = list(files)
+    for i in range(0, len(files), bs):
+        chunk = files[i:i+bs]
+        with profiler.stage('decode', len(chunk)):
+            x = torch.from_numpy(np.stack([open_wavefield(fn) for fn in chunk]))
+        with profiler.stage('normalize', len(chunk)):
+            x = normalize(x, stats)
+        yield x, chunk
+
+def prefetch(iterable, depth:int=2):
+    "Run `iterable` on a background thread, keeping at most `depth` items decoded ahead"
+    q = queue.Queue(maxsize=max(depth, 1))
+    done, stop = object(), threading.Event()
+
+    def _put(item):
+        "Blocking put that gives up once the consumer has stopped"
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _producer():
+        try:
+            for item in iterable:
+                if not _put(item):
+                    return
+        except BaseException as err:
+            _put(err)
+        _put(done)
+
+    threading.Thread(target=_producer, daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()      # consumer stopped early (break, error, close): release the producer
+
+class MaskWriter():
+    "Background thread that saves uint8 masks as PNG files from a bounded queue"
+    def __init__(self, maxsize:int=32, profiler=NULL_PROFILER):
+        self.q = queue.Queue(maxsize=maxsize)
+        self.profiler = profiler
+        self.error = None
+        self.count = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.q.get()
+            if item is None:
+                return
+            mask, fn = item
+            try:
+                with self.profiler.stage('save', 1):
+                    PIL.Image.fromarray(mask).save(fn)
+                self.count += 1
+            except Exception as err:
+                self.error = err
+
+    def put(self, mask:np.ndarray, fn):
+        if self.error is not None:
+            raise self.error
+        self.q.put((mask, str(fn)))
+
+    def close(self):
+        "Flush all pending masks and stop the thread"
+        self.q.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self): return self
+    def __exit__(self, exc_type, *args):
+        try:
+            self.close()
+        except Exception:
+            if exc_type is None:    # never mask the exception raised in the with body
+                raise
+
+def model_device(model):
+    "Device holding the model parameters (cpu for callables without parameters)"
+    try:
+        return next(model.parameters()).device
+    except (AttributeError, StopIteration):
+        return torch.device('cpu')
+
+def predict_masks(model, x:torch.Tensor, device=None, profiler=NULL_PROFILER):
+    "Forward one batch and reduce the logits to uint8 argmax masks [B,H,W] on the cpu"
+    x = x.to(device if device is not None else model_device(model))
+    with profiler.stage('forward', len(x)):
+        out = model(x)
+    with profiler.stage('argmax', len(x)):
+        return out.max(dim=1).indices.to(torch.uint8).cpu().numpy() # argmax over channels, faster on cpu
+
+def predict_stream(model, files, get_pred_fn, bs:int=8, stats=IMAGENET_STATS, device=None,
+                   depth:int=2, verbose:bool=True, cache=None, model_key=None, settings=None,
+                   profiler=NULL_PROFILER):
+    """Run batched inference over `files` and save one mask per input image.
+    Args:
+        model: torch module (or any callable) mapping [B,3,H,W] -> logits [B,C,H,W]
+        files: list of image paths
+        get_pred_fn: function mapping an input Path to the output mask Path
+        bs: batch size; peak memory scales with bs only
+        stats: (mean,std) normalization stats, or None to skip normalization
+        device: torch device to run on (default: wherever the model lives)
+        depth: number of batches decoded ahead of the model
+        cache: pred_cache.PredictionCache; inputs cached under (model_key, file, settings)
+               are written from the cache without running the model
+        model_key: model hash for the cache keys (see pred_cache.model_hash)
+        settings: extra inference settings that change the result (mode='stream' and stats are always included)
+        profiler: profiler.Profiler recording decode/forward/argmax/save stages
+    Returns:
+        n: number of masks written
+    """
+    if isinstance(model, torch.nn.Module):
+        model.eval()
+    files, keys = list(files), {}
+    n = 0
+    with torch.no_grad(), MaskWriter(maxsize=4*bs, profiler=profiler) as writer:
+        if cache is not None:
+            settings = dict(dict(mode='stream'), **(settings or {}), stats=stats)
+            misses = []
+            for fn in files:
+                keys[fn] = cache.key(model_key, fn, settings)
+                entry = cache.get(keys[fn])
+                if entry is None:
+                    misses.append(fn)
+                else:
+                    writer.put(entry['mask'], get_pred_fn(Path(fn)))
+            n = len(files) - len(misses)
+            if verbose and n:
+                print(f'Reused {n}/{len(files)} cached predictions')
+            files, total = misses, len(files)
+        else:
+            total = len(files)
+        batches = prefetch(image_batches(files, bs, stats, profiler), depth)
+        while True:
+            with profiler.stage('wait'): # time the model waits for decoded batches
+                x, chunk = next(batches, (None, None))
+            if x is None:
+                break
+            masks = predict_masks(model, x, device, profiler)
+            with profiler.stage('enqueue', len(chunk)): # blocks when the writer falls behind
+                for mask, fn in zip(masks, chunk):
+                    writer.put(mask, get_pred_fn(Path(fn)))
+                    if cache is not None:
+                        cache.put(keys[fn], mask)
+            n += len(chunk)
+            if verbose:
+                print(f'Predicted {n}/{total} images')
+    return n
+
+def load_vqz(fn):
+    "Complex vq_z field from an ExportMat _vqz.mat file, flipped to image orientation like _real.png"
+    from scipy.io import loadmat
+    return np.flip(loadmat(fn)['vq_z'], 0)
+
+def phase_batch(vq_z, phases, stats=IMAGENET_STATS, quantize:bool=True):
+    """K phase-rotated inputs Re(vq_z*e^{i*phi}) of one complex field as one [K,3,H,W] batch.
+    Each image is min/max scaled to [0,1] like mat2gray; quantize=True also rounds to 8 bits
+    like the saved _real.png images the network was trained on.
+    """
+    vq_z = np.nan_to_num(np.asarray(vq_z, dtype=np.complex64))
+    phases = np.asarray(phases, dtype=np.float32).reshape(-1,1,1)
+    # Re(z*e^{i*phi}) = Re(z)cos(phi) - Im(z)sin(phi)
+    x = vq_z.real[None]*np.cos(phases) - vq_z.imag[None]*np.sin(phases)
+    lo, hi = x.min(axis=(1,2), keepdims=True), x.max(axis=(1,2), keepdims=True)
+    x = (x - lo) / np.where(hi > lo, hi - lo, 1)
+    if quantize:
+        x = np.round(255*x) / 255
+    x = torch.from_numpy(np.ascontiguousarray(np.repeat(x[:,None], 3, axis=1), dtype=np.float32))
+    return normalize(x, stats)
+
+def predict_phase_ensemble(model, vq_z, codes, phases=None, k:int=8, stats=IMAGENET_STATS,
+                           device=None, bs:int=None, profiler=NULL_PROFILER):
+    """Average the softmax probabilities over K phase shifts of a complex field.
+    Replaces rendering, predicting and reading back K phase images (avg_phase.m).
+    Args:
+        vq_z: complex field [H,W] in image orientation (see load_vqz)
+        codes: class file values; class i has thickness codes[i] [mm]
+        phases: phase shifts [rad] (default: k equally spaced shifts over 0-360 deg)
+        bs: split the K inputs into forward passes of at most bs images (default: one pass)
+        profiler: profiler.Profiler timing the phase_batch, forward and reduce stages
+    Returns:
+        mask: uint8 [H,W] argmax of the averaged probabilities
+        thickness: float32 [H,W] expected local thickness sum_c p_c*codes[c] [mm]
+        probs: float32 [C,H,W] averaged probabilities
+    """
+    phases = np.arange(k)*2*np.pi/k if phases is None else np.asarray(phases)
+    device = device if device is not None else model_device(model)
+    with profiler.stage('phase_batch', len(phases)):
+        x = phase_batch(vq_z, phases, stats)
+    if isinstance(model, torch.nn.Module):
+        model.eval()
+    probs = 0
+    with torch.no_grad():
+        for xb in x.split(bs or len(x)):
+            with profiler.stage('forward', len(xb)):
+                probs = probs + torch.softmax(model(xb.to(device)).float(), dim=1).sum(0)
+    with profiler.stage('reduce', 1):
+        probs = (probs / len(x)).cpu()
+        codes = torch.as_tensor(np.asarray(codes, dtype=np.float32)).view(-1,1,1)
+        thickness = (probs*codes).sum(0)
+        return probs.argmax(0).to(torch.uint8).numpy(), thickness.numpy(), probs.numpy()
+
+BLENDS = ('gaussian', 'linear', 'none')
+
+def _timed(images, profiler, name:str='decode'):
+    "Yield the items of `images`, timing how long producing each one takes (lazy decoding)"
+    it = iter(images)
+    while True:
+        with profiler.stage(name, 1):
+            item = next(it, _timed)
+        if item is _timed:
+            return
+        yield item
+
+def blend_window(tile:int, blend:str='gaussian', sigma:float=0.125):
+    "Per-pixel tile weights [tile,tile] for blending overlapping logits (gaussian or linear ramp)"
+    c = (tile - 1)/2
+    d = np.abs(np.arange(tile) - c)
+    if blend == 'gaussian':
+        w = np.exp(-d**2/(2*(sigma*tile)**2))
+    elif blend == 'linear':
+        w = 1 - d/(c + 1)
+    else:
+        w = np.ones(tile)
+    # keep a small positive weight at tile borders so image borders are still covered
+    return np.maximum(np.outer(w, w), 1e-3).astype(np.float32)
+
+def tile_starts(n:int, tile:int, stride:int):
+    "Tile offsets along one axis covering [0,n); the last tile is shifted back to end at n"
+    starts = list(range(0, max(n - tile, 0) + 1, stride))
+    if starts[-1] + tile < n:
+        starts.append(n - tile)
+    return starts
+
+class _TiledImage():
+    "Rolling [C,tile,W] logit accumulator of one image; rows are finalized stripe by stripe"
+    def __init__(self, img, tile:int, stride:int):
+        self.h, self.w = img.shape
+        pad = ((0, max(tile - self.h, 0)), (0, max(tile - self.w, 0)))
+        self.img = np.pad(img, pad, mode='symmetric') if any(p[1] for p in pad) else img
+        H, W = self.img.shape
+        self.ys, self.xs = tile_starts(H, tile, stride), tile_starts(W, tile, stride)
+        self.mask = np.zeros((H, W), dtype=np.uint8)
+        self.acc, self.top = None, 0
+
+    def add(self, logits, y0:int, x0:int, window):
+        "Add weighted tile logits [C,tile,tile]; returns True when the last stripe is finalized"
+        tile = logits.shape[-1]
+        if self.acc is None:
+            self.acc = torch.zeros(logits.shape[0], tile, self.img.shape[1])
+        r = y0 - self.top
+        self.acc[:, r:r+tile, x0:x0+tile] += logits*window
+        if x0 != self.xs[-1]:
+            return False
+        # stripe complete: rows above the next stripe will not receive more tiles
+        i = self.ys.index(y0)
+        bottom = self.ys[i+1] if i + 1 < len(self.ys) else self.img.shape[0]
+        n = bottom - self.top
+        self.mask[self.top:bottom] = self.acc[:, :n].argmax(dim=0).to(torch.uint8).numpy()
+        self.acc = torch.cat([self.acc[:, n:], torch.zeros(self.acc.shape[0], n, self.acc.shape[2])], dim=1)
+        self.top = bottom
+        return bottom == self.img.shape[0]
+
+def predict_tiled(model, images, tile:int=400, overlap:int=64, blend:str='gaussian', bs:int=8,
+                  stats=IMAGENET_STATS, device=None, profiler=NULL_PROFILER):
+    """Sliding-window inference for wavefields larger than the training grid.
+    Tiles from consecutive images share batches; logits are blended at the seams with
+    a gaussian/linear window and reduced to argmax rows stripe by stripe, so memory is
+    bounded by bs tiles plus a [C,tile,W] accumulator per image in flight.
+    Args:
+        images: iterable of grayscale wavefields [H,W] scaled to [0,1] (any size)
+        tile, overlap: tile size and overlap between neighbouring tiles [pixels]
+        blend: 'gaussian', 'linear' or 'none'
+        profiler: profiler.Profiler timing the decode, normalize, forward and blend stages
+    Returns:
+        generator of uint8 masks [H,W], one per image in input order
+        (tile, overlap and blend are checked right away, before any image is read)
+    """
+    if not 0 <= overlap < tile:
+        raise ValueError(f'overlap must be in [0, tile): got overlap={overlap}, tile={tile}')
+    if blend not in BLENDS:
+        raise ValueError(f'blend must be one of {BLENDS}, got {blend!r}')
+    return _tiled_masks(model, images, tile, overlap, blend, bs, stats, device, profiler)
+
+def _tiled_masks(model, images, tile, overlap, blend, bs, stats, device, profiler):
+    device = device if device is not None else model_device(model)
+    if isinstance(model, torch.nn.Module):
+        model.eval()
+    window = torch.from_numpy(blend_window(tile, blend))
+
+    def _tiles():
+        for img in _timed(images, profiler):
+            t = _TiledImage(np.asarray(img, dtype=np.float32), tile, tile - overlap)
+            for y0 in t.ys:
+                for x0 in t.xs:
+                    yield t, y0, x0
+
+    def _run(batch):
+        with profiler.stage('normalize', len(batch)):
+            x = torch.from_numpy(np.stack([t.img[y0:y0+tile, x0:x0+tile] for t,y0,x0 in batch]))
+            x = normalize(x[:,None].repeat(1,3,1,1).contiguous(), stats)
+        with profiler.stage('forward', len(batch)), torch.no_grad():
+            logits = model(x.to(device)).float().cpu()
+        with profiler.stage('blend', len(batch)):
+            done = [t.mask[:t.h, :t.w] for (t,y0,x0), l in zip(batch, logits) if t.add(l, y0, x0, window)]
+        yield from done
+
+    batch = []
+    for item in _tiles():
+        batch.append(item)
+        if len(batch) == bs:
+            yield from _run(batch)
+            batch = []
+    if batch:
+        yield from _run(batch)
+
+def _span(lo:int, hi:int, n:int, align:int):
+    "Window [a,b) of length rounded up to a multiple of align covering [lo,hi), kept inside [0,n)"
+    size = min(n, -(-(hi - lo)//align)*align)
+    a = min(max((lo + hi - size)//2, 0), n - size)
+    return a, a + size
+
+def candidate_boxes(p_defect:np.ndarray, shape, threshold:float=0.05, margin:int=16):
+    """Full-resolution boxes (y0,y1,x0,x1) around every coarse pixel with defect probability
+    above `threshold`, grown by `margin` pixels and merged where they overlap.
+    """
+    from scipy import ndimage
+    (H, W), (h, w) = shape, p_defect.shape
+    sy, sx = H/h, W/w
+    boxes = []
+    for sl in ndimage.find_objects(ndimage.label(p_defect > threshold)[0]):
+        boxes.append([max(int(sl[0].start*sy) - margin, 0), min(int(np.ceil(sl[0].stop*sy)) + margin, H),
+                      max(int(sl[1].start*sx) - margin, 0), min(int(np.ceil(sl[1].stop*sx)) + margin, W)])
+    merged = True
+    while merged:               # union overlapping boxes until none overlap
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [tuple(b) for b in boxes]
+
+def coarse_input(x:torch.Tensor, scale:float=0.25, align:int=32):
+    """Area-downsampled grayscale batch [B,H,W] -> [B,h,w] for the coarse model (h, w rounded
+    to multiples of align). The coarse model has to be trained on these inputs: the field is
+    resampled, so wavelengths in pixels shrink by `scale` and the full-resolution U-Net does
+    not apply to them.
+    """
+    size = tuple(max(align, int(round(n*scale/align))*align) for n in x.shape[-2:])
+    return torch.nn.functional.interpolate(x[:,None], size=size, mode='area')[:,0]
+
+def _logits(model, x:torch.Tensor, stats, device):
+    "Float cpu logits [B,C,H,W] of a grayscale batch [B,H,W] repeated to 3 channels"
+    x = normalize(x[:,None].repeat(1,3,1,1).contiguous(), stats)
+    with torch.no_grad():
+        return model(x.to(device)).float().cpu()
+
+def _same_shape(images):
+    "(indices, [B,H,W] tensor) for every group of equally sized images"
+    for shape in dict.fromkeys(img.shape for img in images):
+        idx = [i for i, img in enumerate(images) if img.shape == shape]
+        yield idx, torch.from_numpy(np.stack([images[i] for i in idx]))
+
+def _coarse_pass(coarse_model, images, scale, align, background, stats, device):
+    "P(defect) = 1 - P(background) maps of the coarse model, and the number of coarse pixels"
+    p_defect, pixels = [None]*len(images), 0
+    for idx, x in _same_shape(images):
+        x = coarse_input(x, scale, align)
+        probs = torch.softmax(_logits(coarse_model, x, stats, device), dim=1)
+        for i, p in zip(idx, 1 - probs[:,background]):
+            p_defect[i] = p.numpy()
+        pixels += x.numel()
+    return p_defect, pixels
+
+def _plan(p_defect, shape, threshold, margin, context, align, max_fraction):
+    "Full-resolution ((crop), (box)) pairs of one image; one whole-image crop when they cover too much"
+    H, W = shape
+    crops = []
+    for y0, y1, x0, x1 in candidate_boxes(p_defect, shape, threshold, margin):
+        (cy0, cy1), (cx0, cx1) = _span(y0 - context, y1 + context, H, align), _span(x0 - context, x1 + context, W, align)
+        crops.append(((cy0, cy1, cx0, cx1), (y0, y1, x0, x1)))
+    if sum((c[1] - c[0])*(c[3] - c[2]) for c, _ in crops) > max_fraction*H*W:
+        return [((0, H, 0, W), (0, H, 0, W))], True
+    return crops, False
+
+def predict_cascade(model, coarse_model, images, scale:float=0.25, threshold:float=0.05, margin:int=16,
+                    context:int=32, align:int=32, max_fraction:float=0.6, background:int=0, bs:int=8,
+                    stats=IMAGENET_STATS, coarse_stats=None, device=None, report:dict=None,
+                    profiler=NULL_PROFILER):
+    """Coarse-to-fine inference: a dedicated low-resolution model flags candidate defect regions
+    and only those crops are segmented by `model` at full resolution; everything else is
+    `background` (class 0 = nominal plate thickness). Crops carry `context` extra pixels on
+    each side that are dropped when stitching, and are rounded to multiples of `align`.
+    Pixels the coarse pass misses are silently background, so check the recall of
+    threshold/margin against full resolution with calibrate_cascade.
+    Args:
+        coarse_model: model trained on coarse_input(images, scale, align) (required: the
+            full-resolution U-Net reads thickness from wavelengths in pixels)
+        images: iterable of grayscale wavefields [H,W] scaled to [0,1]
+        threshold, margin: recall safety; coarse pixels with P(defect) = 1 - P(background)
+            above threshold are flagged, and their boxes grown by margin [full-res pixels]
+        max_fraction: run the whole image at full resolution when the crops cover more than this
+        coarse_stats: normalization stats of the coarse model (default: stats)
+        report: dict accumulating images, crops, dense (full-image fallbacks), coarse/fine/dense
+            pixels, pixel_ratio = (coarse + fine)/dense pixels (above 1: more work than dense),
+            and wall seconds (coarse, fine and total)
+        profiler: profiler.Profiler timing the decode, coarse, plan, forward and stitch stages
+    Returns:
+        generator of uint8 masks [H,W], one per image in input order
+    """
+    if coarse_model is None:
+        raise ValueError('predict_cascade needs a coarse model trained on coarse_input() fields')
+    return _cascade_masks(model, coarse_model, images, scale, threshold, margin, context, align, max_fraction,
+                          background, bs, stats, coarse_stats, device, report, profiler)
+
+def _cascade_masks(model, coarse_model, images, scale, threshold, margin, context, align, max_fraction,
+                   background, bs, stats, coarse_stats, device, report, profiler):
+    device = device if device is not None else model_device(model)
+    coarse_stats = stats if coarse_stats is None else coarse_stats
+    for m in (model, coarse_model):
+        if isinstance(m, torch.nn.Module):
+            m.eval()
+    report = {} if report is None else report
+    for k in ('images', 'crops', 'dense', 'coarse_pixels', 'fine_pixels', 'dense_pixels',
+              'coarse_seconds', 'fine_seconds', 'seconds'):
+        report.setdefault(k, 0)
+
+    def _run(chunk):
+        t0 = time.perf_counter()
+        with profiler.stage('coarse', len(chunk)):
+            p_defect, pixels = _coarse_pass(coarse_model, chunk, scale, align, background, coarse_stats, device)
+        report['coarse_pixels'] += pixels
+        report['coarse_seconds'] += time.perf_counter() - t0
+        # full-resolution crops (with context), batched by crop size
+        masks, groups = [], {}
+        with profiler.stage('plan', len(chunk)):
+            for img, p in zip(chunk, p_defect):
+                H, W = img.shape
+                mask = np.full((H, W), background, dtype=np.uint8)
+                masks.append(mask)
+                crops, dense = _plan(p, img.shape, threshold, margin, context, align, max_fraction)
+                report['images'] += 1
+                report['dense_pixels'] += H*W
+                report['dense'] += dense
+                for c, box in crops:
+                    groups.setdefault((c[1] - c[0], c[3] - c[2]), []).append((img, mask, c, box))
+                    report['crops'] += 1
+                    report['fine_pixels'] += (c[1] - c[0])*(c[3] - c[2])
+        t1 = time.perf_counter()
+        for items in groups.values():
+            for i in range(0, len(items), bs):
+                batch = items[i:i+bs]
+                with profiler.stage('forward', len(batch)):
+                    x = torch.from_numpy(np.stack([img[c[0]:c[1], c[2]:c[3]] for img, _, c, _ in batch]))
+                    preds = _logits(model, x, stats, device).argmax(dim=1).to(torch.uint8).numpy()
+                with profiler.stage('stitch', len(batch)):
+                    for (_, mask, c, (y0, y1, x0, x1)), pred in zip(batch, preds):
+                        mask[y0:y1, x0:x1] = pred[y0-c[0]:y1-c[0], x0-c[2]:x1-c[2]]
+        t2 = time.perf_counter()
+        report['fine_seconds'] += t2 - t1
+        report['seconds'] += t2 - t0
+        report['pixel_ratio'] = (report['coarse_pixels'] + report['fine_pixels'])/max(report['dense_pixels'], 1)
+        return masks
+
+    chunk = []
+    for img in _timed(images, profiler):
+        chunk.append(np.asarray(img, dtype=np.float32))
+        if len(chunk) == bs:
+            yield from _run(chunk)
+            chunk = []
+    if chunk:
+        yield from _run(chunk)
+
+def calibrate_cascade(model, coarse_model, images, thresholds=(0.01, 0.02, 0.05, 0.1, 0.2), margins=(8, 16, 32),
+                      target_recall:float=0.99, scale:float=0.25, context:int=32, align:int=32,
+                      max_fraction:float=0.6, background:int=0, bs:int=8, stats=IMAGENET_STATS,
+                      coarse_stats=None, device=None):
+    """Pick threshold/margin of predict_cascade against full-resolution predictions on `images`
+    (e.g. part of the test set). For every setting the recall is the fraction of pixels the
+    full-resolution model calls a defect that lie inside the cascade crops; the cheapest setting
+    (fewest coarse + fine pixels) reaching target_recall wins, else the one with the best recall.
+    The winner is then run for real and timed against dense inference.
+    Returns:
+        dict: threshold, margin, met (target reached), coverage_recall, recall (defect pixels of
+              the full-resolution masks the cascade masks reproduce), agreement (all pixels),
+              pixel_ratio, dense_ms and cascade_ms per image, speedup (dense/cascade wall time),
+              and grid (threshold, margin, coverage_recall, pixel_ratio of every setting)
+    """
+    device = device if device is not None else model_device(model)
+    coarse_stats = stats if coarse_stats is None else coarse_stats
+    for m in (model, coarse_model):
+        if isinstance(m, torch.nn.Module):
+            m.eval()
+    images = [np.asarray(img, dtype=np.float32) for img in images]
+    t = time.perf_counter()
+    full = [None]*len(images)
+    for i in range(0, len(images), bs):
+        for idx, x in _same_shape(images[i:i+bs]):
+            for j, m in zip(idx, _logits(model, x, stats, device).argmax(dim=1).to(torch.uint8).numpy()):
+                full[i + j] = m
+    dense_s = time.perf_counter() - t
+    p_defect, coarse_pixels = _coarse_pass(coarse_model, images, scale, align, background, coarse_stats, device)
+    defect = [m != background for m in full]
+    n_defect = sum(int(d.sum()) for d in defect)
+    dense_pixels = sum(img.size for img in images)
+
+    grid = []
+    for threshold in thresholds:
+        for margin in margins:
+            hit, pixels = 0, coarse_pixels
+            for img, p, d in zip(images, p_defect, defect):
+                covered = np.zeros(img.shape, dtype=bool)
+                crops, _ = _plan(p, img.shape, threshold, margin, context, align, max_fraction)
+                for c, (y0, y1, x0, x1) in crops:
+                    covered[y0:y1, x0:x1] = True
+                    pixels += (c[1] - c[0])*(c[3] - c[2])
+                hit += int((d & covered).sum())
+            grid.append(dict(threshold=threshold, margin=margin, coverage_recall=hit/n_defect if n_defect else 1.0,
+                             pixel_ratio=pixels/dense_pixels))
+    ok = [g for g in grid if g['coverage_recall'] >= target_recall]
+    best = min(ok, key=lambda g: (g['pixel_ratio'], -g['coverage_recall'])) if ok else \
+           max(grid, key=lambda g: (g['coverage_recall'], -g['pixel_ratio']))
+
+    report = {}
+    masks = list(predict_cascade(model, coarse_model, images, scale, best['threshold'], best['margin'], context,
+                                 align, max_fraction, background, bs, stats, coarse_stats, device, report))
+    same = [m == f for m, f in zip(masks, full)]
+    recall = sum(int((s & d).sum()) for s, d in zip(same, defect))/n_defect if n_defect else 1.0
+    n = max(len(images), 1)
+    return dict(threshold=best['threshold'], margin=best['margin'], target_recall=target_recall, met=bool(ok),
+                coverage_recall=best['coverage_recall'], recall=recall,
+                agreement=sum(int(s.sum()) for s in same)/max(dense_pixels, 1), pixel_ratio=report['pixel_ratio'],
+                dense_ms=1e3*dense_s/n, cascade_ms=1e3*report['seconds']/n,
+                speedup=dense_s/report['seconds'] if report['seconds'] else float('nan'), images=len(images), grid=grid)
@@ -2,10 +2,29 @@ from ..torch_core import *
 from ..basic_data import *
 from ..basic_train import *
 from .image import *
+from ..basic_train import NoneReduceOnCPU
 from ..train import Interpretation
 from textwrap import wrap
+import heapq
 
-__all__ = ['SegmentationInterpretation', 'ObjectDetectionInterpretation']
+__all__ = ['SegmentationInterpretation', 'SegmentationStats', 'ObjectDetectionInterpretation']
+
+def _confusion_counts(pred_class:Tensor, y_true:Tensor, c:int)->Tensor:
+    "Per image confusion counts [n,c,c] (rows true, cols pred) from a single bincount over c*true+pred"
+    n = pred_class.shape[0]
+    idx = c*y_true.contiguous().view(n,-1).long() + pred_class.contiguous().view(n,-1).long()
+    idx += (c*c)*torch.arange(n, device=idx.device)[:,None]
+    return torch.bincount(idx.view(-1), minlength=n*c*c).view(n,c,c)
+
+def _p_given_t(counts:Tensor)->Tensor:
+    "Row-normalize confusion counts: fraction of true-class pixels predicted as each class (nan if class absent)"
+    counts = counts.float()
+    return counts / counts.sum(-1, keepdim=True)
+
+def _nanmean_images(cms:Tensor)->Tuple[Tensor,Tensor]:
+    "Mean over images of [n,c,c] matrices ignoring nan entries; returns (sum, count) for streaming"
+    valid = ~torch.isnan(cms)
+    return torch.where(valid, cms, torch.zeros_like(cms)).sum(0), valid.sum(0).float()
 
 class SegmentationInterpretation(Interpretation):
     "Interpretation methods for segmenatation models."
@@ -57,23 +76,20 @@ class SegmentationInterpretation(Interpretation):
         self._interp_show(ImageSegment(self.y_true[i]), classes, sz=sz, title_suffix='true')
         self._interp_show(ImageSegment(self.pred_class[i][None,:]), classes, sz=sz, title_suffix='pred')
 
-    def _generate_confusion(self):
+    def _generate_confusion(self, chunk_size:int=64):
         "Average and Per Image Confusion: intersection of pixels given a true label, true label sums to 1"
+        # one vectorized bincount per chunk of images instead of c*c boolean passes
+        c = self.data.c
+        y_true = self.y_true.view(self.pred_class.shape)
         single_img_confusion = []
-        mean_confusion = []
-        n =  self.pred_class.shape[0]
-        for c_j in range(self.data.c):
-            true_binary = self.y_true.squeeze(1) == c_j
-            total_true = true_binary.view(n,-1).sum(dim=1).float()
-            for c_i in range(self.data.c):
-                pred_binary = self.pred_class == c_i
-                total_intersect = (true_binary*pred_binary).view(n,-1).sum(dim=1).float()
-                p_given_t = (total_intersect / (total_true))
-                p_given_t_mean = p_given_t[~torch.isnan(p_given_t)].mean()
-                single_img_confusion.append(p_given_t)
-                mean_confusion.append(p_given_t_mean)
-        self.single_img_cm = to_np(torch.stack(single_img_confusion).permute(1,0).view(-1, self.data.c, self.data.c))
-        self.mean_cm = to_np(torch.tensor(mean_confusion).view(self.data.c, self.data.c))
+        total, count = torch.zeros(c,c), torch.zeros(c,c)
+        for pred_class,targ in zip(self.pred_class.split(chunk_size), y_true.split(chunk_size)):
+            p_given_t = _p_given_t(_confusion_counts(pred_class, targ, c)).cpu()
+            s,n = _nanmean_images(p_given_t)
+            total += s; count += n
+            single_img_confusion.append(p_given_t)
+        self.single_img_cm = to_np(torch.cat(single_img_confusion))
+        self.mean_cm = to_np(total / count)
         return self.mean_cm, self.single_img_cm
 
     def _plot_intersect_cm(self, cm, title="Intersection with Predict given True"):
@@ -98,6 +114,49 @@ class SegmentationInterpretation(Interpretation):
 
 
 
+class SegmentationStats():
+    "Streaming interpretation: confusion matrices and top-k worst images from one pass, without keeping preds or losses"
+    def __init__(self, mean_cm:np.ndarray, single_img_cm:np.ndarray, losses:Tensor, worst:Collection):
+        self.mean_cm,self.single_img_cm,self.losses = mean_cm,single_img_cm,losses
+        # worst = [(loss, idx, pred_class)] sorted from largest to smallest loss
+        self.worst = worst
+        self.pred_class = {i:p for _,i,p in worst}
+
+    @classmethod
+    def from_learner(cls, learn:Learner, ds_type:DatasetType=DatasetType.Valid, k:int=16):
+        "Stream `ds_type` through `learn.model`; memory is bounded by one batch plus the k worst pred masks"
+        dl = learn.dl(ds_type)
+        c = learn.data.c
+        total, count = torch.zeros(c,c), torch.zeros(c,c)
+        single_img_confusion, all_losses, heap = [], [], []
+        learn.model.eval()
+        with torch.no_grad():
+            i = 0
+            for xb,yb in dl:
+                out = learn.model(xb)
+                with NoneReduceOnCPU(learn.loss_func) as lf:
+                    losses = lf(out, yb).view(out.shape[0], -1).mean(-1).cpu()
+                pred_class = out.argmax(dim=1)
+                p_given_t = _p_given_t(_confusion_counts(pred_class, yb.view(pred_class.shape), c)).cpu()
+                s,n = _nanmean_images(p_given_t)
+                total += s; count += n
+                single_img_confusion.append(p_given_t)
+                all_losses.append(losses)
+                # bounded min-heap keeps the k largest losses seen so far
+                pred_class = pred_class.to(torch.uint8).cpu()
+                for j,l in enumerate(losses.tolist()):
+                    item = (l, i+j, pred_class[j])
+                    if len(heap) < k: heapq.heappush(heap, item)
+                    elif l > heap[0][0]: heapq.heapreplace(heap, item)
+                i += out.shape[0]
+        worst = sorted(heap, key=lambda t: t[0], reverse=True)
+        return cls(to_np(total / count), to_np(torch.cat(single_img_confusion)), torch.cat(all_losses), worst)
+
+    def top_losses(self, k:int=None, largest=True):
+        "Per image mean losses and indices, like `SegmentationInterpretation.top_losses`"
+        return self.losses.topk(ifnone(k, len(self.losses)), largest=largest)
+
+
 class ObjectDetectionInterpretation(Interpretation):
     "Interpretation methods for classification models."
     def __init__(self, learn:Learner, preds:Tensor, y_true:Tensor, losses:Tensor, ds_type:DatasetType=DatasetType.Valid):
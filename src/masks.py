@@ -0,0 +1,123 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Python version of the segmentation mask part of plot_wavefield.m. Builds the
+# _mask.png (../labels) or _targ.png (../test/targets) class label from the bottom
+# surface nodes of an ANSYS disp.txt export:
+#   - duplicate (x,y) bottom nodes collapse to the highest z (lexsort instead of sortrows + uniquetol)
+#   - nearest-neighbour lookup onto the 1 mm grid with a KD-tree (index map cached per node layout)
+#   - Canny edges, plus-shaped edge dilation and disk(4) grey dilation with scipy.ndimage
+#   - rounding into the classes of the class file (codes.txt)
+# Batch mode processes a whole data directory across worker processes.
+#
+# Usage: python masks.py [disp files...] [--workers N] [--class-file codes.txt]
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+from scipy import ndimage
+from scipy.spatial import cKDTree
+from skimage.feature import canny
+
+from rasterize import data_dir, grid_points, layout_key, load_disp, split_nodes, base_name
+
+def load_codes(class_file="codes.txt"):
+    "Class file: indexed list of plate thickness classes [mm] (class i = codes[i])"
+    return np.loadtxt(class_file, dtype=float, ndmin=1)
+
+def dedup_highest(x, y, z, tol:float=1e-9):
+    "Keep one node per (x,y) (within tol), the one with the highest z"
+    xq, yq = np.round(x/tol).astype(np.int64), np.round(y/tol).astype(np.int64)
+    order = np.lexsort((-z, yq, xq))       # sort by x, then y, then z descending
+    xs, ys = xq[order], yq[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])
+    keep = order[first]
+    return x[keep], y[keep], z[keep]
+
+class NearestCache():
+    "Nearest-node index of every grid point, keyed by the bottom node layout (in memory)"
+    def __init__(self):
+        self.mem = {}
+
+    def get(self, x, y, x_width, y_width, Nx, Ny):
+        key = layout_key(x, y, (Nx, Ny, round(x_width*1e6), round(y_width*1e6)))
+        if key not in self.mem:
+            tree = cKDTree(np.column_stack([x, y]))
+            _, idx = tree.query(grid_points(x_width, y_width, Nx, Ny))
+            self.mem[key] = idx.reshape(Ny, Nx)
+        return self.mem[key]
+
+def canny_edges(img, sigma:float=np.sqrt(2), not_edges:float=0.7):
+    "Canny edges with MATLAB edge(...,'Canny') default thresholds (70% non-edge pixels, low = 0.4*high)"
+    smooth = ndimage.gaussian_filter(img, sigma)
+    mag = np.hypot(ndimage.sobel(smooth, 0), ndimage.sobel(smooth, 1))
+    if mag.max() <= 0:
+        return np.zeros(img.shape, dtype=bool)
+    counts, _ = np.histogram(mag/mag.max(), bins=64, range=(0, 1))
+    high = (np.argmax(np.cumsum(counts) > not_edges*img.size) + 1)/64
+    # scale so the gradient magnitude peaks at 1, like MATLAB's normalized magnitude
+    return canny(img/mag.max(), sigma=sigma, low_threshold=0.4*high, high_threshold=high)
+
+DISK4 = np.hypot(*np.mgrid[-4:5, -4:5]) <= 4
+
+def class_mask(plate, codes, cache:NearestCache=None):
+    """Segmentation mask (uint8 class values) from a split_nodes() plate.
+    class = round(1000*(max thickness - local thickness)); 0 is the full-thickness plate.
+    """
+    cache = NearestCache() if cache is None else cache
+    x, y, z = dedup_highest(plate['x_bottom'], plate['y_bottom'], plate['z_bottom'])
+    idx = cache.get(x, y, plate['x_width'], plate['y_width'], plate['Nx'], plate['Ny'])
+    z_seg = np.flip(z[idx], 0) # flip matrix vertically for displaying as image
+
+    # Clean up edges of defect regions (artifact of internal wall clusters)
+    e = canny_edges(z_seg)
+    e = ndimage.binary_dilation(e, ndimage.generate_binary_structure(2, 1)) # plus-shaped
+    z_dilate = ndimage.grey_dilation(z_seg, footprint=DISK4)
+    z_seg[e] = z_dilate[e]
+
+    # Convert to class pixel values: class = max_thick - local_thick
+    thick_max = codes.max()*10**(-3)
+    local_thick = plate['plate_thickness'] - z_seg
+    class_seg = np.round(1000*(thick_max - local_thick))
+    return np.clip(class_seg, 0, 255).astype(np.uint8) # convert to 8-bit (0-255)
+
+def mask_path(base_file, root=Path("..")):
+    "Where plot_wavefield.m writes the class label for a file"
+    if 'test_' in base_file:
+        return Path(root)/'test'/'targets'/f'{base_file}_targ.png'
+    return Path(root)/'labels'/f'{base_file}_mask.png'
+
+# per-process state for batch mode (class file and nearest-index cache loaded once)
+_worker = {}
+
+def _init_worker(class_file):
+    _worker['codes'] = load_codes(class_file)
+    _worker['cache'] = NearestCache()
+
+def _mask_file(fn):
+    base_file = base_name(fn)
+    mask = class_mask(split_nodes(load_disp(fn, ('x','y','z'))), _worker['codes'], _worker['cache'])
+    PIL.Image.fromarray(mask).save(mask_path(base_file))
+    return base_file
+
+def make_masks(files, class_file="codes.txt", workers:int=None):
+    "Write the masks of all files across `workers` processes; yields base names as they finish"
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(class_file,)) as ex:
+        yield from ex.map(_mask_file, files, chunksize=max(1, len(files)//(4*(workers or os.cpu_count() or 1))))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build segmentation masks from ANSYS disp.txt exports')
+    parser.add_argument('files', nargs='*', help='disp.txt files (default: all *_disp.txt in ../data)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--class-file', default='codes.txt')
+    args = parser.parse_args()
+
+    files = args.files or sorted(str(f) for f in data_dir.glob('*_disp.txt'))
+    for base_file in make_masks(files, args.class_file, args.workers):
+        print(f'Mask saved for {base_file}')
@@ -0,0 +1,122 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Confusion-matrix based IoU and F1 (dice) metrics for multi-class segmentation.
+# Every pixel is mapped to the index C*target + pred and counted with a single
+# bincount, so no one-hot [B,H,W,C] tensor is ever allocated. Counts can be
+# accumulated over batches (epoch-level IoU) or kept per image (per-image IoU).
+# The soft IoU (differentiable, for use as a loss) is still available.
+
+import numpy as np
+import torch
+from torch.nn import functional as F
+
+def _class_map(preds:torch.Tensor, targs:torch.Tensor):
+    "Return (pred_class [B,H,W], targs [B,H,W], num_classes) from logits or class indices"
+    targs = targs.view(targs.shape[0], *targs.shape[-2:]).long()
+    if preds.ndim == 4 and preds.shape[1] == 1:     # single class (sigmoid) logits
+        return (preds[:, 0] > 0).long(), targs, 2
+    if preds.ndim == 4:                              # [B,C,H,W] logits
+        return preds.max(dim=1).indices, targs, preds.shape[1] # same as argmax, much faster on cpu
+    return preds.view_as(targs).long(), targs, None  # already class indices
+
+def confusion_matrix(preds:torch.Tensor, targs:torch.Tensor, num_classes:int=None,
+                     per_image:bool=False):
+    """Count (true,pred) pixel pairs with one bincount.
+    Args:
+        preds: logits [B,C,H,W] or predicted classes [B,H,W] / [B,1,H,W]
+        targs: target classes [B,H,W] or [B,1,H,W]
+        num_classes: required when preds are class indices
+        per_image: return one matrix per image instead of the batch sum
+    Returns:
+        cm: int64 tensor [C,C] (or [B,C,C]); rows = true class, columns = predicted class
+    """
+    pred_class, targs, c = _class_map(preds, targs)
+    c = c if num_classes is None else num_classes
+    idx = c*targs + pred_class
+    if per_image:
+        n = idx.shape[0]
+        idx = idx + (c*c)*torch.arange(n, device=idx.device).view(-1, 1, 1)
+        return torch.bincount(idx.flatten(), minlength=n*c*c).view(n, c, c)
+    return torch.bincount(idx.flatten(), minlength=c*c).view(c, c)
+
+def iou_from_cm(cm):
+    "Per-class IoU from confusion matrices [...,C,C]; nan where a class is absent from both"
+    cm = torch.as_tensor(cm).double()
+    inter = cm.diagonal(dim1=-2, dim2=-1)
+    union = cm.sum(-1) + cm.sum(-2) - inter
+    return inter / union
+
+def f1_from_cm(cm):
+    "Per-class F1 (dice) from confusion matrices [...,C,C]; nan where a class is absent from both"
+    cm = torch.as_tensor(cm).double()
+    inter = cm.diagonal(dim1=-2, dim2=-1)
+    return 2*inter / (cm.sum(-1) + cm.sum(-2))
+
+def nanmean(x:torch.Tensor, dim=-1):
+    "Mean over non-nan entries (classes that never appear are ignored)"
+    valid = ~torch.isnan(x)
+    return torch.where(valid, x, torch.zeros_like(x)).sum(dim) / valid.sum(dim)
+
+def soft_iou(preds:torch.Tensor, targs:torch.Tensor, eps:float=1e-8):
+    """Differentiable (soft) mean class IoU from logits, for use as a loss (1 - soft_iou).
+    The intersection only needs the probability of the true class at each pixel, which is
+    gathered and scatter-added per class instead of multiplying by a one-hot target.
+    """
+    targs = targs.view(targs.shape[0], 1, *targs.shape[-2:]).long()
+    if preds.shape[1] == 1:
+        pos_prob = torch.sigmoid(preds)
+        probas = torch.cat([1 - pos_prob, pos_prob], dim=1)
+    else:
+        probas = F.softmax(preds, dim=1)
+    c = probas.shape[1]
+    t = targs.flatten()
+    p_true = probas.gather(1, targs).flatten()
+    intersection = torch.zeros(c, dtype=probas.dtype, device=probas.device).scatter_add(0, t, p_true)
+    target_sum = torch.bincount(t, minlength=c).to(probas.dtype)
+    cardinality = probas.sum(dim=(0, 2, 3)) + target_sum
+    union = cardinality - intersection
+    return (intersection / (union + eps)).mean()
+
+def iou_score(preds:torch.Tensor, targs:torch.Tensor, soft:bool=False, eps:float=1e-8):
+    "Mean class IoU of a batch; hard (argmax) by default, soft probabilities with soft=True"
+    if soft:
+        return soft_iou(preds, targs, eps)
+    return nanmean(iou_from_cm(confusion_matrix(preds, targs))).float()
+
+def f1_score(preds:torch.Tensor, targs:torch.Tensor):
+    "Mean class F1 (dice) of a batch from the argmax prediction"
+    return nanmean(f1_from_cm(confusion_matrix(preds, targs))).float()
+
+class ConfusionMatrix():
+    "Accumulate confusion counts over batches; read out epoch-level and per-image IoU/F1"
+    def __init__(self, num_classes:int=None, keep_images:bool=False):
+        self.num_classes, self.keep_images = num_classes, keep_images
+        self.reset()
+
+    def reset(self):
+        self.cm = None
+        self.image_cms = []
+
+    def update(self, preds:torch.Tensor, targs:torch.Tensor):
+        "Add a batch of logits [B,C,H,W] (or class maps) and targets"
+        cms = confusion_matrix(preds, targs, self.num_classes, per_image=self.keep_images)
+        if self.keep_images:
+            self.image_cms.append(cms.cpu())
+            cms = cms.sum(0)
+        self.cm = cms.cpu() if self.cm is None else self.cm + cms.cpu()
+        self.num_classes = self.cm.shape[0]
+        return self
+
+    def iou(self): return iou_from_cm(self.cm)
+    def f1(self): return f1_from_cm(self.cm)
+    def miou(self): return nanmean(self.iou()).item()
+    def mf1(self): return nanmean(self.f1()).item()
+
+    def image_iou(self):
+        "Per-image per-class IoU [N,C] (requires keep_images=True)"
+        return iou_from_cm(torch.cat(self.image_cms)) if self.image_cms else None
+
+    def to_np(self):
+        return np.asarray(self.cm)
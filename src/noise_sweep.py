@@ -0,0 +1,129 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Noise robustness sweep without intermediate files. Replaces noise.py (writing 8
+# _gauss_<i> PNGs per image to ../noise) + inference on those files + scoring in MATLAB.
+# Test images are decoded once per batch; the noisy copies for every variance are made
+# in memory with augment.gaussian_batch (same noise and uint8 quantization as the saved
+# PNGs), pushed through the model and scored against ../test/targets right away. Per
+# variance the confusion counts over the whole test set and the per-image binary
+# defect IoU are accumulated (evaluate.py metrics), giving an IoU-vs-variance curve
+# overall and per defect class.
+#
+# Usage: python noise_sweep.py [--var 0 0.001 ...] [--artifact ../models/unet.pt] [--bs 8]
+
+import argparse
+import csv
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+import torch
+
+from augment import gaussian_batch
+from evaluate import binary_iou, class_iou, image_confusion
+from inference import IMAGENET_STATS, normalize, predict_masks, prefetch
+from masks import load_codes
+from noise import variance as NOISE_VARIANCES
+
+test_dir = Path("../test")
+out_dir = Path("../output/metrics")
+token = '_real'
+
+def test_pairs(test_dir=test_dir):
+    "(image, target) files of the test set that have a target mask"
+    out = []
+    for img in sorted((Path(test_dir)/"testset").glob(f'*{token}.png')):
+        targ = Path(test_dir)/"targets"/f'{img.name.split(token)[0]}_targ.png'
+        if targ.exists():
+            out.append((img, targ))
+    return out
+
+def _decoded(pairs, bs, seeds):
+    "Batches of (gray uint8 images [B,H,W], targets [B,H,W], per-image seeds), decoded once"
+    for i in range(0, len(pairs), bs):
+        chunk = pairs[i:i+bs]
+        imgs = np.stack([np.array(PIL.Image.open(img).convert('L')) for img,_ in chunk])
+        targs = np.stack([np.array(PIL.Image.open(targ)) for _,targ in chunk])
+        yield imgs, targs, seeds[i:i+bs]
+
+def to_input(imgs, stats=IMAGENET_STATS):
+    "uint8 gray images [B,H,W] -> normalized [B,3,H,W], as fastai open_image reads the saved PNGs"
+    x = torch.from_numpy(imgs).float().div_(255)[:,None].repeat(1, 3, 1, 1)
+    return normalize(x, stats)
+
+def noise_sweep(model, pairs, variances, num_classes:int, bs:int=8, stats=IMAGENET_STATS, seed:int=0,
+                device=None, verbose:bool=True):
+    """IoU of the model on the test set at every noise variance (0 = clean images).
+    Args:
+        pairs: (image, target) files, see test_pairs()
+        variances: gaussian noise variances (of images scaled to [0,1])
+    Returns:
+        dict: variances, confusion [V,C,C], class_iou [V,C], miou [V], binary_iou [V]
+              (mean over images of the defect vs plate IoU)
+    """
+    variances = list(variances)
+    V, C = len(variances), num_classes
+    cms = np.zeros((V, C, C), dtype=np.int64)
+    binary = [[] for _ in range(V)]
+    levels = [i for i,v in enumerate(variances) if v > 0]
+    seeds = np.random.SeedSequence(seed).spawn(len(pairs)) # same noise for any batch size
+    if isinstance(model, torch.nn.Module):
+        model.eval()
+    done = 0
+    with torch.no_grad():
+        for imgs, targs, batch_seeds in prefetch(_decoded(pairs, bs, seeds)):
+            noisy = np.repeat(imgs[:,None], V, axis=1)     # [B,V,H,W]; variance 0 stays clean
+            if levels:
+                for j, s in enumerate(batch_seeds):
+                    noisy[j, levels] = gaussian_batch(imgs[j:j+1], [variances[i] for i in levels],
+                                                      np.random.default_rng(s))[0]
+            for i in range(V):
+                masks = predict_masks(model, to_input(noisy[:,i], stats), device)
+                for mask, targ in zip(masks, targs):
+                    cm = image_confusion(targ, mask, C)
+                    cms[i] += cm
+                    binary[i].append(binary_iou(cm))
+            done += len(imgs)
+            if verbose:
+                print(f'Swept {done}/{len(pairs)} images over {V} noise levels')
+    iou = class_iou(cms)
+    return dict(variances=np.array(variances), confusion=cms, class_iou=iou, miou=np.nanmean(iou, axis=1),
+                binary_iou=np.array([np.nanmean(b) if b else np.nan for b in binary]))
+
+def save(res, codes, out=out_dir, name:str='noise_sweep'):
+    "Write <name>.csv (one row per variance) and <name>.npz"
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    with open(out/f'{name}.csv', 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['variance', 'miou', 'binary_iou'] + [f'iou_{c:g}mm' for c in codes])
+        for v, m, b, iou in zip(res['variances'], res['miou'], res['binary_iou'], res['class_iou']):
+            w.writerow([f'{v:g}', f'{m:.4f}', f'{b:.4f}'] + [f'{x:.4f}' for x in iou])
+    np.savez(out/f'{name}.npz', codes=np.asarray(codes), **res)
+    return out/f'{name}.csv'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='IoU vs gaussian noise variance on ../test/testset (no files written)')
+    parser.add_argument('--var', type=float, nargs='*', default=[0.0] + NOISE_VARIANCES, help='noise variances (0 = clean)')
+    parser.add_argument('--artifact', default=None, help='TorchScript/ONNX artifact from export_model.py (no fastai)')
+    parser.add_argument('--file', default='export_0_0009_KH.pkl', help='learner .pkl in ../models (without --artifact)')
+    parser.add_argument('--bs', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--class-file', default='codes.txt')
+    args = parser.parse_args()
+
+    codes = load_codes(args.class_file)
+    if args.artifact is not None:
+        from deploy import artifact_stats, load_artifact
+        model, meta = load_artifact(args.artifact)
+        stats = artifact_stats(meta)
+    else:
+        from export_model import load_fastai_learner
+        model, stats = load_fastai_learner(file=args.file).model, IMAGENET_STATS
+    res = noise_sweep(model, test_pairs(), args.var, len(codes), args.bs, stats, args.seed)
+    fn = save(res, codes)
+    for v, m, b in zip(res['variances'], res['miou'], res['binary_iou']):
+        print(f'variance {v:<8g} mIoU {m:.4f}  binary IoU {b:.4f}')
+    print(f'Results saved to {fn}')
@@ -0,0 +1,292 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Long-lived postprocessing workers for disp.txt exports. run_matlab.exec_matlab starts
+# a MATLAB engine for every file; here each worker process starts its backend once
+# (MATLAB engine, or class file + interpolation/nearest-node caches of the Python
+# version) and then takes file jobs from its own queue. The pool hands out jobs as
+# workers become free, returns a Future per file, kills and restarts a worker whose job
+# runs past the timeout, and restarts workers that crash (the job fails, the pool goes on).
+#   PythonBackend : rasterize.py images + masks.py labels (+ optional _vqz.mat and GIF)
+#   MatlabBackend : plot_wavefield.m through one matlab.engine per worker (eng.quit() at the end)
+#
+# Usage: python postprocess_pool.py [disp files...] [--backend python|matlab] [--workers 2] [--timeout 600]
+
+import argparse
+import collections
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+import PIL.Image
+
+class Backend():
+    "Postprocessing of one disp.txt file; start() runs once in each worker process"
+    def start(self):
+        pass
+
+    def process(self, disp_file):
+        "Write the outputs of one export; returns the files written"
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class PythonBackend(Backend):
+    "Python version of plot_wavefield.m (images, class label, ExportMat, MakeGif)"
+    def __init__(self, class_file='codes.txt', export_mat:bool=False, make_gif:bool=False, root=Path("..")):
+        self.class_file, self.export_mat, self.make_gif, self.root = class_file, export_mat, make_gif, Path(root)
+
+    def start(self):
+        from masks import NearestCache, load_codes
+        from rasterize import InterpCache
+        self.codes = load_codes(self.class_file)
+        self.interp, self.nearest = InterpCache(), NearestCache()
+
+    def process(self, disp_file):
+        from masks import class_mask, mask_path
+        from rasterize import base_name, save_mat, save_wavefield, wavefields
+        base_file = base_name(disp_file)
+        _, plate, vq_z = next(wavefields([disp_file], self.interp))
+        save_wavefield(base_file, vq_z.real, vq_z.imag, self.root)
+        mask = mask_path(base_file, self.root)
+        PIL.Image.fromarray(class_mask(plate, self.codes, self.nearest)).save(mask)
+        outputs = [str(mask)]
+        if 'test_' in base_file:
+            outputs.append(str(self.root/'test'/'testset'/f'{base_file}_real.png'))
+        else:
+            outputs += [str(self.root/'images'/f'{base_file}_{p}.png') for p in ('real', 'imaginary')]
+        if self.export_mat:
+            save_mat(base_file, vq_z, self.root)
+            outputs.append(str(self.root/'output'/'mat'/f'{base_file}_vqz.mat'))
+        if self.make_gif:
+            import numpy as np
+            from animate import render
+            outputs.append(str(render(np.flip(vq_z, 0), self.root/'output'/'gifs'/f'{base_file}_wavefield.gif')))
+        return outputs
+
+class MatlabBackend(Backend):
+    "plot_wavefield.m in one MATLAB engine per worker (started once, shut down with eng.quit())"
+    def __init__(self, src_dir='.', **kwargs):
+        self.src_dir, self.kwargs = str(Path(src_dir).resolve()), kwargs   # Name-Value args, e.g. ExportMat=True
+
+    def start(self):
+        import matlab.engine
+        self.eng = matlab.engine.start_matlab()
+        self.eng.cd(self.src_dir, nargout=0)
+
+    def process(self, disp_file):
+        args = [a for kv in self.kwargs.items() for a in kv]
+        self.eng.plot_wavefield(Path(disp_file).name, *args, nargout=1)
+        return []
+
+    def close(self):
+        eng, self.eng = getattr(self, 'eng', None), None
+        if eng is not None:
+            eng.quit()
+
+BACKENDS = {'python': PythonBackend, 'matlab': MatlabBackend}
+
+def _worker(wid, gen, backend, inbox, results):
+    "Worker process: start the backend once, then run jobs until the None sentinel"
+    try:
+        backend.start()
+    except Exception as err:
+        results.put(('start_failed', wid, gen, repr(err)))
+        return
+    results.put(('ready', wid, gen, os.getpid()))
+    try:
+        while True:
+            job = inbox.get()
+            if job is None:
+                break
+            job_id, disp_file = job
+            try:
+                results.put(('done', wid, gen, job_id, backend.process(disp_file)))
+            except Exception as err:
+                results.put(('error', wid, gen, job_id, repr(err)))
+    finally:
+        backend.close()
+
+class _Slot():
+    "Parent-side state of one worker"
+    __slots__ = ('proc', 'inbox', 'gen', 'ready', 'job', 'started')
+
+class PostprocessPool():
+    """Pool of warm postprocessing workers.
+    Args:
+        backend: Backend instance (copied into every worker)
+        timeout: seconds per job before the worker is killed and restarted (None: no limit)
+        max_start_failures: consecutive failed worker starts before the pool gives up
+    submit(disp_file) returns a Future with the list of output files; use as a context manager.
+    """
+    def __init__(self, backend:Backend, workers:int=2, timeout:float=None, max_start_failures:int=3):
+        self.backend, self.timeout, self.max_start_failures = backend, timeout, max_start_failures
+        self.ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+        self.results = self.ctx.Queue()
+        self.pending = collections.deque()
+        self.lock = threading.Lock()
+        self.closing, self.broken = False, None
+        self.start_failures, self.restarts, self.next_id, self.start_error = 0, 0, 0, None
+        self.slots = [_Slot() for _ in range(workers)]
+        for wid, slot in enumerate(self.slots):
+            slot.gen = -1
+            self._spawn(wid)
+        self.monitor = threading.Thread(target=self._monitor, daemon=True)
+        self.monitor.start()
+
+    def _spawn(self, wid):
+        slot = self.slots[wid]
+        slot.gen += 1
+        slot.inbox, slot.ready, slot.job, slot.started = self.ctx.Queue(), False, None, None
+        slot.proc = self.ctx.Process(target=_worker, args=(wid, slot.gen, self.backend, slot.inbox, self.results),
+                                     daemon=True)
+        slot.proc.start()
+
+    def _restart(self, wid):
+        slot = self.slots[wid]
+        if slot.proc.is_alive():
+            slot.proc.terminate()
+        slot.proc.join(5)
+        self.restarts += 1
+        self._spawn(wid)
+
+    def submit(self, disp_file):
+        fut = Future()
+        with self.lock:
+            if self.closing or self.broken:
+                raise RuntimeError(self.broken or 'pool is shut down')
+            self.pending.append((self.next_id, str(disp_file), fut))
+            self.next_id += 1
+        return fut
+
+    def map(self, files):
+        "Results dicts (file, status, outputs, error, seconds) in input order"
+        futs = [(fn, self.submit(fn), time.perf_counter()) for fn in files]
+        for fn, fut, t in futs:
+            err = fut.exception()
+            yield dict(file=str(fn), status='ok' if err is None else 'failed', outputs=[] if err else fut.result(),
+                       error=None if err is None else repr(err), seconds=time.perf_counter() - t)
+
+    def _finish(self, slot, result=None, error=None):
+        fut = slot.job[2]
+        slot.job = slot.started = None
+        if error is None:
+            fut.set_result(result)
+        else:
+            fut.set_exception(error)
+
+    def _handle(self, msg):
+        kind, wid, gen = msg[:3]
+        slot = self.slots[wid]
+        if gen != slot.gen:
+            return              # message of a worker that was already replaced
+        if kind == 'ready':
+            slot.ready, self.start_failures = True, 0
+        elif kind == 'start_failed':
+            self.start_error = msg[3]    # the worker exits; _check_workers restarts it
+        elif slot.job is not None and slot.job[0] == msg[3]:
+            if kind == 'done':
+                self._finish(slot, result=msg[4])
+            else:
+                self._finish(slot, error=RuntimeError(f'{slot.job[1]}: {msg[4]}'))
+
+    def _check_workers(self):
+        now = time.perf_counter()
+        for wid, slot in enumerate(self.slots):
+            if slot.job is not None and self.timeout is not None and now - slot.started > self.timeout:
+                disp_file = slot.job[1]
+                self._finish(slot, error=TimeoutError(f'{disp_file}: no result after {self.timeout} s'))
+                self._restart(wid)
+            elif not slot.proc.is_alive() and slot.proc.exitcode is not None:
+                if slot.job is not None:
+                    disp_file = slot.job[1]
+                    self._finish(slot, error=RuntimeError(f'{disp_file}: worker crashed (exit code {slot.proc.exitcode})'))
+                    self._restart(wid)
+                elif slot.ready:
+                    self._restart(wid)
+                else:
+                    self.start_failures += 1
+                    if self.start_failures >= self.max_start_failures:
+                        self.broken = (f'backend failed to start {self.start_failures} times: '
+                                       f'{self.start_error or f"exit code {slot.proc.exitcode}"}')
+                        return
+                    self._restart(wid)
+
+    def _assign(self):
+        with self.lock:
+            for slot in self.slots:
+                if slot.ready and slot.job is None and self.pending:
+                    job_id, disp_file, fut = self.pending.popleft()
+                    if not fut.set_running_or_notify_cancel():
+                        continue
+                    slot.job, slot.started = (job_id, disp_file, fut), time.perf_counter()
+                    slot.inbox.put((job_id, disp_file))
+
+    def _monitor(self):
+        while True:
+            self._assign()
+            try:
+                self._handle(self.results.get(timeout=0.05))
+            except queue.Empty:
+                pass
+            self._check_workers()
+            if self.broken:
+                with self.lock:
+                    jobs = list(self.pending) + [s.job for s in self.slots if s.job is not None]
+                    self.pending.clear()
+                for _, _, fut in jobs:
+                    if not fut.done():
+                        fut.set_exception(RuntimeError(self.broken))
+                break
+            with self.lock:
+                idle = self.closing and not self.pending and all(s.job is None for s in self.slots)
+            if idle:
+                break
+        for slot in self.slots:
+            if slot.proc.is_alive():
+                slot.inbox.put(None)
+        for slot in self.slots:
+            slot.proc.join(30)
+            if slot.proc.is_alive():
+                slot.proc.terminate()
+
+    def shutdown(self, wait:bool=True):
+        "Finish the queued jobs, stop the workers (backend.close()) and the monitor"
+        with self.lock:
+            self.closing = True
+        if wait:
+            self.monitor.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Postprocess disp.txt exports with a pool of warm workers')
+    parser.add_argument('files', nargs='*', help='disp.txt files (default: all *_disp.txt in ../data)')
+    parser.add_argument('--backend', choices=list(BACKENDS), default='python')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--timeout', type=float, default=600, help='seconds per file before its worker is restarted')
+    parser.add_argument('--export-mat', action='store_true', help='also write ../output/mat/<base>_vqz.mat')
+    args = parser.parse_args()
+
+    files = args.files or sorted(str(f) for f in Path("../data").glob('*_disp.txt'))
+    if args.backend == 'python':
+        backend = PythonBackend(export_mat=args.export_mat)
+    else:
+        backend = MatlabBackend(**({'ExportMat': True} if args.export_mat else {}))
+    t = time.perf_counter()
+    with PostprocessPool(backend, args.workers, args.timeout) as pool:
+        for res in pool.map(files):
+            print(f'{res["status"]:<7}{Path(res["file"]).name} ({res["seconds"]:.1f} s)' +
+                  (f'  {res["error"]}' if res['error'] else ''))
+        restarts = pool.restarts
+    print(f'{len(files)} files in {time.perf_counter() - t:.1f} s, {restarts} worker restarts')
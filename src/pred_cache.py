@@ -0,0 +1,157 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Content-addressed prediction cache for repeated test runs. An entry is keyed by
+# sha1(model hash, input file hash, inference settings) and holds the uint8
+# mask (and optionally float16 class probabilities) as one .npz file in
+# data/.cache/pred/. Unchanged inputs are served from the cache instead of running the
+# model again; changing the model (file or weights), an input image or a setting changes the key.
+# The cache is bounded in size: least recently used entries are evicted first.
+#
+# Usage: python pred_cache.py stats | clear | evict [--max-gb 2]
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from disp_cache import file_sha1
+
+cache_dir = Path("../data")/".cache"/"pred"
+MAX_BYTES = 2*1024**3   # default size bound (2 GB)
+
+def _hash_value(h, name, v):
+    "Feed a state_dict value (tensor, quantized tensor, packed params tuple, scalar) into a hash"
+    if isinstance(v, (tuple, list)):
+        for i, x in enumerate(v):
+            _hash_value(h, f'{name}.{i}', x)
+        return
+    if not isinstance(v, torch.Tensor):
+        h.update(f'{name}:{v!r}'.encode())
+        return
+    t = v.detach().cpu()
+    h.update(f'{name}:{t.dtype}:{tuple(t.shape)}'.encode())
+    if t.is_quantized:
+        if t.qscheme() in (torch.per_tensor_affine, torch.per_tensor_symmetric):
+            h.update(f'{t.q_scale()}:{t.q_zero_point()}'.encode())
+        else:
+            _hash_value(h, f'{name}.scales', t.q_per_channel_scales())
+            _hash_value(h, f'{name}.zero_points', t.q_per_channel_zero_points())
+        t = t.int_repr()
+    elif t.dtype == torch.bfloat16:
+        t = t.float()   # no numpy bfloat16; the dtype is already part of the hash
+    h.update(t.numpy().tobytes())
+
+def model_hash(model):
+    """Hash identifying a model: sha1 of an artifact/.pkl file, or of a loaded module (its class,
+    module tree, and state_dict names, dtypes and values), so in-memory transforms such as
+    .half(), fused or quantized modules change the hash.
+    """
+    if isinstance(model, (str, Path)):
+        return file_sha1(model)
+    h = hashlib.sha1()
+    h.update(f'{type(model).__module__}.{type(model).__qualname__}'.encode())
+    h.update(repr(model).encode())
+    for name, v in sorted(model.state_dict().items()):
+        _hash_value(h, name, v)
+    return h.hexdigest()
+
+class PredictionCache():
+    "Size-bounded LRU cache of predicted masks/probabilities stored as .npz files"
+    def __init__(self, path=cache_dir, max_bytes:int=MAX_BYTES):
+        self.path, self.max_bytes = Path(path), max_bytes
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.hits = self.misses = 0
+        self._hashes = {}    # (path, size, mtime_ns) -> sha1 of files seen by this process
+        self.nbytes = sum(f.stat().st_size for f in self.path.glob('*.npz'))
+
+    def input_hash(self, fn):
+        "sha1 of an input file (memoized per size/mtime within this process)"
+        st = os.stat(fn)
+        k = (str(fn), st.st_size, st.st_mtime_ns)
+        if k not in self._hashes:
+            self._hashes[k] = file_sha1(fn)
+        return self._hashes[k]
+
+    def key(self, model_key, fn, settings=None):
+        "Entry key of (model hash, input file, settings dict)"
+        h = hashlib.sha1()
+        h.update(str(model_key).encode())
+        h.update(self.input_hash(fn).encode())
+        h.update(json.dumps(settings or {}, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def _file(self, key): return self.path/f'{key}.npz'
+
+    def get(self, key):
+        "Cached {'mask', ['probs']} arrays, or None"
+        fn = self._file(key)
+        try:
+            with np.load(fn) as f:
+                entry = {k: f[k] for k in f.files}
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(fn) # mark as recently used
+        self.hits += 1
+        return entry
+
+    def put(self, key, mask, probs=None):
+        "Store a mask (and float16 probabilities) and evict old entries beyond the size bound"
+        fn = self._file(key)
+        old = fn.stat().st_size if fn.exists() else 0
+        arrays = dict(mask=np.asarray(mask, dtype=np.uint8))
+        if probs is not None:
+            arrays['probs'] = np.asarray(probs, dtype=np.float16)
+        tmp = fn.with_name(fn.name + '.tmp')     # not *.npz: never counted, read or evicted as an entry
+        with open(tmp, 'wb') as f:              # file object: numpy would append .npz to a name
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, fn)
+        self.nbytes += fn.stat().st_size - old
+        if self.nbytes > self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes:int=None):
+        "Delete least recently used entries until the cache fits in max_bytes; returns the number removed"
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted((f.stat().st_mtime_ns, f.stat().st_size, f) for f in self.path.glob('*.npz'))
+        self.nbytes = sum(s for _,s,_ in entries)
+        n = 0
+        for _, size, f in entries:
+            if self.nbytes <= max_bytes:
+                break
+            f.unlink()
+            self.nbytes -= size
+            n += 1
+        return n
+
+    def clear(self):
+        "Invalidate every entry (and leftovers of interrupted writes); returns the number removed"
+        for f in self.path.glob('*.npz.tmp'):
+            f.unlink()
+        return self.evict(0)
+
+    def stats(self):
+        files = list(self.path.glob('*.npz'))
+        return dict(entries=len(files), bytes=sum(f.stat().st_size for f in files), max_bytes=self.max_bytes,
+                    hits=self.hits, misses=self.misses, path=str(self.path))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inspect or invalidate the prediction cache')
+    parser.add_argument('cmd', choices=['stats','clear','evict'])
+    parser.add_argument('--max-gb', type=float, default=MAX_BYTES/1024**3, help='size bound for evict')
+    args = parser.parse_args()
+
+    cache = PredictionCache(max_bytes=int(args.max_gb*1024**3))
+    if args.cmd == 'clear':
+        print(f'Removed {cache.clear()} cached predictions')
+    elif args.cmd == 'evict':
+        print(f'Removed {cache.evict()} cached predictions')
+    else:
+        s = cache.stats()
+        print(f'{s["entries"]} entries, {s["bytes"]/1024**2:.1f} MB of {s["max_bytes"]/1024**2:.0f} MB in {s["path"]}')
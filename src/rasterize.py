@@ -0,0 +1,220 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Python version of the wavefield part of plot_wavefield.m. Turns the 6-column ANSYS
+# disp.txt export (node, x, y, z, z-disp-re, z-disp-im) into the 1 mm grid and saves
+# the _real.png / _imaginary.png images.
+#
+# griddata(...,'linear') rebuilds a Delaunay triangulation on every call. Here the
+# triangulation and the barycentric weights of every grid point are computed once per
+# unique surface-node layout (keyed by a hash of the node coordinates), cached on disk
+# as a sparse [grid points x nodes] matrix, and applied to the real and imaginary
+# fields of many files at once with one sparse matrix product.
+#
+# Usage: python rasterize.py [disp files...] [--export-mat]   (default: all of ../data)
+
+import argparse
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+from scipy import sparse
+from scipy.spatial import Delaunay
+
+from disp_cache import COLUMNS, open_columns
+
+data_dir = Path("../data")
+cache_dir = data_dir/".cache"/"interp"
+
+RESOLUTION = 0.001  # 1 [mm] grid resolution
+TOL = 1e-6          # tolerance for comparing floats
+
+def load_disp(fn, columns=('x','y','z','re','im'), cache:bool=True):
+    """Columns {name: array} of an ANSYS disp.txt export (node, x, y, z, re, im).
+    With cache=True the text is parsed once into the binary columnar cache (disp_cache.py)
+    and only the requested columns are memory-mapped; otherwise the text file is parsed.
+    """
+    if cache:
+        return open_columns(fn, columns)
+    data = np.loadtxt(fn, skiprows=1, ndmin=2)
+    return {name: data[:,COLUMNS.index(name)] for name in columns}
+
+def mode(a):
+    "Most frequent value (smallest one on ties, like MATLAB mode)"
+    vals, counts = np.unique(a, return_counts=True)
+    return vals[np.argmax(counts)]
+
+def split_nodes(cols, resolution:float=RESOLUTION, tol:float=TOL):
+    """Filter the raw ANSYS export and split it into plate surface and bottom nodes.
+    Same assumptions as plot_wavefield.m: rectangular plate centered at (0,0) with its
+    bottom at z=0, and the plate surface holds the most nodes besides the bottom.
+    Args:
+        cols: load_disp() columns; 're' and 'im' may be left out (mask only)
+    Returns:
+        plate: dict with surface (x,y,re,im), bottom (x,y,z) node arrays and the grid
+               size (x_width, y_width, Nx, Ny, plate_thickness)
+    """
+    x_loc, y_loc, z_loc = (np.asarray(cols[c]) for c in ('x','y','z'))
+    z_disp_re, z_disp_im = (np.asarray(cols[c]) if c in cols else None for c in ('re','im'))
+    x_width = 2*x_loc.max()
+    y_width = 2*y_loc.max()
+    M = mode(z_loc)
+    if abs(M - 0.0) < tol: # just in case the bottom of plate had more nodes than the surface
+        M = mode(z_loc[z_loc != M]) # assume surface has the next most nodes
+    plate_thickness = M
+
+    # filter out ANSYS nodes at x=0, transducer nodes and nodes on vertical sides of plate
+    keep = ~((x_loc == 0) | (z_loc > plate_thickness) |
+             (((z_loc < plate_thickness) & (z_loc > 0)) &
+              ((np.abs(x_loc) == x_width/2) | (np.abs(y_loc) == y_width/2))))
+    surf = keep & (np.abs(z_loc - plate_thickness) < tol)
+    bottom = keep & (np.abs(z_loc - plate_thickness) > tol)
+    return dict(x_surf=x_loc[surf] + x_width/2, y_surf=y_loc[surf] + y_width/2,
+                re=None if z_disp_re is None else z_disp_re[surf],
+                im=None if z_disp_im is None else z_disp_im[surf],
+                x_bottom=x_loc[bottom] + x_width/2, y_bottom=y_loc[bottom] + y_width/2,
+                z_bottom=z_loc[bottom], plate_thickness=plate_thickness,
+                x_width=x_width, y_width=y_width,
+                Nx=int(round(x_width/resolution)), Ny=int(round(y_width/resolution)))
+
+def grid_points(x_width, y_width, Nx, Ny):
+    "Grid points [Ny*Nx,2] of meshgrid(linspace(0,x_width,Nx),linspace(0,y_width,Ny)) in row-major order"
+    xq, yq = np.meshgrid(np.linspace(0, x_width, Nx), np.linspace(0, y_width, Ny))
+    return np.column_stack([xq.ravel(), yq.ravel()])
+
+def plate_key(plate):
+    "Layout key of the surface nodes and grid of a split_nodes() plate"
+    return layout_key(plate['x_surf'], plate['y_surf'],
+                      (plate['Nx'], plate['Ny'], round(plate['x_width']/TOL), round(plate['y_width']/TOL)))
+
+def layout_key(x, y, shape):
+    "Hash of the node coordinates (and grid shape) that identifies an interpolation layout"
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(x, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    h.update(np.asarray(shape, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+def interp_weights(points, query):
+    """Linear (barycentric) interpolation weights of `query` points in the Delaunay
+    triangulation of `points`, as a sparse [Nq,Np] matrix, plus the mask of query points
+    outside the convex hull (griddata returns NaN there).
+    """
+    tri = Delaunay(points)
+    simplex = tri.find_simplex(query)
+    outside = simplex < 0
+    simplex[outside] = 0
+    T = tri.transform[simplex]                       # [Nq,3,2] affine maps to barycentric
+    b = np.einsum('nij,nj->ni', T[:,:2], query - T[:,2])
+    weights = np.column_stack([b, 1 - b.sum(axis=1)])
+    weights[outside] = 0
+    rows = np.repeat(np.arange(len(query)), 3)
+    W = sparse.csr_matrix((weights.ravel(), (rows, tri.simplices[simplex].ravel())),
+                          shape=(len(query), len(points)))
+    W.eliminate_zeros()
+    return W, outside
+
+class InterpCache():
+    "Interpolation matrices keyed by node layout; kept in memory and as .npz files on disk"
+    def __init__(self, path=cache_dir):
+        self.path = None if path is None else Path(path)
+        self.mem = {}
+
+    def get(self, plate):
+        "(W, outside) for the surface nodes of a split_nodes() plate"
+        key = plate_key(plate)
+        if key in self.mem:
+            return self.mem[key]
+        fn = None if self.path is None else self.path/f'{key}.npz'
+        if fn is not None and fn.exists():
+            f = np.load(fn)
+            W = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+            outside = f['outside']
+        else:
+            W, outside = interp_weights(np.column_stack([plate['x_surf'], plate['y_surf']]),
+                                        grid_points(plate['x_width'], plate['y_width'], plate['Nx'], plate['Ny']))
+            if fn is not None:
+                self.path.mkdir(parents=True, exist_ok=True)
+                tmp = fn.with_suffix('.tmp.npz')
+                np.savez(tmp, data=W.data, indices=W.indices, indptr=W.indptr,
+                         shape=np.array(W.shape), outside=outside)
+                os.replace(tmp, fn)
+        self.mem[key] = (W, outside)
+        return W, outside
+
+def rasterize(W, outside, fields, Nx, Ny):
+    "Apply interpolation weights to node fields [Np,K] -> grids [K,Ny,Nx] (NaN outside the hull)"
+    out = np.asarray(W @ fields)
+    out[outside] = np.nan
+    return out.T.reshape(-1, Ny, Nx)
+
+def mat2gray(a):
+    "Scale to [0,1] by the image min/max like MATLAB mat2gray (NaNs stay NaN)"
+    lo, hi = np.nanmin(a), np.nanmax(a)
+    return (a - lo) / (hi - lo) if hi > lo else np.zeros_like(a)
+
+def to_uint8(img):
+    "Convert a [0,1] double image to uint8 like MATLAB imwrite (NaN -> 0)"
+    return np.round(255*np.nan_to_num(img, nan=0.0)).astype(np.uint8)
+
+def base_name(fn):
+    return Path(fn).name.split('_disp.txt')[0]
+
+def save_wavefield(base_file, vq_re, vq_im, root=Path("..")):
+    "Save grayscale wavefield images to the same places plot_wavefield.m does"
+    root = Path(root)
+    img_re = np.flip(mat2gray(vq_re), 0) # real (flip vertically for displaying as image)
+    img_im = mat2gray(vq_im)             # imaginary (not flipped in plot_wavefield.m either)
+    if 'test_' in base_file:
+        # only test on real dataset (that's how the CNN was trained)
+        PIL.Image.fromarray(to_uint8(img_re)).save(root/'test'/'testset'/f'{base_file}_real.png')
+    else:
+        PIL.Image.fromarray(to_uint8(img_re)).save(root/'images'/f'{base_file}_real.png')
+        PIL.Image.fromarray(to_uint8(img_im)).save(root/'images'/f'{base_file}_imaginary.png')
+
+def save_mat(base_file, vq_z, root=Path("..")):
+    "Save the complex 400x400 displacement matrix like plot_wavefield.m ExportMat"
+    from scipy.io import savemat
+    savemat(Path(root)/'output'/'mat'/f'{base_file}_vqz.mat', {'vq_z': vq_z})
+
+def wavefields(files, cache:InterpCache=None, group_size:int=64):
+    """Rasterize many disp.txt files. Files that share a node layout are interpolated
+    together as one sparse product [grid x nodes] @ [nodes x 2*files].
+    Yields:
+        (filename, plate dict, vq_z complex [Ny,Nx]) in input order within each group
+    """
+    cache = InterpCache() if cache is None else cache
+    groups = {}
+    for fn in files:
+        plate = split_nodes(load_disp(fn))
+        key = plate_key(plate)
+        groups.setdefault(key, []).append((fn, plate))
+        if len(groups[key]) >= group_size:
+            yield from _rasterize_group(groups.pop(key), cache)
+    for group in groups.values():
+        yield from _rasterize_group(group, cache)
+
+def _rasterize_group(group, cache):
+    p = group[0][1]
+    W, outside = cache.get(p)
+    fields = np.column_stack([f for _,plate in group for f in (plate['re'], plate['im'])])
+    grids = rasterize(W, outside, fields, p['Nx'], p['Ny'])
+    for i,(fn,plate) in enumerate(group):
+        yield fn, plate, grids[2*i] + 1j*grids[2*i+1]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rasterize ANSYS disp.txt exports to wavefield images')
+    parser.add_argument('files', nargs='*', help='disp.txt files (default: all *_disp.txt in ../data)')
+    parser.add_argument('--export-mat', action='store_true', help='also save ../output/mat/<base>_vqz.mat')
+    args = parser.parse_args()
+
+    files = args.files or sorted(str(f) for f in data_dir.glob('*_disp.txt'))
+    for fn, plate, vq_z in wavefields(files):
+        base_file = base_name(fn)
+        save_wavefield(base_file, vq_z.real, vq_z.imag)
+        if args.export_mat:
+            save_mat(base_file, vq_z)
+        print(f'Rasterized {base_file}')
@@ -10,66 +10,74 @@
 import matlab.engine
 import sys
 import os
-import dropbox
-from dropbox.files import WriteMode
-from dropbox.exceptions import ApiError, AuthError
 from pathlib import Path
+from postprocess_pool import MatlabBackend, PostprocessPool
+from uploader import DropboxBackend, Uploader, round_pairs
 
 # Private token to access Dropbox account (see Dropbox API help)
 TOKEN = ""
 
 # Function to call Matlab plot_wavefield.m
-def exec_matlab(filename):
-	print("Starting MATLAB for you :)")
-	eng = matlab.engine.start_matlab()
+# Pass a running engine to reuse it; an engine started here is shut down afterwards
+# (for many files postprocess_pool.py keeps warm engines)
+def exec_matlab(filename,eng=None):
+	started = eng is None
+	if started:
+		print("Starting MATLAB for you :)")
+		eng = matlab.engine.start_matlab()
 	t_out = eng.plot_wavefield(filename,nargout=1)
 	print("plot_wavefield completed. Your images are saved to hard drive.")
-	print("Closing MATLAB...")
+	if started:
+		print("Closing MATLAB...")
+		eng.quit()
 
-# Upload src file to dest location in Dropbox team folder	
-def upload(src,dest):
-	print("Creating a Dropbox object...")
-	with dropbox.Dropbox(TOKEN) as dbx:
-	
-		# Find the namespace id of the team from account.root_info
-		dbx = dbx.with_path_root(dropbox.common.PathRoot.namespace_id("8057807376"))
-		
-		# check that the access token is valid
+# Upload src file to dest location in Dropbox team folder
+# One authenticated Dropbox session is reused for all calls; large files are streamed
+# in chunks and files already in Dropbox (same content hash) are skipped (uploader.py)
+_backend = None
+
+def dropbox_backend():
+	global _backend
+	if _backend is None:
+		print("Creating a Dropbox object...")
 		try:
-			account = dbx.users_get_current_account()
-			# print(account.root_info)
-			# print(account.team)
-		except AuthError:
-			sys.exit("ERROR: Invalid access token")
-		
-		with open(src,'rb') as f:
-			print("Uploading " + src + " to Dropbox as " + dest + "...")
-			try:
-				dbx.files_upload(f.read(),dest,mode=WriteMode('overwrite'))
-			except ApiError as err:
-				if (err.error.is_path() and err.error.get_path().reason.is_insufficient_space()):
-					sys.exit("ERROR: Cannot back up; insufficient space")
-				elif err.user_message_text:
-					print(err.user_message_text)
-					sys.exit()
-				else:
-					print(err)
-					sys.exit()
-		
-		print("Done!")
-		
-	
-# Real and imaginary .txt filenames passed in as argv[1] and argv[2] for matlab
+			_backend = DropboxBackend(TOKEN)
+		except RuntimeError as err:
+			sys.exit("ERROR: " + str(err))
+	return _backend
+
+def upload(src,dest,delete=False):
+	print("Uploading " + src + " to Dropbox as " + dest + "...")
+	res = Uploader(dropbox_backend(),workers=1,delete=delete).upload_file(src,dest)
+	if res['status'] == 'failed':
+		err = res['error']
+		if 'insufficient_space' in err:
+			sys.exit("ERROR: Cannot back up; insufficient space")
+		sys.exit("ERROR: " + err)
+	print("Done! (" + res['status'] + ")")
+
+# Upload many (src,dest) pairs concurrently; local files are removed only after a verified upload
+def upload_all(pairs,delete=False,workers=8):
+	for res in Uploader(dropbox_backend(),workers=workers,delete=delete).upload_many(pairs):
+		print(res['status'] + ": " + res['src'] + " -> " + res['dest'] + ("" if res['error'] is None else " (" + res['error'] + ")"))
+
+# disp.txt filename(s) passed in as argv[1:] for matlab
 if __name__ == '__main__':
 	print("run_matlab.py activated! Welcome.\n")
 	# Read command-line arguments
 	# real_filename = sys.argv[1]
 	# imag_filename = sys.argv[2]
 	# mode = sys.argv[3]
-	disp_filename = sys.argv[1]
+	disp_filenames = sys.argv[1:]
 	
 	# Generate wavefield images from .txt data
-	exec_matlab(disp_filename)
+	# (several files: warm MATLAB engines fed through a queue, restarted if one crashes or hangs)
+	if len(disp_filenames) == 1:
+		exec_matlab(disp_filenames[0])
+	else:
+		with PostprocessPool(MatlabBackend(),workers=2,timeout=1800) as pool:
+			for res in pool.map(disp_filenames):
+				print(res['status'] + ": " + res['file'] + ("" if res['error'] is None else " (" + res['error'] + ")"))
 
 	# Run CNN inference
 
@@ -101,6 +109,7 @@ if __name__ == '__main__':
 	
 	# Upload files to dropbox
 	# print("Moving your files to Dropbox: \n")
+	# upload_all(round_pairs(round),delete=True) # all data, images and labels of the round at once
 	# upload(str(src_data/real_filename),(dest_data/real_filename).as_posix()) # Real data.txt
 	# upload(str(src_data/imag_filename),(dest_data/imag_filename).as_posix()) # Imaginary data.txt
 	# upload(str(src_images/real_image), (dest_images/real_image).as_posix())  # Real image.png
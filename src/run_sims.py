@@ -35,7 +35,7 @@ matlab_script = AbsUserPathName("src/run_matlab.py")
 projPath = AbsUserPathName("ansys/DeepWaves.wbpj")
 Open(FilePath=projPath)
 ClearMessages()
-logfile = open(AbsUserPathName("output/logs/run_sims.log"),"w")
+logfile = open(AbsUserPathName("output/logs/run_sims.log"),"a" if os.environ.get("DEEPWAVES_GEOMETRY") else "w")
 logfile.write("Processing project in " + projPath + "\n")
 
 # Get harmonic system object
@@ -58,7 +58,12 @@ except:
 	logfile.write("No geometry to replace in system " + system.DisplayText + "\n")
 
 # Gather list of .step files from geometry folder
-stepFiles = os.listdir(AbsUserPathName("geometry"))
+# (scheduler.py runs one geometry per Workbench call by setting DEEPWAVES_GEOMETRY)
+selected = os.environ.get("DEEPWAVES_GEOMETRY")
+if selected:
+	stepFiles = [os.path.basename(g) for g in selected.split(os.pathsep)]
+else:
+	stepFiles = os.listdir(AbsUserPathName("geometry"))
 logfile.write("Gathering step files:\n")
 for geom in stepFiles:
 	if not ".step" in geom.lower():
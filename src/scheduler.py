@@ -0,0 +1,221 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Resumable simulation scheduler around run_sims.py. Every .step file of ../geometry is
+# tracked in a JSON manifest (../output/logs/sim_manifest.json) by its sha1, with its
+# status (pending -> solving -> solved -> postprocessing -> done, or failed), outputs
+# and last error. The manifest is rewritten atomically after every change, so after a
+# crash the scheduler resumes where it stopped: interrupted solves are redone, solved
+# geometries are only postprocessed, finished ones are skipped unless the .step file
+# changed. Geometries are solved one at a time (one Workbench license); finished
+# *_disp.txt files are postprocessed (rasterize.py images + masks.py labels, or
+# plot_wavefield.m) by the warm workers of postprocess_pool.py while the next solve runs.
+# Solvers are pluggable: WorkbenchSolver runs run_sims.py in batch Workbench for one
+# geometry (DEEPWAVES_GEOMETRY), SyntheticSolver writes synthetic.py plates without ANSYS.
+#
+# Usage: python scheduler.py [--solver workbench|synthetic] [--runwb2 RunWB2.exe] [--post python|matlab|none]
+#                           [--workers 2] [--retry-failed]
+#        python scheduler.py --status
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from disp_cache import file_sha1
+from postprocess_pool import BACKENDS, Backend, PostprocessPool
+
+geometry_dir = Path("../geometry")
+data_dir = Path("../data")
+manifest_path = Path("../output/logs/sim_manifest.json")
+
+PENDING, SOLVING, SOLVED, POSTPROCESSING, DONE, FAILED = 'pending', 'solving', 'solved', 'postprocessing', 'done', 'failed'
+VERSION = 1
+
+def disp_path(geometry, data_dir=data_dir):
+    "Where run_sims.py moves the disp.txt export of a geometry"
+    return Path(data_dir)/f'{Path(geometry).stem}_disp.txt'
+
+class Manifest():
+    "geometry -> {sha1, status, outputs, attempts, error, updated}, saved atomically as JSON (thread safe)"
+    def __init__(self, path=manifest_path):
+        self.path = Path(path)
+        self.lock = threading.RLock()
+        self.jobs = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.jobs = json.load(f).get('jobs', {})
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(dict(version=VERSION, jobs=self.jobs), f, indent=1)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    def update(self, name, **kwargs):
+        "Change fields of one job and save the manifest"
+        with self.lock:
+            self.jobs[name].update(kwargs, updated=time.strftime('%Y-%m-%dT%H:%M:%S'))
+            self.save()
+
+    def sync(self, geometries, retry_failed:bool=False):
+        """Add new geometries and decide what has to be (re)done after a restart.
+        A changed sha1 starts the job over; interrupted stages go back one step.
+        """
+        with self.lock:
+            for fn in geometries:
+                name, sha1 = Path(fn).name, file_sha1(fn)
+                job = self.jobs.get(name)
+                if job is None or job['sha1'] != sha1:
+                    self.jobs[name] = dict(sha1=sha1, status=PENDING, outputs=[], attempts=0, error=None, updated=None)
+                elif job['status'] == SOLVING:
+                    job['status'] = PENDING
+                elif job['status'] in (SOLVED, POSTPROCESSING) or (job['status'] == FAILED and retry_failed):
+                    # resume with postprocessing if the export survived, else solve again
+                    job['status'] = SOLVED if job['outputs'] and Path(job['outputs'][0]).exists() else PENDING
+                    job['error'] = None
+            self.save()
+
+    def names(self, status):
+        with self.lock:
+            return [name for name, job in self.jobs.items() if job['status'] == status]
+
+    def counts(self):
+        with self.lock:
+            out = {}
+            for job in self.jobs.values():
+                out[job['status']] = out.get(job['status'], 0) + 1
+            return out
+
+class Solver():
+    "Turns one geometry (.step) file into its disp.txt export"
+    def solve(self, geometry, disp_file):
+        raise NotImplementedError
+
+class WorkbenchSolver(Solver):
+    """Batch Workbench run of run_sims.py for a single geometry (run_sims.py reads
+    DEEPWAVES_GEOMETRY). The project root is the SetUserPathRoot of run_sims.py, so
+    `disp_file` must be the data/ path it moves the export to.
+    """
+    def __init__(self, runwb2:str='RunWB2', script='run_sims.py', timeout:float=None, log=None):
+        self.runwb2, self.script, self.timeout = runwb2, str(Path(script).resolve()), timeout
+        self.log = Path(log) if log is not None else manifest_path.parent/'runwb2.log'
+
+    def solve(self, geometry, disp_file):
+        env = dict(os.environ, DEEPWAVES_GEOMETRY=Path(geometry).name)
+        self.log.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log, 'a') as log:
+            log.write(f'\n==== {Path(geometry).name} {time.strftime("%Y-%m-%dT%H:%M:%S")}\n')
+            log.flush()
+            subprocess.run([self.runwb2, '-B', '-R', self.script], env=env, stdout=log, stderr=subprocess.STDOUT,
+                           timeout=self.timeout, check=True)
+        if not Path(disp_file).exists():
+            raise RuntimeError(f'Workbench finished without writing {disp_file} (see {self.log})')
+        return disp_file
+
+class SyntheticSolver(Solver):
+    "Local stand-in: a synthetic.py plate seeded by the geometry contents (optional delay per solve)"
+    def __init__(self, delay:float=0.0):
+        self.delay = delay
+
+    def solve(self, geometry, disp_file):
+        from synthetic import plate_nodes, write_disp
+        seed = int(file_sha1(geometry)[:8], 16)
+        time.sleep(self.delay)
+        cols, _ = plate_nodes(seed)
+        tmp = Path(disp_file).with_name(Path(disp_file).name + '.tmp')
+        write_disp(tmp, cols)
+        os.replace(tmp, disp_file)     # never leave a half written export behind
+        return disp_file
+
+SOLVERS = {'workbench': WorkbenchSolver, 'synthetic': SyntheticSolver}
+
+def run(manifest, solver, geometries, post:Backend=None, workers:int=2, timeout:float=None,
+        retry_failed:bool=False, verbose:bool=True):
+    """Solve all unfinished geometries in order and postprocess exports concurrently.
+    Args:
+        post: postprocess_pool.py backend run by `workers` warm processes (None: stop at 'solved')
+        timeout: seconds per postprocessing job
+    Returns:
+        dict: status counts of the manifest
+    """
+    manifest.sync(geometries, retry_failed)
+    by_name = {Path(fn).name: fn for fn in geometries}
+    say = print if verbose else (lambda *a: None)
+
+    def submit(ex, name):
+        disp = manifest.jobs[name]['outputs'][0]
+        manifest.update(name, status=POSTPROCESSING)
+        ex.submit(disp).add_done_callback(lambda fut, name=name: finished(name, fut))
+
+    def finished(name, fut):
+        err = fut.exception()
+        if err is None:
+            outputs = manifest.jobs[name]['outputs'][:1] + list(fut.result() or [])
+            manifest.update(name, status=DONE, outputs=outputs, error=None)
+            say(f'Postprocessed {name}')
+        else:
+            manifest.update(name, status=FAILED, error=f'postprocess: {err!r}')
+            say(f'Postprocessing {name} failed: {err!r}')
+
+    ex = PostprocessPool(post, workers, timeout) if post is not None else None
+    try:
+        if ex is not None:
+            for name in manifest.names(SOLVED):
+                if name in by_name:
+                    submit(ex, name)
+        for name in [n for n in manifest.names(PENDING) if n in by_name]:
+            job = manifest.jobs[name]
+            disp = str(disp_path(name))
+            manifest.update(name, status=SOLVING, attempts=job['attempts'] + 1)
+            say(f'Solving {name} (attempt {job["attempts"]})')
+            t = time.perf_counter()
+            try:
+                solver.solve(by_name[name], disp)
+            except Exception as err:
+                manifest.update(name, status=FAILED, error=f'solve: {err!r}')
+                say(f'Solving {name} failed: {err!r}')
+                continue
+            manifest.update(name, status=SOLVED, outputs=[disp], error=None, solve_seconds=round(time.perf_counter() - t, 1))
+            if ex is not None:
+                submit(ex, name)
+    finally:
+        if ex is not None:
+            ex.shutdown(wait=True)
+    return manifest.counts()
+
+def geometry_files(geometry_dir=geometry_dir):
+    return sorted(str(f) for f in Path(geometry_dir).iterdir() if f.suffix.lower() == '.step')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Resumable ANSYS simulation scheduler with concurrent postprocessing')
+    parser.add_argument('--solver', choices=list(SOLVERS), default='workbench')
+    parser.add_argument('--runwb2', default='RunWB2', help='Workbench launcher (e.g. "C:/Program Files/ANSYS Inc/v191/Framework/bin/Win64/RunWB2.exe")')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds per Workbench solve')
+    parser.add_argument('--workers', type=int, default=2, help='postprocessing processes')
+    parser.add_argument('--post', choices=list(BACKENDS) + ['none'], default='python', help='postprocessing backend')
+    parser.add_argument('--post-timeout', type=float, default=600, help='seconds per postprocessing job')
+    parser.add_argument('--retry-failed', action='store_true', help='solve failed geometries again')
+    parser.add_argument('--status', action='store_true', help='print the manifest and exit')
+    parser.add_argument('--manifest', default=str(manifest_path))
+    args = parser.parse_args()
+
+    manifest = Manifest(args.manifest)
+    if args.status:
+        for name, job in sorted(manifest.jobs.items()):
+            print(f'{name:<40}{job["status"]:<16}{job["error"] or ""}')
+        print(manifest.counts())
+        sys.exit()
+    solver = WorkbenchSolver(args.runwb2, timeout=args.timeout) if args.solver == 'workbench' else SyntheticSolver()
+    post = BACKENDS[args.post]() if args.post != 'none' else None
+    counts = run(manifest, solver, geometry_files(), post, args.workers, args.post_timeout, args.retry_failed)
+    print(f'Manifest {args.manifest}: {counts}')
@@ -0,0 +1,152 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Sharded multi-process cpu inference over ../test/testset. The model is loaded once in
+# the parent, its weights are moved to shared memory (model.share_memory()) and every
+# worker process gets the same tensors instead of its own copy. The test set is split
+# into N interleaved shards; each worker runs the streaming pipeline from inference.py
+# (prefetch thread, batched forward, background PNG writer) with its own intra-op thread
+# count, and reports progress and a confusion matrix against ../test/targets back to the
+# parent over a queue. The parent prints merged progress and the overall mean IoU.
+#
+# Usage: python shard_infer.py [--artifact ../models/unet.pt | --file export_0_0009_KH.pkl] [--workers N] [--bs 8]
+
+import argparse
+import os
+import queue
+import time
+from pathlib import Path
+
+import numpy as np
+import PIL.Image
+import torch
+import torch.multiprocessing as mp
+
+from inference import IMAGENET_STATS, MaskWriter, image_batches, predict_masks, prefetch, to_stats
+from metrics import ConfusionMatrix, iou_from_cm, nanmean
+
+test_dir = Path("../test")
+token = '_real'
+
+def pred_path(fn):
+    "Prediction file of a test image (same naming as unet_test.py)"
+    fn = Path(fn)
+    return test_dir/"predictions"/f'{fn.stem.split(token)[0]}_pred{fn.suffix}'
+
+def targ_path(fn):
+    "Ground truth mask of a test image written by plot_wavefield.m / masks.py"
+    fn = Path(fn)
+    return test_dir/"targets"/f'{fn.stem.split(token)[0]}_targ{fn.suffix}'
+
+def shards(files, n:int):
+    "Split files into n interleaved shards (similar mix of plate sizes in every shard)"
+    return [files[i::n] for i in range(n)]
+
+def _worker(wid, model, files, q, bs, stats, threads, num_classes):
+    try:
+        torch.set_num_threads(threads)
+        cm = ConfusionMatrix(num_classes)
+        t, n = time.perf_counter(), 0
+        with torch.no_grad(), MaskWriter(maxsize=4*bs) as writer:
+            for x, chunk in prefetch(image_batches(files, bs, stats)):
+                masks = predict_masks(model, x, torch.device('cpu'))
+                for mask, fn in zip(masks, chunk):
+                    writer.put(mask, pred_path(fn))
+                    targ = targ_path(fn)
+                    if num_classes and targ.exists():
+                        cm.update(torch.from_numpy(mask).long()[None],
+                                  torch.from_numpy(np.array(PIL.Image.open(targ))).long()[None])
+                n += len(chunk)
+                q.put(('progress', wid, len(chunk)))
+        q.put(('done', wid, n, None if cm.cm is None else cm.to_np(), time.perf_counter() - t))
+    except BaseException as err:
+        q.put(('error', wid, repr(err)))
+
+def shard_predict(model, files, workers:int=None, bs:int=8, stats=IMAGENET_STATS, threads:int=None,
+                  num_classes:int=None, verbose:bool=True):
+    """Run inference over `files` across worker processes sharing one copy of the weights.
+    Args:
+        model: fp32 learner model or deploy.load_artifact() model (only torch modules share weights)
+        workers: number of processes (default: all cores // threads)
+        threads: intra-op threads per worker (default: cores // workers)
+        num_classes: accumulate a confusion matrix against ../test/targets when given
+    Returns:
+        report: dict with images, seconds, images_per_second, per-worker stats and
+                (with num_classes) the merged confusion matrix, per-class IoU and mIoU
+    """
+    cores = os.cpu_count() or 1
+    workers = workers or max(1, cores // (threads or 1))
+    threads = threads or max(1, cores // workers)
+    if isinstance(model, torch.nn.Module):
+        model = model.cpu().eval()
+        model.share_memory()
+    # fork keeps TorchScript modules usable in the workers; parameters are shared either way
+    ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+    q = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(i, model, shard, q, bs, stats, threads, num_classes), daemon=True)
+             for i, shard in enumerate(shards(list(files), workers))]
+    t = time.perf_counter()
+    for p in procs:
+        p.start()
+
+    done, total, cm, per_worker = 0, 0, None, {}
+    try:
+        while len(per_worker) < len(procs):
+            try:
+                msg = q.get(timeout=1.0)
+            except queue.Empty:
+                dead = [i for i,p in enumerate(procs) if not p.is_alive() and i not in per_worker]
+                if dead and q.empty():
+                    raise RuntimeError(f'inference workers {dead} exited without reporting')
+                continue
+            if msg[0] == 'progress':
+                done += msg[2]
+                if verbose:
+                    print(f'Predicted {done}/{len(files)} images')
+            elif msg[0] == 'done':
+                _, wid, n, wcm, seconds = msg
+                per_worker[wid] = dict(images=n, seconds=seconds)
+                total += n
+                if wcm is not None:
+                    cm = wcm if cm is None else cm + wcm
+            else:
+                raise RuntimeError(f'inference worker {msg[1]} failed: {msg[2]}')
+    finally:
+        for p in procs:
+            if p.is_alive() and len(per_worker) < len(procs):
+                p.terminate()
+            p.join()
+
+    seconds = time.perf_counter() - t
+    report = dict(images=total, seconds=seconds, images_per_second=total/seconds if seconds else 0.0,
+                  workers=workers, threads=threads, per_worker=[per_worker[i] for i in sorted(per_worker)])
+    if cm is not None:
+        iou = iou_from_cm(torch.from_numpy(cm))
+        report.update(confusion=cm, iou=iou.numpy(), miou=nanmean(iou).item())
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sharded multi-process inference on ../test/testset')
+    parser.add_argument('--artifact', default=None, help='TorchScript artifact from export_model.py (no fastai)')
+    parser.add_argument('--file', default='export_0_0009_KH.pkl', help='learner .pkl in ../models (without --artifact)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: cores // threads)')
+    parser.add_argument('--threads', type=int, default=None, help='intra-op threads per worker (default: cores // workers)')
+    parser.add_argument('--bs', type=int, default=8)
+    args = parser.parse_args()
+
+    codes = np.loadtxt("codes.txt", ndmin=1)
+    if args.artifact is not None:
+        from deploy import artifact_stats, load_artifact
+        model, meta = load_artifact(args.artifact)
+        stats = artifact_stats(meta)
+    else:
+        from export_model import load_fastai_learner
+        learn = load_fastai_learner(file=args.file)
+        model, stats = learn.model, to_stats(getattr(learn.data, 'stats', None))
+    files = sorted(f for f in (test_dir/"testset").iterdir() if token in f.name)
+    report = shard_predict(model, files, args.workers, args.bs, stats, args.threads, num_classes=len(codes))
+    print(f'{report["images"]} images in {report["seconds"]:.1f} s ({report["images_per_second"]:.2f} images/s, '
+          f'{report["workers"]} workers x {report["threads"]} threads)')
+    if 'miou' in report:
+        print(f'Mean IoU vs ../test/targets: {report["miou"]:.4f}')
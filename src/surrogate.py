@@ -0,0 +1,185 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Python surrogate of the ANSYS harmonic response (ACT_mech_script.py: aluminum plate,
+# 80 kHz, damping ratio 0.001, 100 kPa on the 20 mm radius transducer disk at the plate
+# center) for generating training data on CPU nodes. The out-of-plane steady-state
+# response w of a plate with thickness map h(x,y) solves
+#     lap(D(h)*(1 + i*eta)*lap(w)) - rho*h*w^2*w = p
+# on the 1 mm grid of plot_wavefield.m (simply supported edges, optional absorbing
+# sponge). D is the Kirchhoff bending stiffness, or by default the stiffness that gives
+# the exact A0 Lamb wavenumber of the local thickness (aws.py dispersion table), so wave
+# lengths over thinned regions match the 3-D model. The 13-point operator is factored
+# with SuperLU once per thickness map; factorizations are cached by a hash of the map and
+# the settings, so repeated geometries (and several load cases) reuse them. Batches are
+# spread over processes with identical maps kept on one worker.
+# Output is the complex vq_z grid of ExportMat (rows = y ascending), so the result goes
+# straight into aws.py, animate.py, dataset_store.py or the _vqz.mat files.
+#
+# Usage: python surrogate.py [n] [--workers 2] [--seed 0]
+#        (defects.py layouts -> ../output/mat/surr_<i>_vqz.mat + ../labels/surr_<i>_mask.png)
+
+import argparse
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from aws import E, FREQUENCY, NU, RHO, dispersion_table
+
+PLATE = (0.4, 0.4)          # plate size x, y [m] (CAD_scripts)
+SHAPE = (400, 400)          # grid of plot_wavefield.m (Ny, Nx)
+DAMPING = 0.001             # constant damping ratio (loss factor 2*DAMPING)
+PRESSURE = 1e5              # transducer pressure [Pa]
+TRANSDUCER_RADIUS = 0.02    # [m]
+
+def grid_spacing(shape=SHAPE, plate=PLATE):
+    "(dy, dx) of linspace(0, width, N) grids like rasterize.grid_points"
+    return plate[1]/(shape[0] - 1), plate[0]/(shape[1] - 1)
+
+def bending_stiffness(thickness, f:float=FREQUENCY, model:str='a0'):
+    """Bending stiffness D [N*m] of the local thickness [m].
+    model='kirchhoff': E*h^3/(12*(1 - nu^2)); model='a0': rho*h*w^2/k_A0(h)^4, the
+    stiffness whose plate wavenumber equals the A0 Lamb wavenumber at frequency f.
+    """
+    h = np.asarray(thickness, dtype=float)
+    if model == 'kirchhoff':
+        return E*h**3/(12*(1 - NU**2))
+    d, k = dispersion_table(f)
+    return RHO*h*(2*np.pi*f)**2/np.interp(h, d, k)**4
+
+@lru_cache(maxsize=4)
+def laplacian(shape, spacing):
+    "5-point Laplacian [Ny*Nx, Ny*Nx] with zero displacement outside the grid (csr)"
+    (ny, nx), (dy, dx) = shape, spacing
+    second = lambda n, d: sparse.diags([np.ones(n-1), -2*np.ones(n), np.ones(n-1)], [-1, 0, 1])/d**2
+    return (sparse.kron(sparse.identity(ny), second(nx, dx)) + sparse.kron(second(ny, dy), sparse.identity(nx))).tocsr()
+
+def sponge(shape, width:int, strength:float=0.5):
+    "Extra loss factor ramping quadratically from 0 to `strength` over `width` cells at the edges"
+    if width <= 0:
+        return 0.0
+    ny, nx = shape
+    d = np.minimum.outer(np.minimum(np.arange(ny), np.arange(ny)[::-1]), np.minimum(np.arange(nx), np.arange(nx)[::-1]))
+    return strength*np.clip(1 - d/width, 0, 1)**2
+
+def plate_operator(thickness, f:float=FREQUENCY, damping:float=DAMPING, plate=PLATE, model:str='a0',
+                   sponge_width:int=0):
+    "Complex sparse system matrix (csc) of the plate equation on the thickness map grid"
+    h = np.asarray(thickness, dtype=float)
+    L = laplacian(h.shape, grid_spacing(h.shape, plate))
+    eta = 2*damping + sponge(h.shape, sponge_width)
+    D = bending_stiffness(h, f, model)*(1 + 1j*eta)
+    mass = RHO*h*(2*np.pi*f)**2
+    return (L @ sparse.diags(D.ravel()) @ L - sparse.diags(mass.ravel())).tocsc()
+
+def transducer_load(shape=SHAPE, plate=PLATE, center=(0.0, 0.0), radius:float=TRANSDUCER_RADIUS,
+                    pressure:float=PRESSURE):
+    "Pressure load [Pa] on the grid: a disk at `center` (x, y from the plate center [m])"
+    (dy, dx), (ny, nx) = grid_spacing(shape, plate), shape
+    y, x = np.mgrid[:ny, :nx]
+    inside = np.hypot(x*dx - plate[0]/2 - center[0], y*dy - plate[1]/2 - center[1]) <= radius
+    return np.where(inside, pressure, 0.0)
+
+def factor_key(thickness, **settings):
+    "sha1 of a thickness map and the solver settings"
+    h = hashlib.sha1(np.ascontiguousarray(thickness, dtype=np.float64).tobytes())
+    h.update(repr(np.shape(thickness)).encode())
+    h.update(repr(sorted(settings.items())).encode())
+    return h.hexdigest()
+
+class FactorCache():
+    "SuperLU factorizations keyed by factor_key, least recently used dropped beyond max_entries"
+    def __init__(self, max_entries:int=2):
+        self.max_entries, self.mem = max_entries, OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, thickness, **settings):
+        key = factor_key(thickness, **settings)
+        if key in self.mem:
+            self.hits += 1
+            self.mem.move_to_end(key)
+            return self.mem[key]
+        self.misses += 1
+        A = plate_operator(thickness, **settings)
+        # the operator is complex symmetric: symmetric ordering, diagonal pivots
+        lu = splu(A, permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0, options=dict(SymmetricMode=True))
+        self.mem[key] = lu
+        while len(self.mem) > self.max_entries:
+            self.mem.popitem(last=False)
+        return lu
+
+_cache = FactorCache()
+
+def solve(thickness, loads=None, cache:FactorCache=None, **settings):
+    """Steady-state out-of-plane displacement of a plate.
+    Args:
+        thickness: thickness map [m], [Ny,Nx] in grid orientation (rows = y ascending)
+        loads: pressure maps [Ny,Nx] or [K,Ny,Nx] (default: transducer_load())
+        settings: f, damping, plate, model, sponge_width (see plate_operator)
+    Returns:
+        vq_z: complex displacement [m], [Ny,Nx] (or [K,Ny,Nx] for several loads)
+    """
+    h = np.asarray(thickness, dtype=float)
+    cache = _cache if cache is None else cache
+    loads = transducer_load(h.shape, settings.get('plate', PLATE)) if loads is None else np.asarray(loads)
+    lu = cache.get(h, **settings)
+    w = lu.solve(np.asfortranarray(loads.reshape(-1, h.size).T.astype(np.complex128))).T
+    return w.reshape(loads.shape).astype(np.complex64)
+
+def _solve_group(args):
+    idx, h, loads, settings = args
+    out = solve(h, loads, **settings)
+    return idx, out
+
+def solve_batch(thicknesses, loads=None, workers:int=None, **settings):
+    """Solve many thickness maps across processes; identical maps are solved together
+    (one factorization, one worker).
+    Yields:
+        (index, vq_z) as groups finish
+    """
+    groups = OrderedDict()
+    for i, h in enumerate(thicknesses):
+        groups.setdefault(factor_key(h, **settings), []).append(i)
+    tasks = []
+    for idx in groups.values():
+        h = np.asarray(thicknesses[idx[0]])
+        if loads is None:
+            group_loads = np.broadcast_to(transducer_load(h.shape, settings.get('plate', PLATE)), (len(idx),) + h.shape)
+        else:
+            group_loads = np.stack([loads[i] for i in idx])
+        tasks.append((idx, h, np.ascontiguousarray(group_loads), settings))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for idx, out in ex.map(_solve_group, tasks):
+            yield from zip(idx, out)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Surrogate harmonic plate solves of random defect layouts')
+    parser.add_argument('n', type=int, nargs='?', default=4, help='number of plates')
+    parser.add_argument('--workers', type=int, default=2, help='processes (about 0.5 GB per factorization)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model', choices=['a0', 'kirchhoff'], default='a0')
+    parser.add_argument('--sponge', type=int, default=0, help='absorbing edge width [cells] (0: reflecting edges)')
+    parser.add_argument('--out', default='../output/mat')
+    args = parser.parse_args()
+
+    import PIL.Image
+    from scipy.io import savemat
+    from defects import class_masks, sample_layouts, thickness_maps
+    from masks import load_codes, mask_path
+    codes = load_codes()
+    maps = thickness_maps(sample_layouts(args.n, codes, args.seed), codes).astype(np.float64)
+    os.makedirs(args.out, exist_ok=True)
+    for i, vq_z in solve_batch(list(1e-3*maps), workers=args.workers, model=args.model, sponge_width=args.sponge):
+        fn = Path(args.out)/f'surr_{i}_vqz.mat'
+        savemat(fn, {'vq_z': vq_z, 'thickness': maps[i]})
+        # label next to it, so dataset_store.py build-mat picks the pair up
+        PIL.Image.fromarray(np.flip(class_masks(maps[i], codes), 0)).save(mask_path(f'surr_{i}'))
+        print(f'Saved {fn}')
@@ -0,0 +1,106 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Synthetic plates for benchmarks and pipeline checks on machines without ANSYS.
+#   plate_nodes   : scattered nodes in the disp.txt column layout (node, x, y, z, re, im):
+#                   surface and bottom node grids on the 2 mm ACT mesh, bottom nodes raised
+#                   inside defects, and a complex out-of-plane field from a transducer at
+#                   the plate center whose wavenumber grows where the plate is thinner
+#   write_disp    : save nodes like the ANSYS export (header line + 6 columns)
+#   random_masks  : 400x400 class masks with random defects over the codes.txt classes
+#   noisy_logits  : logits that agree with given masks on a chosen fraction of pixels
+#
+# Usage: python synthetic.py [n] [--out ../data]   (writes synth_<i>_disp.txt files)
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+HEADER = 'Node_no.  x-loc  y-loc  z-loc  z-disp-re  z-disp-im'
+
+def random_defects(rng, n:int=1, L:float=0.4, t:float=0.01, codes=None, sizes=(0.01, 0.06)):
+    "n random circle/square defects (center, size [m], depth [m]); depths follow the codes classes"
+    codes = np.arange(10, 0, -1) if codes is None else np.asarray(codes)
+    thick = rng.choice(codes[1:], n)*1e-3      # remaining thickness [m] (class 0 is the full plate)
+    return [dict(shape=str(rng.choice(['circle', 'square'])), cx=rng.uniform(-L/4, L/4), cy=rng.uniform(-L/4, L/4),
+                 size=rng.uniform(*sizes), depth=float(max(t - d, 0.0))) for d in thick]
+
+def defect_depth(x, y, defects):
+    "Depth [m] of the deepest defect covering each point (0 outside all defects)"
+    depth = np.zeros(np.shape(x))
+    for d in defects:
+        if d['shape'] == 'circle':
+            inside = np.hypot(x - d['cx'], y - d['cy']) <= d['size']/2
+        else:
+            inside = (np.abs(x - d['cx']) <= d['size']/2) & (np.abs(y - d['cy']) <= d['size']/2)
+        depth = np.where(inside, np.maximum(depth, d['depth']), depth)
+    return depth
+
+def plate_nodes(seed:int=0, L:float=0.4, t:float=0.01, h:float=0.002, defects=None, wavelength:float=0.02,
+                jitter:float=0.25):
+    """Nodes of a synthetic L x L plate of thickness t in the load_disp() column layout.
+    Interior nodes are jittered by `jitter`*h so the layout is scattered like a free mesh.
+    Returns:
+        cols: dict of node, x, y, z, re, im arrays (float64, node int)
+        defects: the defects used
+    """
+    rng = np.random.default_rng(seed)
+    defects = random_defects(rng, 1, L, t) if defects is None else defects
+    g = np.linspace(-L/2, L/2, int(round(L/h)) + 1)
+    x, y = (a.ravel() for a in np.meshgrid(g, g))
+    interior = (np.abs(x) < L/2 - h/2) & (np.abs(y) < L/2 - h/2) & (x != 0)
+    jx, jy = (np.where(interior, rng.uniform(-jitter, jitter, x.shape)*h, 0) for _ in range(2))
+    x, y = x + jx, y + jy
+    depth = defect_depth(x, y, defects)
+    xs = np.concatenate([x, x])
+    ys = np.concatenate([y, y])
+    zs = np.concatenate([np.full(x.shape, t), depth])
+    # A0-like field: k ~ 1/sqrt(local thickness), amplitude ~ 1/sqrt(r)
+    k = 2*np.pi/wavelength*np.sqrt(t/np.maximum(t - defect_depth(xs, ys, defects), 1e-4))
+    r = np.hypot(xs, ys) + h
+    w = 1e-9/np.sqrt(r/h)*np.exp(1j*k*r)
+    return dict(node=np.arange(1, len(xs) + 1), x=xs, y=ys, z=zs, re=w.real, im=w.imag), defects
+
+def write_disp(fn, cols):
+    "Save node columns as an ANSYS-style disp.txt export"
+    data = np.column_stack([cols[c] for c in ('node', 'x', 'y', 'z', 're', 'im')])
+    np.savetxt(fn, data, fmt=['%10d', '%15.8E', '%15.8E', '%15.8E', '%13.5E', '%13.5E'], header=HEADER, comments='')
+    return fn
+
+def random_masks(n:int, shape=(400,400), num_classes:int=10, seed:int=0, max_defects:int=3):
+    "uint8 class masks [n,H,W]: plate class 0 with up to max_defects disks/squares of random classes"
+    rng = np.random.default_rng(seed)
+    H, W = shape
+    yy, xx = np.mgrid[:H, :W]
+    masks = np.zeros((n, H, W), dtype=np.uint8)
+    for m in masks:
+        for _ in range(rng.integers(1, max_defects + 1)):
+            cy, cx, r = rng.integers(0, H), rng.integers(0, W), rng.integers(H//40, H//8)
+            if rng.random() < 0.5:
+                inside = (yy - cy)**2 + (xx - cx)**2 <= r**2
+            else:
+                inside = (np.abs(yy - cy) <= r) & (np.abs(xx - cx) <= r)
+            m[inside] = rng.integers(1, num_classes)
+    return masks
+
+def noisy_logits(masks, num_classes:int=10, accuracy:float=0.9, seed:int=0):
+    "float32 logits [n,C,H,W] whose argmax equals `masks` on about `accuracy` of the pixels"
+    rng = np.random.default_rng(seed)
+    logits = rng.standard_normal((len(masks), num_classes) + masks.shape[1:]).astype(np.float32)
+    correct = rng.random(masks.shape) < accuracy
+    np.put_along_axis(logits, masks[:,None].astype(np.int64), np.where(correct, 10.0, -10.0)[:,None], axis=1)
+    return logits
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic disp.txt plates')
+    parser.add_argument('n', type=int, nargs='?', default=4, help='number of plates')
+    parser.add_argument('--out', default='../data', help='output directory')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for i in range(args.n):
+        cols, defects = plate_nodes(args.seed + i)
+        fn = write_disp(Path(args.out)/f'synth_{i}_disp.txt', cols)
+        print(f'{fn}: {len(cols["x"])} nodes, defects {defects}')
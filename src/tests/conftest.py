@@ -0,0 +1,13 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# pytest setup: the modules in src/ are scripts that import each other as siblings,
+# so src/ goes on sys.path. Tests only use synthetic data (no fastai, ANSYS or MATLAB).
+#
+# Usage: python -m pytest -q src/tests
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,58 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# The bincount confusion matrices against the original implementations and a hand count.
+
+import numpy as np
+import PIL.Image
+import torch
+
+from benchmark import bincount_confusion, legacy_confusion, legacy_iou
+from evaluate import evaluate, image_confusion
+from metrics import confusion_matrix, iou_score
+from synthetic import noisy_logits, random_masks
+
+def test_bincount_confusion_matches_legacy():
+    masks = torch.from_numpy(random_masks(4, shape=(64,64), seed=1)).long()
+    pred_class = torch.from_numpy(noisy_logits(masks.numpy(), 10, seed=2)).argmax(1)
+    legacy_mean, legacy_images = legacy_confusion(pred_class, masks[:,None], 10)
+    mean, images = bincount_confusion(pred_class, masks[:,None], 10)
+    assert torch.allclose(images, legacy_images, equal_nan=True)
+    assert torch.allclose(mean, legacy_mean, equal_nan=True)
+
+def test_soft_iou_matches_legacy():
+    masks = torch.from_numpy(random_masks(2, shape=(32,32), seed=3)).long()
+    preds = torch.from_numpy(noisy_logits(masks.numpy(), 10, seed=4))
+    assert torch.allclose(iou_score(preds, masks[:,None], soft=True), legacy_iou(preds, masks[:,None]), atol=1e-6)
+
+TARG = np.array([[0, 0, 1],
+                 [0, 2, 1],
+                 [2, 2, 0]], dtype=np.uint8)
+PRED = np.array([[0, 1, 1],
+                 [0, 2, 2],
+                 [2, 0, 0]], dtype=np.uint8)
+# rows = target class, columns = predicted class, counted by hand
+HAND = np.array([[3, 1, 0],
+                 [0, 1, 1],
+                 [1, 0, 2]])
+
+def test_image_confusion_hand_count():
+    assert (image_confusion(TARG, PRED, 3) == HAND).all()
+    assert (confusion_matrix(torch.from_numpy(PRED)[None], torch.from_numpy(TARG)[None], 3).numpy() == HAND).all()
+
+def test_evaluate_hand_count(tmp_path):
+    (tmp_path/'targets').mkdir()
+    (tmp_path/'predictions').mkdir()
+    pairs = []
+    for base in ('test_circle_1_20', 'test_square_2_20'):
+        targ, pred = tmp_path/'targets'/f'{base}_targ.png', tmp_path/'predictions'/f'{base}_pred.png'
+        PIL.Image.fromarray(TARG).save(targ)
+        PIL.Image.fromarray(PRED).save(pred)
+        pairs.append((base, str(targ), str(pred)))
+    res = evaluate(pairs, codes=[3, 2, 1], workers=1)
+    assert (res['confusion'] == 2*HAND).all()
+    # exact IoU of the 1 mm plate = IoU of class 2: 2/(3 + 3 - 2)
+    assert np.isclose(res['exact_iou'][0], 2/4)
+    # binary IoU: plate = class 0 (most frequent target); defect pixels 4 + 3 - 3 matched as defect
+    assert np.isclose(res['binary_iou'][0], 4/6)
@@ -0,0 +1,63 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Worker failures of the postprocessing pool: crashes, timeouts, backend errors and
+# backends that never start. The test backend picks its behaviour from the file name.
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from postprocess_pool import Backend, PostprocessPool
+
+class ScriptedBackend(Backend):
+    "'crash' kills the worker, 'hang' never returns, 'bad' raises; other files return the worker pid"
+    def process(self, disp_file):
+        name = Path(disp_file).name
+        if 'crash' in name:
+            os._exit(3)
+        if 'hang' in name:
+            time.sleep(60)
+        if 'bad' in name:
+            raise ValueError('unreadable export')
+        return [f'{name}:{os.getpid()}']
+
+class BrokenBackend(Backend):
+    def start(self):
+        raise RuntimeError('no license')
+
+def run(files, **kwargs):
+    with PostprocessPool(ScriptedBackend(), **kwargs) as pool:
+        results = list(pool.map(files))
+        return results, pool.restarts
+
+def test_crashed_worker_fails_its_job_and_is_restarted():
+    results, restarts = run(['a_disp.txt', 'crash_disp.txt', 'b_disp.txt'], workers=1)
+    assert [r['status'] for r in results] == ['ok', 'failed', 'ok']
+    assert 'worker crashed (exit code 3)' in results[1]['error']
+    assert restarts == 1
+    pids = [r['outputs'][0].split(':')[1] for r in results if r['status'] == 'ok']
+    assert pids[0] != pids[1]
+
+def test_timed_out_worker_is_killed_and_restarted():
+    t = time.perf_counter()
+    results, restarts = run(['hang_disp.txt', 'a_disp.txt'], workers=1, timeout=1)
+    assert [r['status'] for r in results] == ['failed', 'ok']
+    assert 'TimeoutError' in results[0]['error']
+    assert restarts == 1
+    assert time.perf_counter() - t < 30
+
+def test_backend_error_keeps_the_worker():
+    results, restarts = run(['a_disp.txt', 'bad_disp.txt', 'b_disp.txt'], workers=1)
+    assert [r['status'] for r in results] == ['ok', 'failed', 'ok']
+    assert 'unreadable export' in results[1]['error']
+    assert restarts == 0
+    assert results[0]['outputs'][0].split(':')[1] == results[2]['outputs'][0].split(':')[1]
+
+def test_backend_that_never_starts_breaks_the_pool():
+    with PostprocessPool(BrokenBackend(), workers=1, max_start_failures=2) as pool:
+        with pytest.raises(RuntimeError, match='no license'):   # from submit if the pool broke first
+            pool.submit('a_disp.txt').result(timeout=30)
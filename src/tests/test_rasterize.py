@@ -0,0 +1,24 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# The cached barycentric interpolation of rasterize.py against scipy griddata (what
+# plot_wavefield.m's griddata call does) on a synthetic plate.
+
+import numpy as np
+from scipy.interpolate import griddata
+
+from rasterize import grid_points, interp_weights, rasterize, split_nodes
+from synthetic import plate_nodes
+
+def test_rasterize_matches_griddata():
+    plate = split_nodes(plate_nodes(0)[0])
+    points = np.column_stack([plate['x_surf'], plate['y_surf']])
+    query = grid_points(plate['x_width'], plate['y_width'], plate['Nx'], plate['Ny'])
+    W, outside = interp_weights(points, query)
+    out = rasterize(W, outside, np.column_stack([plate['re'], plate['im']]), plate['Nx'], plate['Ny'])
+    for grid, field in zip(out, (plate['re'], plate['im'])):
+        ref = griddata(points, field, query, 'linear').reshape(plate['Ny'], plate['Nx'])
+        assert (np.isnan(grid) == np.isnan(ref)).all()
+        scale = np.nanmax(np.abs(ref))
+        assert np.nanmax(np.abs(grid - ref)) <= 1e-9*scale
@@ -0,0 +1,80 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Scheduler resume after a crash: synthetic solves and PythonBackend postprocessing in a
+# temporary project tree (geometry/, data/, images/, labels/ next to a src/ working dir).
+
+from pathlib import Path
+
+import pytest
+
+import scheduler
+from postprocess_pool import PythonBackend
+
+codes_file = Path(__file__).resolve().parents[1]/"codes.txt"
+
+class CountingSolver(scheduler.SyntheticSolver):
+    "SyntheticSolver that records which geometries it solved"
+    def __init__(self):
+        super().__init__()
+        self.solved = []
+
+    def solve(self, geometry, disp_file):
+        self.solved.append(Path(geometry).name)
+        return super().solve(geometry, disp_file)
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    "Geometry files of a fresh project; the working directory is its src/ like the scripts expect"
+    for d in ('src', 'geometry', 'data', 'images', 'labels'):
+        (tmp_path/d).mkdir()
+    for i in range(2):
+        (tmp_path/'geometry'/f'plate_{i}.step').write_text(f'plate {i}')
+    monkeypatch.chdir(tmp_path/'src')
+    return scheduler.geometry_files(tmp_path/'geometry')
+
+def run(manifest_path, solver, geometries):
+    post = PythonBackend(class_file=codes_file, root=Path('..').resolve())
+    return scheduler.run(scheduler.Manifest(manifest_path), solver, geometries, post, workers=2, timeout=120,
+                         verbose=False)
+
+def test_resume_interrupted_solve(project, tmp_path):
+    path = tmp_path/'manifest.json'
+    manifest = scheduler.Manifest(path)
+    manifest.sync(project)
+    manifest.update('plate_0.step', status=scheduler.SOLVING, attempts=1)   # crashed inside Workbench
+
+    solver = CountingSolver()
+    assert run(path, solver, project) == {scheduler.DONE: 2}
+    assert solver.solved == ['plate_0.step', 'plate_1.step']
+    jobs = scheduler.Manifest(path).jobs
+    assert jobs['plate_0.step']['attempts'] == 2
+    assert all(Path(p).exists() for job in jobs.values() for p in job['outputs'])
+
+def test_resume_interrupted_postprocessing(project, tmp_path):
+    path = tmp_path/'manifest.json'
+    solver = CountingSolver()
+    assert scheduler.run(scheduler.Manifest(path), solver, project, post=None, verbose=False) == {scheduler.SOLVED: 2}
+
+    # crash while both were postprocessing; the export of plate_1 did not survive
+    manifest = scheduler.Manifest(path)
+    for name in manifest.jobs:
+        manifest.update(name, status=scheduler.POSTPROCESSING)
+    Path(manifest.jobs['plate_1.step']['outputs'][0]).unlink()
+
+    solver = CountingSolver()
+    assert run(path, solver, project) == {scheduler.DONE: 2}
+    assert solver.solved == ['plate_1.step']    # plate_0 is only postprocessed again
+    jobs = scheduler.Manifest(path).jobs
+    assert jobs['plate_0.step']['attempts'] == 1
+    assert (tmp_path/'labels'/'plate_0_mask.png').exists() and (tmp_path/'labels'/'plate_1_mask.png').exists()
+
+def test_solved_jobs_are_skipped_until_the_geometry_changes(project, tmp_path):
+    path = tmp_path/'manifest.json'
+    solved = lambda solver: scheduler.run(scheduler.Manifest(path), solver, project, post=None, verbose=False)
+    assert solved(CountingSolver()) == {scheduler.SOLVED: 2}
+    Path(project[1]).write_text('plate 1, refined mesh')
+    solver = CountingSolver()
+    assert solved(solver) == {scheduler.SOLVED: 2}
+    assert solver.solved == ['plate_1.step']
@@ -10,68 +10,113 @@
 # - source code changed on torch.nn conv2d
 # - export to .onnx file doesn't work
 # - learn.get_preds is more efficient but uses all the GPU memory for some reason
+#   (it keeps every probability tensor; the default --mode stream in inference.py does not)
 
 from fastai.vision import *
 import torch
 from torch.nn import functional as F
+import argparse
+import json
 import os
+from inference import predict_stream, predict_phase_ensemble, load_vqz, predict_tiled, predict_cascade, calibrate_cascade, MaskWriter, to_stats
+from masks import load_codes
+from scipy.io import savemat
+from metrics import ConfusionMatrix, iou_score
+from pred_cache import PredictionCache, model_hash
+from profiler import Profiler
 
 # problem with fastia cuda usage - blows gpu memory away
 # defaults.device = 'cpu'
 
 # Return Jaccard index, or Intersection over Union (IoU) value
-def IoU(preds:Tensor, targs:Tensor, eps:float=1e-8):
-    """Computes the Jaccard loss, a.k.a the IoU loss.
+def IoU(preds:Tensor, targs:Tensor, eps:float=1e-8, soft:bool=True):
+    """Computes the Jaccard index, a.k.a the IoU.
     Notes: [Batch size,Num classes,Height,Width]
     Args:
         targs: a tensor of shape [B, H, W] or [B, 1, H, W].
         preds: a tensor of shape [B, C, H, W]. Corresponds to
             the raw output or logits of the model. (prediction)
-        eps: added to the denominator for numerical stability.
+        eps: added to the denominator for numerical stability (soft mode).
+        soft: softmax probabilities (default, the metric the learners were trained
+            and exported with; differentiable, 1-IoU(...) works as a loss);
+            soft=False gives the hard argmax IoU (see HardIoU)
     Returns:
         iou: the average class intersection over union value
              for multi-class image segmentation
+    No one-hot target tensor is allocated (see metrics.py).
     """
-    num_classes = preds.shape[1]
-
-    # Single class segmentation?
-    if num_classes == 1:
-        true_1_hot = torch.eye(num_classes + 1)[targs.squeeze(1)]
-        true_1_hot = true_1_hot.permute(0, 3, 1, 2).float()
-        true_1_hot_f = true_1_hot[:, 0:1, :, :]
-        true_1_hot_s = true_1_hot[:, 1:2, :, :]
-        true_1_hot = torch.cat([true_1_hot_s, true_1_hot_f], dim=1)
-        pos_prob = torch.sigmoid(preds)
-        neg_prob = 1 - pos_prob
-        probas = torch.cat([pos_prob, neg_prob], dim=1)
-
-    # Multi-class segmentation
-    else:
-        # Convert target to one-hot encoding
-        # true_1_hot = torch.eye(num_classes)[torch.squeeze(targs,1)]
-        true_1_hot = torch.eye(num_classes)[targs.squeeze(1)]
+    return iou_score(preds, targs, soft=soft, eps=eps)
+
+def HardIoU(preds:Tensor, targs:Tensor):
+    "Mean class IoU of the argmax prediction, from one bincount over C*target+pred"
+    return iou_score(preds, targs)
 
-        # Permute [B,H,W,C] to [B,C,H,W]
-        true_1_hot = true_1_hot.permute(0, 3, 1, 2).float()
+class StreamingIoU(Callback):
+    "Epoch-level mean IoU from a confusion matrix accumulated over all validation batches"
+    def on_epoch_begin(self, **kwargs):
+        self.cm = ConfusionMatrix()
 
-        # Take softmax along class dimension; all class probs add to 1 (per pixel)
-        probas = F.softmax(preds, dim=1)
+    def on_batch_end(self, last_output, last_target, **kwargs):
+        self.cm.update(last_output.detach(), last_target)
 
-    true_1_hot = true_1_hot.type(preds.type())
+    def on_epoch_end(self, last_metrics, **kwargs):
+        return add_metrics(last_metrics, self.cm.miou())
 
-    # Sum probabilities by class and across batch images
-    dims = (0,) + tuple(range(2, targs.ndimension()))
-    intersection = torch.sum(probas * true_1_hot, dims) # [class0,class1,class2,...]
-    cardinality = torch.sum(probas + true_1_hot, dims)  # [class0,class1,class2,...]
-    union = cardinality - intersection
-    iou = (intersection / (union + eps)).mean()   # find mean of class IoU values
-    return iou
+def load_coarse_model(fn):
+    "(model, stats) of the cascade coarse model: a learner .pkl or an export_model.py artifact"
+    fn = Path(fn)
+    if fn.suffix == '.pkl':
+        coarse = load_learner(path=fn.parent, file=fn.name)
+        return coarse.model, to_stats(getattr(coarse.data, 'stats', None))
+    from deploy import artifact_stats, load_artifact
+    model, meta = load_artifact(fn)
+    return model, artifact_stats(meta)
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run U-Net inference on ../test/testset')
+    parser.add_argument('--mode', choices=['stream','single','phase','tiled','cascade'], default='stream',
+                        help='stream: batched prefetch/writer pipeline; single: learn.predict per image; '
+                             'phase: average over phase shifts of ../output/mat/test_*_vqz.mat fields; '
+                             'tiled: sliding-window inference for images of any size; '
+                             'cascade: low-resolution pass (--coarse-model), full resolution only on flagged defect regions')
+    parser.add_argument('--bs', type=int, default=8, help='batch size for stream mode')
+    parser.add_argument('--phases', type=int, default=8, help='number of phase shifts (0-360 deg) for phase mode')
+    parser.add_argument('--tile', type=int, default=400, help='tile size for tiled mode')
+    parser.add_argument('--overlap', type=int, default=64, help='overlap between tiles for tiled mode')
+    parser.add_argument('--coarse-model', default=None,
+                        help='cascade mode: model trained on inference.coarse_input fields at --scale (.pkl, .pt or .onnx)')
+    parser.add_argument('--scale', type=float, default=0.25, help='resolution of the coarse pass for cascade mode')
+    parser.add_argument('--threshold', type=float, default=0.05,
+                        help='defect probability that flags a coarse pixel for cascade mode (lower: safer recall)')
+    parser.add_argument('--margin', type=int, default=16, help='pixels added around flagged regions for cascade mode')
+    parser.add_argument('--calibrate', type=int, default=16,
+                        help='cascade mode: test images used to pick --threshold/--margin against full-resolution recall (0: skip)')
+    parser.add_argument('--target-recall', type=float, default=0.99, help='recall the cascade calibration has to reach')
+    parser.add_argument('--blend', choices=['gaussian','linear','none'], default='gaussian',
+                        help='weighting of tile logits at the seams for tiled mode')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='re-predict every image instead of reusing cached predictions (stream/phase modes)')
+    parser.add_argument('--profile', action='store_true',
+                        help='record per-stage timing and peak RSS to ../output/logs/profile_<mode>.json (+ _trace.json)')
+    args = parser.parse_args()
+    if args.mode == 'cascade' and args.coarse_model is None:
+        parser.error('--mode cascade needs --coarse-model (the full-resolution U-Net does not work on downsampled fields)')
+
     # Load learner from .pkl file
     # learn.export() # to 'learn.path/'export.pkl'
+    prof = Profiler(enabled=args.profile)
     test_dir = Path("../test");
-    learn = load_learner(path="../models/",file="export_0_0009_KH.pkl",test=SegmentationItemList.from_folder(test_dir/"testset"),tfm_y=False)
+    with prof.stage('load_learner'):
+        learn = load_learner(path="../models/",file="export_0_0009_KH.pkl",test=SegmentationItemList.from_folder(test_dir/"testset"),tfm_y=False)
+
+    # Prediction cache: unchanged inputs with the same model and settings are not re-predicted
+    cache = None if args.no_cache else PredictionCache()
+    # keyed by the loaded module (not the .pkl file), so transforms applied to learn.model change the key
+    model_key = None if args.no_cache else model_hash(learn.model)
+    # every option that changes the masks of a mode goes into its cache keys
+    mode_options = dict(stream=[], single=[], phase=['phases'], tiled=['tile','overlap','blend'],
+                        cascade=['coarse_model','scale','threshold','margin'])
+    settings = dict(mode=args.mode, **{k: getattr(args, k) for k in mode_options[args.mode]})
 
     num_test = len(learn.data.test_ds.items);
 
@@ -90,30 +135,111 @@ if __name__ == '__main__':
     # get the filename of the prediction image
     get_pred_fn = lambda x: test_dir/"predictions"/f'{x.stem.split(token)[0]}_pred{x.suffix}'
 
-    # loop through all test images; run inference one at a time
-    for i in range(num_test):
-        img_fn = str(learn.data.test_ds.items[i]).split("/")[-1]
+    # Streaming batch prediction: memory depends on bs, not on the size of the test set
+    if args.mode == 'stream':
+        files = [f for f in learn.data.test_ds.items if token in Path(f).name] # skip imaginary
+        stats = to_stats(getattr(learn.data, 'stats', None))
+        n = predict_stream(learn.model, files, get_pred_fn, bs=args.bs, stats=stats, cache=cache, model_key=model_key,
+                           settings=settings, profiler=prof)
+        print(f'Saved {n} predictions to {test_dir/"predictions"}')
+    elif args.mode == 'phase':
+        # Phase-shift ensemble: one batched forward pass per complex field (replaces avg_phase.m)
+        stats = to_stats(getattr(learn.data, 'stats', None))
+        codes = load_codes("codes.txt")
+        for fn in sorted(Path("../output/mat").glob('test_*_vqz.mat')):
+            base_file = fn.name.split('_vqz.mat')[0]
+            key = None if cache is None else cache.key(model_key, fn, dict(settings, stats=stats))
+            entry = None if cache is None else cache.get(key)
+            if entry is None:
+                with prof.stage('decode', 1):
+                    vq_z = load_vqz(fn)
+                mask, thickness, probs = predict_phase_ensemble(learn.model, vq_z, codes, k=args.phases, stats=stats,
+                                                                profiler=prof)
+                if cache is not None:
+                    cache.put(key, mask, probs)
+            else:
+                mask = entry['mask']
+                thickness = (entry['probs'].astype(np.float32)*codes.reshape(-1,1,1).astype(np.float32)).sum(0)
+            with prof.stage('save', 1):
+                PIL.Image.fromarray(mask).save(test_dir/"predictions"/f'{base_file}_pred.png')
+                savemat(f'../output/mat/{base_file}_thick.mat', {'thickness': thickness})
+            print(f'Phase ensemble ({args.phases} shifts): {base_file}')
+    elif args.mode == 'tiled':
+        # Sliding-window inference: tiles of all images share batches, memory is bounded by tile size
+        files = [f for f in learn.data.test_ds.items if token in Path(f).name]
+        stats = to_stats(getattr(learn.data, 'stats', None))
+        images = (np.asarray(PIL.Image.open(f).convert('L'), dtype=np.float32)/255 for f in files)
+        with MaskWriter() as writer:
+            for f, mask in zip(files, predict_tiled(learn.model, images, args.tile, args.overlap, args.blend,
+                                                    bs=args.bs, stats=stats, profiler=prof)):
+                with prof.stage('enqueue', 1):
+                    writer.put(mask, get_pred_fn(Path(f)))
+        print(f'Saved {len(files)} tiled predictions to {test_dir/"predictions"}')
+    elif args.mode == 'cascade':
+        # Coarse-to-fine: full resolution only where the low-resolution pass sees a possible defect
+        files = [f for f in learn.data.test_ds.items if token in Path(f).name]
+        stats = to_stats(getattr(learn.data, 'stats', None))
+        read = lambda f: np.asarray(PIL.Image.open(f).convert('L'), dtype=np.float32)/255
+        coarse_model, coarse_stats = load_coarse_model(args.coarse_model)
+        threshold, margin, cal = args.threshold, args.margin, None
+        if args.calibrate > 0:
+            # recall safety: cheapest threshold/margin that keeps the full-resolution defect pixels
+            cal = calibrate_cascade(learn.model, coarse_model, [read(f) for f in files[:args.calibrate]],
+                                    target_recall=args.target_recall, scale=args.scale, bs=args.bs, stats=stats,
+                                    coarse_stats=coarse_stats)
+            threshold, margin = cal['threshold'], cal['margin']
+            with open('../output/logs/cascade_calibration.json', 'w') as fp:
+                json.dump(cal, fp, indent=1)
+            print(f'Calibrated on {cal["images"]} images: threshold {threshold}, margin {margin}, '
+                  f'recall vs full resolution {cal["recall"]:.4f} (target {args.target_recall}'
+                  f'{"" if cal["met"] else ", NOT reached"}), {cal["dense_ms"]:.0f} -> {cal["cascade_ms"]:.0f} ms per image '
+                  f'({cal["speedup"]:.1f}x)')
+        report = {}
+        with MaskWriter() as writer:
+            for f, mask in zip(files, predict_cascade(learn.model, coarse_model, (read(f) for f in files), args.scale,
+                                                      threshold, margin, bs=args.bs, stats=stats,
+                                                      coarse_stats=coarse_stats, report=report, profiler=prof)):
+                with prof.stage('enqueue', 1):
+                    writer.put(mask, get_pred_fn(Path(f)))
+        print(f'Saved {len(files)} cascade predictions to {test_dir/"predictions"}')
+        print(f'{report.get("crops", 0)} full-resolution crops, {report.get("dense", 0)} full images, '
+              f'{100*report.get("pixel_ratio", 0):.0f}% of the dense pixel work, '
+              f'{1e3*report.get("seconds", 0)/max(len(files), 1):.0f} ms per image')
+        if cal is None:
+            print('Not calibrated (--calibrate 0): recall against full resolution is unknown')
+    else:
+        # loop through all test images; run inference one at a time
+        for i in range(num_test):
+            img_fn = str(learn.data.test_ds.items[i]).split("/")[-1]
+
+            if not token in img_fn:
+                continue # skip imaginary
 
-        if not token in img_fn:
-            continue # skip imaginary
+            with prof.stage('open_image', 1):
+                test_img = open_image(learn.data.test_ds.items[i])
+            print(f'Opening file: {img_fn}')
 
-        test_img = open_image(learn.data.test_ds.items[i])
-        print(f'Opening file: {img_fn}')
+            # Show single prediction
+            with prof.stage('predict', 1):
+                pred = learn.predict(test_img)
+            print(f'Predict finished')
+            mask = pred[0]
+            # test_img.show(y=mask)
+            # pred = tuple(ImageSegment,Tensor[1,400,400],Tensor[10,400,400])
+            #      = tuple(mask image, class pixel values, probabilities)
 
-        # Show single prediction
-        pred = learn.predict(test_img)
-        print(f'Predict finished')
-        mask = pred[0]
-        # test_img.show(y=mask)
-        # pred = tuple(ImageSegment,Tensor[1,400,400],Tensor[10,400,400])
-        #      = tuple(mask image, class pixel values, probabilities)
+            # Save mask image to predictions folder
+            with prof.stage('image2np', 1):
+                X = image2np(mask.data).astype(np.uint8)
+            pred_fn = get_pred_fn(Path(img_fn))
+            with prof.stage('save', 1):
+                PIL.Image.fromarray(X).save(Path(pred_fn))
 
-        # Save mask image to predictions folder
-        X = image2np(mask.data).astype(np.uint8)
-        pred_fn = get_pred_fn(Path(img_fn))
-        PIL.Image.fromarray(X).save(Path(pred_fn))
+    if args.profile:
+        prof.write("../output/logs", f'profile_{args.mode}')
+        print(prof.report())
 
-    # Batch prediction (RUNS OUT OF MEMORY FOR LARGE TEST SETS)
+    # Batch prediction (RUNS OUT OF MEMORY FOR LARGE TEST SETS; use --mode stream instead)
     # preds,y = learn.get_preds(ds_type=DatasetType.Test)
     # predicted_masks = np.argmax(preds,axis=1) # get highest class probabilities (dim 1)
     # predicted_masks = torch.unsqueeze(predicted_masks,1) # shape = [len(test),1,400,400]
@@ -0,0 +1,216 @@
+# Team: DeepWaves
+# Date: 10/18/2026
+# Author: DeepWaves contributors
+# Description:
+# Concurrent archival of dataset files (the Dropbox part of run_matlab.py). One
+# authenticated storage backend is shared by a pool of upload threads. Files are
+# streamed in 8 MB chunks (Dropbox upload sessions above one chunk), so memory does not
+# depend on file size. Before uploading, the local Dropbox content hash (sha256 of the
+# sha256 of every 4 MB block) is compared with the destination and identical files are
+# skipped. Failed transfers are retried with exponential backoff, every upload is
+# verified against the returned content hash, and local copies are only deleted after a
+# verified upload (or a matching remote copy).
+#   DropboxBackend : team folder (namespace of run_matlab.py), upload sessions, files_get_metadata
+#   LocalBackend   : a directory with the same interface, to test the pipeline offline
+#
+# Usage: python uploader.py <round> [--local DIR] [--workers 8] [--delete]
+#        (Dropbox token from --token or the DROPBOX_TOKEN environment variable)
+
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+CHUNK = 8*1024*1024     # upload chunk [bytes] (multiple of 4 MB as Dropbox recommends)
+HASH_BLOCK = 4*1024*1024    # block size of the Dropbox content hash
+NAMESPACE_ID = "8057807376" # DeepWaves team folder (see run_matlab.py)
+
+class ChecksumError(Exception):
+    "The destination content hash does not match the local file"
+
+def content_hash(fn):
+    "Dropbox content hash of a local file: sha256 over the sha256 digests of its 4 MB blocks"
+    h = hashlib.sha256()
+    with open(fn, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(hashlib.sha256(block).digest())
+    return h.hexdigest()
+
+def read_chunks(f, size:int=CHUNK):
+    return iter(lambda: f.read(size), b'')
+
+class StorageBackend():
+    "Destination of the uploads; hashes are Dropbox content hashes"
+    def remote_hash(self, dest):
+        "Content hash of dest, or None if it does not exist"
+        raise NotImplementedError
+
+    def upload(self, src, dest):
+        "Store the local file src at dest (overwrite); returns the content hash of the stored file"
+        raise NotImplementedError
+
+    def retryable(self, err):
+        "Whether a failed transfer is worth retrying"
+        return isinstance(err, (OSError, ChecksumError))
+
+class DropboxBackend(StorageBackend):
+    """Dropbox team folder with one authenticated client (pooled HTTP connections shared
+    by all upload threads). Files larger than one chunk go through an upload session.
+    """
+    def __init__(self, token:str, namespace_id:str=NAMESPACE_ID, chunk:int=CHUNK, max_connections:int=8):
+        import dropbox
+        from dropbox.exceptions import AuthError
+        self.chunk = chunk
+        dbx = dropbox.Dropbox(token, session=dropbox.create_session(max_connections=max_connections))
+        # Find the namespace id of the team from account.root_info
+        self.dbx = dbx.with_path_root(dropbox.common.PathRoot.namespace_id(namespace_id))
+        try:
+            self.dbx.users_get_current_account()   # check once that the access token is valid
+        except AuthError as err:
+            raise RuntimeError("Invalid Dropbox access token") from err
+
+    def remote_hash(self, dest):
+        from dropbox.exceptions import ApiError
+        try:
+            return self.dbx.files_get_metadata(dest).content_hash
+        except ApiError as err:
+            if err.error.is_path() and err.error.get_path().is_not_found():
+                return None
+            raise
+
+    def upload(self, src, dest):
+        from dropbox.files import CommitInfo, UploadSessionCursor, WriteMode
+        size = os.path.getsize(src)
+        with open(src, 'rb') as f:
+            if size <= self.chunk:
+                return self.dbx.files_upload(f.read(), dest, mode=WriteMode('overwrite')).content_hash
+            session = self.dbx.files_upload_session_start(f.read(self.chunk))
+            cursor = UploadSessionCursor(session_id=session.session_id, offset=f.tell())
+            commit = CommitInfo(path=dest, mode=WriteMode('overwrite'))
+            while size - f.tell() > self.chunk:
+                self.dbx.files_upload_session_append_v2(f.read(self.chunk), cursor)
+                cursor.offset = f.tell()
+            return self.dbx.files_upload_session_finish(f.read(self.chunk), cursor, commit).content_hash
+
+    def retryable(self, err):
+        import requests
+        from dropbox.exceptions import InternalServerError, RateLimitError
+        return isinstance(err, (RateLimitError, InternalServerError, requests.exceptions.RequestException,
+                                ChecksumError, OSError))
+
+class LocalBackend(StorageBackend):
+    "Directory stand-in for Dropbox: dest paths ('/datastore/...') are taken relative to root"
+    def __init__(self, root, chunk:int=CHUNK):
+        self.root, self.chunk = Path(root), chunk
+
+    def path(self, dest):
+        return self.root/str(dest).lstrip('/')
+
+    def remote_hash(self, dest):
+        p = self.path(dest)
+        return content_hash(p) if p.exists() else None
+
+    def upload(self, src, dest):
+        p = self.path(dest)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f'{p.name}.{threading.get_ident()}.part')
+        with open(src, 'rb') as fin, open(tmp, 'wb') as fout:
+            for chunk in read_chunks(fin, self.chunk):
+                fout.write(chunk)
+        os.replace(tmp, p)
+        return content_hash(p)
+
+class Uploader():
+    """Upload many files concurrently through one backend.
+    Args:
+        retries: attempts per file after the first one (retryable errors only)
+        backoff: first retry delay [s]; doubles every attempt (with jitter)
+        delete: remove the local file once the destination is verified
+    """
+    def __init__(self, backend:StorageBackend, workers:int=8, retries:int=5, backoff:float=1.0,
+                 max_backoff:float=60.0, delete:bool=False):
+        self.backend, self.workers, self.retries = backend, workers, retries
+        self.backoff, self.max_backoff, self.delete = backoff, max_backoff, delete
+
+    def _delay(self, attempt, err):
+        wait = getattr(err, 'backoff', None)     # dropbox RateLimitError says how long to wait
+        if wait is None:
+            wait = min(self.max_backoff, self.backoff*2**attempt)*random.uniform(0.5, 1.5)
+        return wait
+
+    def upload_file(self, src, dest):
+        """Upload one file unless an identical copy is already at dest.
+        Returns:
+            dict: src, dest, status ('uploaded', 'skipped' or 'failed'), attempts, bytes (None if unreadable), error
+        """
+        res = dict(src=str(src), dest=str(dest), status='failed', attempts=0, bytes=None, error=None)
+        local = None
+        for attempt in range(self.retries + 1):
+            res['attempts'] = attempt + 1
+            try:
+                if local is None:   # a missing or unreadable source fails this file, not the batch
+                    res['bytes'] = os.path.getsize(src)
+                    local = content_hash(src)
+                # checked on retries too: a lost response may hide a finished upload
+                if self.backend.remote_hash(dest) == local:
+                    res['status'] = 'skipped' if attempt == 0 else 'uploaded'
+                else:
+                    remote = self.backend.upload(src, dest)
+                    if remote != local:
+                        raise ChecksumError(f'{dest}: content hash {remote} != local {local}')
+                    res['status'] = 'uploaded'
+                break
+            except Exception as err:
+                res['error'] = repr(err)
+                # retrying does not bring back a deleted or unreadable local file
+                missing = isinstance(err, (FileNotFoundError, PermissionError, IsADirectoryError))
+                if attempt == self.retries or missing or not self.backend.retryable(err):
+                    return res
+                time.sleep(self._delay(attempt, err))
+        res['error'] = None
+        if self.delete:
+            os.remove(src)
+        return res
+
+    def upload_many(self, pairs):
+        "Upload (src, dest) pairs across the thread pool; yields results as they finish"
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            futures = [ex.submit(self.upload_file, src, dest) for src, dest in pairs]
+            for fut in as_completed(futures):
+                yield fut.result()
+
+def round_pairs(round_name, root=Path(".."), dest_root='/datastore'):
+    """(local file, Dropbox path) of every data/image/label file of a round, laid out
+    like run_matlab.py: /datastore/<round>/<round>_{data,images,labels}/<file>
+    """
+    out = []
+    for folder in ('data', 'images', 'labels'):
+        dest = f'{dest_root}/{round_name}/{round_name}_{folder}'
+        for fn in sorted((Path(root)/folder).glob(f'{round_name}_*')):
+            if fn.is_file():
+                out.append((str(fn), f'{dest}/{fn.name}'))
+    return out
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archive the data, images and labels of a round to Dropbox')
+    parser.add_argument('round', help='round prefix of the file names (e.g. r1)')
+    parser.add_argument('--token', default=os.environ.get('DROPBOX_TOKEN', ''), help='Dropbox access token')
+    parser.add_argument('--local', default=None, help='copy to this directory instead of Dropbox')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--delete', action='store_true', help='remove local files after a verified upload')
+    args = parser.parse_args()
+
+    backend = LocalBackend(args.local) if args.local else DropboxBackend(args.token, max_connections=args.workers)
+    uploader = Uploader(backend, args.workers, args.retries, delete=args.delete)
+    pairs = round_pairs(args.round)
+    counts = {}
+    t = time.perf_counter()
+    for res in uploader.upload_many(pairs):
+        counts[res['status']] = counts.get(res['status'], 0) + 1
+        print(f'{res["status"]:<9}{res["dest"]}' + (f'  ({res["error"]})' if res['error'] else ''))
+    print(f'{len(pairs)} files in {time.perf_counter() - t:.1f} s: {counts}')